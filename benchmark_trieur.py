@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai reproductible du trieur de fichiers
+
+Génère des arborescences synthétiques à partir d'une graine (nombre de fichiers,
+distribution des tailles, mélange d'extensions, taux de collisions, profondeur),
+puis chronomètre le tri, la restauration et le rollback. Les résultats sont écrits
+en JSON pour comparer les exécutions entre elles.
+
+Exemples :
+    python benchmark_trieur.py --nombres 1000 100000 --supports tmpfs=/dev/shm disque=/var/tmp
+    python benchmark_trieur.py --inter-peripheriques /mnt/tmpfs_a /mnt/tmpfs_b --sortie resultats.json
+    python benchmark_trieur.py --comparer ancien.json nouveau.json
+    python benchmark_trieur.py --nombres 1000000 --supports hdd=/mnt/nas --ordonnancements parcours inode
+    python benchmark_trieur.py --distribution mixte --inter-peripheriques /mnt/tmpfs_a /mnt/tmpfs_b --voies
+    python benchmark_trieur.py --nombres 1000000 --supports --memoire --latence-memoire 0.0001
+
+Le cas inter-périphériques demande deux points de montage distincts, par exemple :
+    mount -t tmpfs -o size=2G tmpfs /mnt/tmpfs_a && mount -t tmpfs -o size=2G tmpfs /mnt/tmpfs_b
+ou deux images montées en boucle (losetup) pour mesurer un vrai système de fichiers.
+
+Le support « memoire » trie sur le système de fichiers en mémoire du trieur : il mesure
+le coût propre du moteur (parcours, classification, journal), sans disque, avec une
+latence par opération facultative pour simuler un disque lent.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+
+# Ajouter le répertoire courant au PYTHONPATH
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from trieur_fichiers_auto import TrieurFichiers, TYPES_FICHIERS, SystemeFichiersMemoire
+
+# Mélange d'extensions par défaut : toutes les extensions connues, plus des fichiers non reconnus
+EXTENSIONS_PAR_DEFAUT = {ext: 1.0 for extensions in TYPES_FICHIERS.values() for ext in extensions}
+EXTENSIONS_PAR_DEFAUT.update({".bin": 3.0, ".dat": 2.0, "": 1.0})
+
+# Distributions de tailles : (fonction de tirage, description)
+DISTRIBUTIONS_TAILLES = {
+    "vide": lambda alea: 0,
+    "petits": lambda alea: int(alea.lognormvariate(8, 1.5)),  # Quelques Ko
+    "mixte": lambda alea: int(alea.lognormvariate(11, 3)),  # Du Ko à quelques centaines de Mo
+    "grands": lambda alea: int(alea.uniform(50, 200) * 1024 * 1024),
+}
+
+
+def generer_arborescence(racine: str, nombre: int, graine: int = 42, distribution: str = "petits",
+                         extensions: dict = None, taux_collisions: float = 0.0, profondeur: int = 0,
+                         largeur: int = 8, systeme_fichiers=None) -> dict:
+    """
+    Crée une arborescence synthétique reproductible
+    :param racine: Dossier à remplir (créé si nécessaire)
+    :param nombre: Nombre de fichiers
+    :param graine: Graine du générateur aléatoire
+    :param distribution: Clé de DISTRIBUTIONS_TAILLES
+    :param extensions: Poids par extension (défaut: EXTENSIONS_PAR_DEFAUT)
+    :param taux_collisions: Part des fichiers dont le nom est déjà pris à destination
+    :param profondeur: Profondeur maximale des sous-dossiers (0 = tout à la racine)
+    :param largeur: Nombre de sous-dossiers par niveau
+    :param systeme_fichiers: SystemeFichiersMemoire à remplir au lieu du disque
+    :return: Description de l'arborescence générée
+    """
+    alea = random.Random(graine)
+    extensions = extensions or EXTENSIONS_PAR_DEFAUT
+    liste_extensions = list(extensions)
+    poids = list(extensions.values())
+    tirer_taille = DISTRIBUTIONS_TAILLES[distribution]
+
+    makedirs = systeme_fichiers.makedirs if systeme_fichiers else os.makedirs
+    makedirs(racine, exist_ok=True)
+    trieur = TrieurFichiers({"dossier_source": racine, "type_tri": "type"}, systeme_fichiers)
+    octets = 0
+    collisions = 0
+    dossiers = {""}
+
+    for i in range(nombre):
+        extension = alea.choices(liste_extensions, poids)[0]
+        nom = f"fichier_{i:07d}{extension}"
+
+        sous_dossier = ""
+        if profondeur:
+            niveaux = alea.randint(0, profondeur)
+            sous_dossier = os.path.join(*[f"niveau{n}_{alea.randrange(largeur)}" for n in range(niveaux)]) \
+                if niveaux else ""
+        dossier = os.path.join(racine, sous_dossier)
+        if sous_dossier not in dossiers:
+            makedirs(dossier, exist_ok=True)
+            dossiers.add(sous_dossier)
+
+        chemin = os.path.join(dossier, nom)
+        taille = tirer_taille(alea)
+        # Fichiers creux : la taille est visible par stat sans écrire les données
+        if systeme_fichiers:
+            systeme_fichiers.creer_fichier(chemin, taille=taille)
+        else:
+            with open(chemin, 'wb') as f:
+                f.truncate(taille)
+        octets += taille
+
+        # Collision : un fichier du même nom attend déjà dans le dossier de destination
+        if taux_collisions and alea.random() < taux_collisions:
+            destination = trieur.creer_dossier_destination(nom, trieur.systeme_fichiers.stat(chemin))
+            if systeme_fichiers:
+                systeme_fichiers.creer_fichier(os.path.join(destination, nom))
+            else:
+                os.makedirs(destination, exist_ok=True)
+                open(os.path.join(destination, nom), 'wb').close()
+            collisions += 1
+
+    return {"nombre": nombre, "graine": graine, "distribution": distribution, "octets": octets,
+            "collisions": collisions, "profondeur": profondeur, "dossiers": len(dossiers)}
+
+
+def preparer_inter_peripheriques(source: str, cible: str, config: dict):
+    """
+    Redirige chaque dossier de catégorie du dossier source vers un autre point de montage
+
+    Les dossiers de catégorie deviennent des liens symboliques vers la cible : chaque
+    déplacement traverse alors la frontière entre périphériques (copie vérifiée).
+    """
+    trieur = TrieurFichiers(config)
+    for categorie in set(trieur.obtenir_dossiers_sortie()):
+        dossier_cible = os.path.join(cible, os.path.basename(categorie))
+        if os.path.isdir(categorie):
+            shutil.move(categorie, dossier_cible)  # Conserver les fichiers de collision déjà créés
+        else:
+            os.makedirs(dossier_cible, exist_ok=True)
+        os.symlink(dossier_cible, categorie)
+
+
+def mesurer(fonction) -> tuple:
+    debut = time.perf_counter()
+    resultat = fonction()
+    return time.perf_counter() - debut, resultat
+
+
+def resumer_phases(rapport) -> dict:
+    """
+    Extrait la durée totale et le nombre d'appels de chaque phase d'un rapport d'exécution
+    """
+    phases = rapport.metriques.vers_dict()["phases"]
+    return {nom: {"nombre": infos["nombre"], "duree_totale": infos["duree_totale"]}
+            for nom, infos in phases.items()}
+
+
+def executer_scenario(support: str, racine: str, nombre: int, args, cible_inter: str = None,
+                      ordonnancement: str = "parcours") -> dict:
+    """
+    Génère une arborescence puis mesure tri, restauration et rollback
+    :return: Résultat du scénario
+    """
+    # Support en mémoire : un système de fichiers neuf par scénario, rien à nettoyer
+    systeme_fichiers = SystemeFichiersMemoire(latence=args.latence_memoire) if support == "memoire" else None
+    if systeme_fichiers:
+        base = os.path.join(racine, "trieur_bench")
+    else:
+        base = tempfile.mkdtemp(prefix="trieur_bench_", dir=racine)
+    source = os.path.join(base, "source")
+    config = {"dossier_source": source, "type_tri": args.type_tri, "recursif": args.profondeur > 0,
+              "pipeline": not args.sans_pipeline, "ordonnancement": ordonnancement,
+              "voies_deplacement": args.voies}
+    try:
+        duree_generation, description = mesurer(lambda: generer_arborescence(
+            source, nombre, args.graine, args.distribution, None, args.collisions, args.profondeur,
+            systeme_fichiers=systeme_fichiers))
+        if cible_inter:
+            cible = tempfile.mkdtemp(prefix="trieur_bench_", dir=cible_inter)
+            preparer_inter_peripheriques(source, cible, config)
+
+        resultat = {"support": support, "racine": racine, "arborescence": description,
+                    "ordonnancement": ordonnancement, "duree_generation": round(duree_generation, 3)}
+
+        # Tri puis restauration
+        trieur = TrieurFichiers(dict(config), systeme_fichiers)
+        duree, rapport = mesurer(trieur.trier_fichiers)
+        resultat["tri"] = {"duree": round(duree, 3), "fichiers": rapport[0], "erreurs": len(rapport[1]),
+                           "fichiers_par_seconde": round(rapport[0] / duree, 1) if duree else 0,
+                           "phases": resumer_phases(rapport)}
+        if "voies" in rapport.metriques.informations:
+            resultat["tri"]["voies"] = rapport.metriques.informations["voies"]
+
+        duree, rapport = mesurer(TrieurFichiers(dict(config), systeme_fichiers).restaurer_fichiers)
+        resultat["restauration"] = {"duree": round(duree, 3), "fichiers": rapport[0], "erreurs": len(rapport[1]),
+                                    "phases": resumer_phases(rapport)}
+
+        # Tri puis rollback des opérations du même trieur
+        trieur = TrieurFichiers(dict(config), systeme_fichiers)
+        trieur.trier_fichiers()
+        duree, erreurs = mesurer(trieur.effectuer_rollback)
+        resultat["rollback"] = {"duree": round(duree, 3), "erreurs": len(erreurs),
+                                "phases": {nom: {"nombre": infos["nombre"], "duree_totale": infos["duree_totale"]}
+                                           for nom, infos in erreurs.metriques.vers_dict()["phases"].items()}}
+        return resultat
+    finally:
+        if not systeme_fichiers:
+            shutil.rmtree(base, ignore_errors=True)
+        if cible_inter:
+            shutil.rmtree(cible, ignore_errors=True)
+
+
+def environnement() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"python": platform.python_version(), "plateforme": platform.platform(),
+            "processeurs": os.cpu_count(), "commit": commit, "date": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def comparer(ancien_chemin: str, nouveau_chemin: str):
+    """
+    Affiche l'évolution des durées entre deux fichiers de résultats
+    """
+    with open(ancien_chemin, encoding='utf-8') as f:
+        ancien = json.load(f)
+    with open(nouveau_chemin, encoding='utf-8') as f:
+        nouveau = json.load(f)
+
+    def indexer(resultats):
+        return {(r["support"], r["arborescence"]["nombre"], r.get("ordonnancement", "parcours")): r
+                for r in resultats["resultats"]}
+
+    anciens = indexer(ancien)
+    print(f"{'support':<12}{'fichiers':>10}{'ordre':>10}{'opération':>14}{'avant (s)':>12}{'après (s)':>12}{'ratio':>8}")
+    for cle, resultat in sorted(indexer(nouveau).items()):
+        if cle not in anciens:
+            continue
+        for operation in ("tri", "restauration", "rollback"):
+            avant, apres = anciens[cle][operation]["duree"], resultat[operation]["duree"]
+            ratio = apres / avant if avant else float('inf')
+            print(f"{cle[0]:<12}{cle[1]:>10}{cle[2]:>10}{operation:>14}{avant:>12.3f}{apres:>12.3f}{ratio:>8.2f}")
+
+
+def resumer_ordonnancements(resultats: list):
+    """
+    Affiche, pour chaque support et taille, la durée du tri ordonné par inode rapportée à l'ordre du parcours
+    """
+    par_cle = {}
+    for resultat in resultats:
+        cle = (resultat["support"], resultat["arborescence"]["nombre"])
+        par_cle.setdefault(cle, {})[resultat["ordonnancement"]] = resultat["tri"]["duree"]
+    for (support, nombre), durees in sorted(par_cle.items()):
+        if "parcours" in durees and "inode" in durees and durees["parcours"]:
+            print(f"📐 {support}, {nombre} fichiers : tri par inode {durees['inode']} s contre "
+                  f"{durees['parcours']} s dans l'ordre du parcours (ratio {durees['inode'] / durees['parcours']:.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai du trieur de fichiers")
+    parser.add_argument("--nombres", type=int, nargs="+", default=[1000, 100000],
+                        help="Nombres de fichiers à tester (ex: 1000 100000 1000000)")
+    parser.add_argument("--supports", nargs="*", default=None,
+                        help="Supports nom=chemin (défaut: tmpfs=/dev/shm et disque=dossier temporaire, "
+                             "aucun si l'option est vide)")
+    parser.add_argument("--inter-peripheriques", nargs=2, metavar=("SOURCE", "CIBLE"),
+                        help="Deux points de montage distincts pour le cas inter-périphériques")
+    parser.add_argument("--memoire", action="store_true",
+                        help="Ajouter le support en mémoire (moteur seul, sans disque)")
+    parser.add_argument("--latence-memoire", type=float, default=0.0,
+                        help="Latence simulée (s) de chaque opération du support en mémoire")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--distribution", choices=sorted(DISTRIBUTIONS_TAILLES), default="petits")
+    parser.add_argument("--collisions", type=float, default=0.0, help="Taux de collisions de noms (0 à 1)")
+    parser.add_argument("--profondeur", type=int, default=0, help="Profondeur des sous-dossiers (tri récursif)")
+    parser.add_argument("--type-tri", default="type", choices=["type", "date", "taille", "composite"])
+    parser.add_argument("--sans-pipeline", action="store_true", help="Utiliser la boucle séquentielle")
+    parser.add_argument("--voies", action="store_true",
+                        help="Déplacer en deux voies parallèles (petits fichiers / gros fichiers)")
+    parser.add_argument("--ordonnancements", nargs="+", choices=["parcours", "inode"], default=["parcours"],
+                        help="Ordres de déplacement à mesurer (ex: parcours inode)")
+    parser.add_argument("--sortie", default="bench_resultats.json", help="Fichier JSON des résultats")
+    parser.add_argument("--comparer", nargs=2, metavar=("ANCIEN", "NOUVEAU"),
+                        help="Comparer deux fichiers de résultats au lieu de mesurer")
+    args = parser.parse_args()
+
+    if args.comparer:
+        comparer(*args.comparer)
+        return
+
+    # Le journal détaillé par fichier fausserait les mesures
+    logging.getLogger("trieur_fichiers_auto").setLevel(logging.WARNING)
+
+    supports_demandes = args.supports
+    if supports_demandes is None:
+        supports_demandes = ["tmpfs=/dev/shm"] if os.path.isdir("/dev/shm") else []
+        supports_demandes.append(f"disque={tempfile.gettempdir()}")
+    supports = []
+    for support in supports_demandes:
+        nom, _, chemin = support.partition("=")
+        supports.append((nom, chemin, None))
+    if args.memoire:
+        supports.append(("memoire", os.sep, None))
+    if args.inter_peripheriques:
+        source, cible = args.inter_peripheriques
+        if os.stat(source).st_dev == os.stat(cible).st_dev:
+            parser.error("Les deux chemins inter-périphériques sont sur le même périphérique")
+        supports.append(("inter_peripheriques", source, cible))
+
+    resultats = {"environnement": environnement(), "parametres": vars(args), "resultats": []}
+    for nombre in args.nombres:
+        for nom, chemin, cible in supports:
+            for ordonnancement in args.ordonnancements:
+                print(f"⏱️  {nom}: {nombre} fichiers (ordre: {ordonnancement})...", flush=True)
+                resultat = executer_scenario(nom, chemin, nombre, args, cible, ordonnancement)
+                resultats["resultats"].append(resultat)
+                print(f"   tri {resultat['tri']['duree']} s ({resultat['tri']['fichiers_par_seconde']} fichiers/s), "
+                      f"restauration {resultat['restauration']['duree']} s, rollback {resultat['rollback']['duree']} s")
+    resumer_ordonnancements(resultats["resultats"])
+
+    with open(args.sortie, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, ensure_ascii=False, indent=2)
+    print(f"📊 Résultats écrits dans {args.sortie}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ import shutil
 
 # Ajouter le répertoire courant au PYTHONPATH
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Journal des tests dans un dossier temporaire, jamais dans le dépôt
+os.environ.setdefault("TRIEUR_DOSSIER_JOURNAL", tempfile.mkdtemp(prefix="trieur_journal_"))
 
 try:
     from trieur_fichiers_auto import TrieurFichiers, PermissionError_Custom, EspaceDisqueError, TrieurError
@@ -121,6 +123,1336 @@ def test_rollback_mechanism():
     except Exception as e:
         print(f"❌ Erreur dans le mécanisme de rollback: {e}")
 
+def test_hierarchie_composite():
+    """Test du tri composite type → date → taille"""
+    print("\n🧱 Test du tri composite...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for filename in ["photo.jpg", "notes.txt"]:
+            with open(os.path.join(temp_dir, filename), 'w') as f:
+                f.write("contenu de test")
+        
+        config = {"dossier_source": temp_dir, "type_tri": "composite",
+                  "hierarchie_tri": ["type", "date", "taille"]}
+        trieur = TrieurFichiers(config)
+        
+        dossier = trieur.creer_dossier_destination("photo.jpg")
+        categorie_date = trieur.obtenir_categorie_date(os.path.getmtime(os.path.join(temp_dir, "photo.jpg")))
+        assert dossier == os.path.join(temp_dir, "Images", categorie_date, "Petits")
+        
+        # Le chemin est construit une seule fois par combinaison de clés
+        assert trieur.creer_dossier_destination("photo.jpg") is dossier
+        
+        fichiers_traites, erreurs = trieur.trier_fichiers()
+        assert fichiers_traites == 2, erreurs
+        assert os.path.isfile(os.path.join(dossier, "photo.jpg"))
+        
+        fichiers_restaures, erreurs = trieur.restaurer_fichiers()
+        assert fichiers_restaures == 2, erreurs
+        assert sorted(os.listdir(temp_dir)) == ["notes.txt", "photo.jpg"]
+        print("✅ Tri composite et restauration fonctionnels")
+
+def test_categories_configurables():
+    """Test des seuils de taille et de la granularité des dates"""
+    print("\n📏 Test des catégories configurables...")
+    
+    config = {"type_tri": "taille", "granularite_date": "trimestre",
+              "categories_tailles": [["Minuscules", 0], ["Petits", 10], ["Moyens", 1000], ["Grands", 10 ** 6]]}
+    trieur = TrieurFichiers(config)
+    
+    assert trieur.obtenir_categorie_taille(0) == "Minuscules"
+    assert trieur.obtenir_categorie_taille(999) == "Petits"
+    assert trieur.obtenir_categorie_taille(10 ** 9) == "Grands"
+    
+    import datetime
+    debut_t2 = datetime.datetime(2024, 4, 1).timestamp()
+    assert trieur.obtenir_categorie_date(debut_t2) == "2024-T2"
+    assert trieur.obtenir_categorie_date(debut_t2 - 1) == "2024-T1"
+    assert trieur.obtenir_categorie_date(datetime.datetime(1999, 12, 31).timestamp()) == "1999-T4"
+    
+    tailles, dates = trieur.classer_lot([5, 50, 5000], [debut_t2, debut_t2 - 1, debut_t2])
+    assert tailles == ["Minuscules", "Petits", "Moyens"]
+    assert dates == ["2024-T2", "2024-T1", "2024-T2"]
+    
+    # Sans pipeline, le tri classe les fichiers du parcours par lots, au même résultat qu'un par un
+    def arborescence(dossier):
+        return sorted(os.path.relpath(os.path.join(racine, nom), dossier)
+                      for racine, _, noms in os.walk(dossier) for nom in noms if nom.startswith("fichier"))
+    resultats = []
+    for pipeline in (True, False):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i, taille in enumerate([0, 5, 50, 5000, 2 * 10 ** 6]):
+                chemin = os.path.join(temp_dir, f"fichier{i}.txt")
+                with open(chemin, 'wb') as f:
+                    f.write(b"0" * taille)
+                os.utime(chemin, (debut_t2 - 86400 * 40 * i, debut_t2 - 86400 * 40 * i))
+            trieur = TrieurFichiers(dict(config, dossier_source=temp_dir, type_tri="composite",
+                                         hierarchie_tri=["date", "taille", "extension"], pipeline=pipeline))
+            lots = []
+            classer_lot = trieur.classer_lot
+            trieur.classer_lot = lambda tailles, dates: lots.append(len(tailles)) or classer_lot(tailles, dates)
+            assert trieur.trier_fichiers().nombre_fichiers == 5
+            assert lots == ([] if pipeline else [5])
+            resultats.append(arborescence(temp_dir))
+    assert resultats[0] == resultats[1] and len(set(map(os.path.dirname, resultats[0]))) == 5, resultats
+    print("✅ Classification par seuils et par période fonctionnelle")
+
+def test_tri_recursif():
+    """Test du tri récursif des sous-dossiers"""
+    print("\n🌳 Test du tri récursif...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        chemins = ["racine.txt", os.path.join("a", "b", "profond.txt"),
+                   os.path.join("a", "image.png"), os.path.join(".cache", "cache.txt")]
+        for chemin in chemins:
+            os.makedirs(os.path.dirname(os.path.join(temp_dir, chemin)), exist_ok=True)
+            with open(os.path.join(temp_dir, chemin), 'w') as f:
+                f.write("contenu de test")
+        
+        config = {"dossier_source": temp_dir, "type_tri": "type", "recursif": True,
+                  "sous_dossiers_par_extension": False}
+        trieur = TrieurFichiers(config)
+        
+        fichiers_traites, erreurs = trieur.trier_fichiers()
+        assert fichiers_traites == 3, erreurs
+        assert sorted(os.listdir(os.path.join(temp_dir, "Documents"))) == ["profond.txt", "racine.txt"]
+        assert os.path.isfile(os.path.join(temp_dir, ".cache", "cache.txt"))
+        
+        # Un second tri ne redescend pas dans les dossiers de catégories
+        fichiers_traites, erreurs = trieur.trier_fichiers()
+        assert fichiers_traites == 0
+        
+        # La sauvegarde du premier tri est conservée et restaure les sous-dossiers
+        fichiers_restaures, erreurs = TrieurFichiers(config).restaurer_fichiers()
+        assert fichiers_restaures == 3, erreurs
+        assert os.path.isfile(os.path.join(temp_dir, "a", "b", "profond.txt"))
+        print("✅ Tri récursif fonctionnel")
+
+def test_motifs_ignores():
+    """Test des motifs d'exclusion (.trieurignore)"""
+    print("\n🙈 Test des motifs d'exclusion...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        chemins = ["film.mp4.part", "rapport.pdf", "brouillon.pdf", os.path.join("prive", "secret.txt"),
+                   os.path.join("public", "notes.txt")]
+        for chemin in chemins:
+            os.makedirs(os.path.dirname(os.path.join(temp_dir, chemin)), exist_ok=True)
+            with open(os.path.join(temp_dir, chemin), 'w') as f:
+                f.write("contenu de test")
+        with open(os.path.join(temp_dir, ".trieurignore"), 'w') as f:
+            f.write("# Dossiers privés\nprive/\nbrouillon.*\n")
+        
+        config = {"dossier_source": temp_dir, "type_tri": "type", "recursif": True}
+        trieur = TrieurFichiers(config)
+        
+        noms = sorted(entree.nom for entree in trieur.parcourir_fichiers(recursif=True))
+        assert noms == ["notes.txt", "rapport.pdf"], noms
+        
+        fichiers_traites, erreurs = trieur.trier_fichiers()
+        assert fichiers_traites == 2, erreurs
+        assert os.path.isfile(os.path.join(temp_dir, "film.mp4.part"))
+        assert os.path.isfile(os.path.join(temp_dir, "prive", "secret.txt"))
+        print("✅ Motifs d'exclusion appliqués pendant le parcours")
+
+def test_transfert_inter_peripherique():
+    """Test de la copie par blocs avec reprise (utilisée entre périphériques)"""
+    print("\n🚚 Test du transfert par blocs...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, "source.bin")
+        destination = os.path.join(temp_dir, "copie", "source.bin")
+        contenu = os.urandom(256 * 1024)
+        with open(source, 'wb') as f:
+            f.write(contenu)
+        os.utime(source, (1000000000, 1000000000))
+        
+        # Simuler une copie interrompue à mi-chemin
+        os.makedirs(os.path.dirname(destination))
+        with open(destination + ".trieur-partiel", 'wb') as f:
+            f.write(contenu[:100000])
+        
+        progression = []
+        trieur = TrieurFichiers()
+        trieur.callback_octets = lambda copies, total, fichier: progression.append(copies)
+        trieur.transferer_inter_peripherique(source, destination)
+        
+        assert not os.path.exists(source)
+        assert not os.path.exists(destination + ".trieur-partiel")
+        with open(destination, 'rb') as f:
+            assert f.read() == contenu
+        assert int(os.path.getmtime(destination)) == 1000000000
+        assert progression[-1] == len(contenu)
+        
+        # Copie en pipeline : les blocs gardent la copie dans le noyau, méthode propre à chaque transfert
+        if hasattr(os, "copy_file_range") and hasattr(os, "posix_fadvise"):
+            from unittest import mock
+            import trieur_fichiers_auto
+            os.rename(destination, source)
+            trieur = TrieurFichiers({"copie_pipeline": True})
+            with mock.patch.object(trieur_fichiers_auto, "TAILLE_BLOC_PIPELINE", 16 * 1024), \
+                 mock.patch("os.copy_file_range", wraps=os.copy_file_range) as copy_file_range, \
+                 mock.patch("os.read", wraps=os.read) as lecture:
+                trieur.transferer_inter_peripherique(source, destination)
+            with open(destination, 'rb') as f:
+                assert f.read() == contenu
+            assert copy_file_range.call_count >= len(contenu) // (16 * 1024) and lecture.call_count == 0
+            compteurs = trieur.metriques.compteurs
+            assert compteurs["copies_pipeline"] == 1 and compteurs["copies_copy_file_range"] == 1, compteurs
+        print("✅ Transfert vérifié, reprise et conservation des dates fonctionnelles")
+
+def test_pipeline():
+    """Test du pipeline parcours → classification → déplacement"""
+    print("\n🏭 Test du pipeline...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(50):
+            with open(os.path.join(temp_dir, f"fichier_{i}.txt"), 'w') as f:
+                f.write("contenu de test")
+        
+        config = {"dossier_source": temp_dir, "type_tri": "type", "pipeline": True,
+                  "taille_files_pipeline": 4}
+        trieur = TrieurFichiers(config)
+        fichiers_traites, erreurs = trieur.trier_fichiers()
+        assert fichiers_traites == 50, erreurs
+        statistiques = trieur.pipeline.statistiques()
+        assert statistiques["parcours"]["elements"] == 50
+        assert statistiques["deplacement"]["elements"] == 50
+        
+        trieur.restaurer_fichiers()
+        
+        # Annulation depuis la progression : les étapes amont s'arrêtent proprement
+        config["pipeline"] = False
+        trieur = TrieurFichiers(config)
+        fichiers_traites, erreurs = trieur.trier_fichiers(callback=lambda actuel, total: trieur.annuler_tri())
+        assert fichiers_traites == 1
+        assert "annulé" in erreurs[-1]
+        print(f"✅ Pipeline fonctionnel: {statistiques['deplacement']['debit']} fichiers/s")
+
+def test_metriques():
+    """Test du rapport d'exécution et des exports de métriques"""
+    print("\n📈 Test des métriques...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for filename in ["document.pdf", "image.jpg"]:
+            with open(os.path.join(temp_dir, filename), 'w') as f:
+                f.write("contenu de test")
+        
+        fichier_prometheus = os.path.join(temp_dir, ".trieur.prom")
+        config = {"dossier_source": temp_dir, "type_tri": "type", "fichier_prometheus": fichier_prometheus}
+        trieur = TrieurFichiers(config)
+        
+        rapport = trieur.trier_fichiers()
+        fichiers_traites, erreurs = rapport
+        assert fichiers_traites == 2, erreurs
+        
+        donnees = rapport.metriques.vers_dict()
+        assert donnees["compteurs"]["fichiers_deplaces"] == 2
+        for phase in ("parcours", "classification", "creation_dossier", "deplacement", "ecriture_journal"):
+            assert phase in donnees["phases"], phase
+        
+        with open(fichier_prometheus) as f:
+            contenu = f.read()
+        assert 'trieur_duree_phase_secondes_count{execution="tri",phase="deplacement"} 2' in contenu
+        
+        rapport = trieur.restaurer_fichiers()
+        assert rapport.metriques.vers_dict()["phases"]["restauration"]["nombre"] == 2
+        
+        erreurs_rollback = trieur.effectuer_rollback()
+        assert erreurs_rollback == [] and erreurs_rollback.metriques.execution == "rollback"
+        print("✅ Rapport d'exécution et export Prometheus fonctionnels")
+
+def test_generateur_benchmark():
+    """Test du générateur d'arborescences du banc d'essai"""
+    print("\n🎲 Test du générateur d'arborescences...")
+    
+    from benchmark_trieur import generer_arborescence
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        description = generer_arborescence(os.path.join(temp_dir, "a"), 40, graine=7, profondeur=2)
+        generer_arborescence(os.path.join(temp_dir, "b"), 40, graine=7, profondeur=2)
+        
+        def lister(racine):
+            return sorted((os.path.relpath(os.path.join(d, f), racine), os.path.getsize(os.path.join(d, f)))
+                          for d, _, fichiers in os.walk(racine) for f in fichiers)
+        
+        # Même graine, même arborescence
+        assert lister(os.path.join(temp_dir, "a")) == lister(os.path.join(temp_dir, "b"))
+        assert description["nombre"] == 40
+        print("✅ Générateur reproductible")
+
+def test_journalisation_echantillonnee():
+    """Test de l'échantillonnage des messages par fichier et du format JSON Lines"""
+    print("\n📝 Test de la journalisation échantillonnée...")
+    
+    import json
+    import logging
+    from trieur_fichiers_auto import EchantillonneurJournal, FormateurJsonLignes
+    
+    messages = []
+    
+    class Collecteur(logging.Handler):
+        def emit(self, record):
+            messages.append(record)
+    
+    journal = logging.getLogger("test_echantillonnage")
+    journal.propagate = False
+    journal.setLevel(logging.INFO)
+    journal.addHandler(Collecteur())
+    
+    echantillonneur = EchantillonneurJournal(journal, seuil=10, taux=5)
+    for i in range(30):
+        echantillonneur.info("deplacement", "Fichier déplacé: %s", i)
+    # 10 messages intégraux puis un sur 5 (15, 20, 25, 30)
+    assert len(messages) == 14, len(messages)
+    echantillonneur.resumer()
+    assert "16 omis" in messages[-1].getMessage()
+    assert echantillonneur.compteurs == {}
+    
+    ligne = json.loads(FormateurJsonLignes().format(messages[0]))
+    assert ligne["niveau"] == "INFO" and ligne["message"] == "Fichier déplacé: 0"
+    print("✅ Échantillonnage et JSON Lines fonctionnels")
+
+def test_profilage():
+    """Test du mode profilage du tri"""
+    print("\n🔬 Test du profilage...")
+    
+    import json
+    import pstats
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, "source")
+        os.makedirs(source)
+        for filename in ["document.pdf", "image.jpg", "archive.zip"]:
+            with open(os.path.join(source, filename), 'w') as f:
+                f.write("contenu de test")
+        
+        dossier_profils = os.path.join(temp_dir, "profils")
+        config = {"dossier_source": source, "type_tri": "type", "profilage": True,
+                  "dossier_profilage": dossier_profils}
+        trieur = TrieurFichiers(config)
+        rapport = trieur.trier_fichiers()
+        assert rapport.nombre_fichiers == 3, rapport.erreurs
+        
+        fichiers = rapport.metriques.informations["profil"]
+        assert pstats.Stats(fichiers["pstats"]).total_calls > 0
+        assert os.path.isfile(fichiers["piles"])
+        with open(fichiers["appels_systeme"]) as f:
+            appels = json.load(f)
+        # renameat2 (sans écrasement), ou lien physique puis suppression hors Linux
+        renommages = appels["renommer_ou_transferer"]
+        assert renommages.get("renameat2", renommages.get("link")) == 3, appels
+        
+        # Sans le mode profilage, aucun profil n'est produit
+        config["profilage"] = False
+        trieur.restaurer_fichiers()
+        rapport = trieur.trier_fichiers()
+        assert "profil" not in rapport.metriques.informations
+        assert len(os.listdir(dossier_profils)) == 3
+        print("✅ Profil, piles repliées et appels système écrits")
+
+def test_index_sqlite():
+    """Test de l'index SQLite : statistiques sans parcours et dossiers inchangés non relistés"""
+    print("\n📇 Test de l'index SQLite...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for filename in ["document.pdf", "image.jpg", ".cache"]:
+            with open(os.path.join(temp_dir, filename), 'w') as f:
+                f.write("contenu de test")
+        
+        config = {"dossier_source": temp_dir, "type_tri": "type", "sous_dossiers_par_extension": False}
+        trieur = TrieurFichiers(config)
+        rapport = trieur.trier_fichiers()
+        assert rapport.nombre_fichiers == 2, rapport.erreurs
+        
+        statistiques = trieur.statistiques_index()
+        assert [(categorie, nombre) for categorie, nombre, _ in statistiques["categories"]] == \
+            [("Documents", 1), ("Images", 1)]
+        assert len(statistiques["dernier_tri"]) == 2
+        
+        def vieillir_racine():
+            # Hors de la marge de sécurité sur les mtime récents
+            ancien = os.stat(temp_dir).st_mtime_ns - 10 * 10 ** 9
+            os.utime(temp_dir, ns=(ancien, ancien))
+        
+        # Le dossier source a changé pendant le tri : il est relu, puis relevé dans l'index
+        vieillir_racine()
+        rapport = trieur.trier_fichiers()
+        assert rapport.nombre_fichiers == 0
+        assert "dossiers_depuis_index" not in rapport.metriques.vers_dict()["compteurs"]
+        
+        # Dossier inchangé : relu depuis l'index
+        rapport = trieur.trier_fichiers()
+        assert rapport.metriques.vers_dict()["compteurs"]["dossiers_depuis_index"] == 1
+        
+        # Nouveau fichier : le mtime du dossier change, il est relisté
+        with open(os.path.join(temp_dir, "notes.txt"), 'w') as f:
+            f.write("nouveau")
+        vieillir_racine()
+        rapport = trieur.trier_fichiers()
+        assert rapport.nombre_fichiers == 1, rapport.erreurs
+        assert "dossiers_depuis_index" not in rapport.metriques.vers_dict()["compteurs"]
+        assert trieur.statistiques_index()["dernier_tri"][0][0] == os.path.join(temp_dir, "notes.txt")
+        
+        # La restauration retire les fichiers restaurés des statistiques
+        trieur.restaurer_fichiers()
+        assert [(categorie, nombre) for categorie, nombre, _ in trieur.statistiques_index()["categories"]] == \
+            [("Documents", 1), ("Images", 1)]
+        
+        config["index_sqlite"] = False
+        assert trieur.statistiques_index() == {}
+        print("✅ Index SQLite fonctionnel")
+
+def test_retri():
+    """Test du re-tri après changement de configuration"""
+    print("\n🔀 Test du re-tri...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for filename in ["rapport.pdf", "notes.txt", "photo.jpg"]:
+            with open(os.path.join(temp_dir, filename), 'w') as f:
+                f.write("contenu de test")
+        
+        config = {"dossier_source": temp_dir, "type_tri": "type"}
+        trieur = TrieurFichiers(config)
+        assert trieur.trier_fichiers().nombre_fichiers == 3
+        
+        # Catégorie renommée : un seul renommage de dossier, les images ne bougent pas
+        config["noms_dossiers"] = {"Documents": "Docs"}
+        trieur.reinitialiser_caches()
+        rapport = trieur.retrier_fichiers()
+        assert rapport.nombre_fichiers == 2, rapport.erreurs
+        metriques = rapport.metriques.vers_dict()
+        assert metriques["phases"]["renommage_dossier"]["nombre"] == 1
+        assert metriques["compteurs"]["fichiers_inchanges"] == 1
+        assert os.path.isfile(os.path.join(temp_dir, "Docs", "pdf", "rapport.pdf"))
+        assert not os.path.exists(os.path.join(temp_dir, "Documents"))
+        
+        # Sous-dossiers par extension désactivés : fichiers déplacés un par un
+        config["sous_dossiers_par_extension"] = False
+        trieur.reinitialiser_caches()
+        rapport = trieur.retrier_fichiers()
+        assert rapport.nombre_fichiers == 3, rapport.erreurs
+        assert sorted(os.listdir(os.path.join(temp_dir, "Docs"))) == ["notes.txt", "rapport.pdf"]
+        
+        # Rien ne change : aucun déplacement
+        assert trieur.retrier_fichiers().nombre_fichiers == 0
+        
+        # Le journal reste valable pour la restauration
+        fichiers_restaures, erreurs = trieur.restaurer_fichiers()
+        assert fichiers_restaures == 3, erreurs
+        assert sorted(os.listdir(temp_dir)) == ["notes.txt", "photo.jpg", "rapport.pdf"]
+    
+    # Les fichiers des tris précédents sont re-triés aussi, pas seulement ceux du dernier
+    from trieur_fichiers_auto import HistoriqueTri
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(os.path.join(temp_dir, "rapport.pdf"), 'w') as f:
+            f.write("premier tri")
+        config = {"dossier_source": temp_dir, "type_tri": "type", "index_sqlite": True}
+        trieur = TrieurFichiers(config)
+        assert trieur.trier_fichiers().nombre_fichiers == 1
+        with open(os.path.join(temp_dir, "notes.txt"), 'w') as f:
+            f.write("second tri")
+        assert trieur.trier_fichiers().nombre_fichiers == 1
+        
+        config["noms_dossiers"] = {"Documents": "Docs"}
+        trieur.reinitialiser_caches()
+        rapport = trieur.retrier_fichiers()
+        assert rapport.nombre_fichiers == 2, rapport.erreurs
+        assert os.path.isfile(os.path.join(temp_dir, "Docs", "pdf", "rapport.pdf"))
+        assert os.path.isfile(os.path.join(temp_dir, "Docs", "txt", "notes.txt"))
+        actives = HistoriqueTri(temp_dir).entrees_actives()
+        assert sorted(os.path.relpath(destination, temp_dir) for destination in actives) == \
+            [os.path.join("Docs", "pdf", "rapport.pdf"), os.path.join("Docs", "txt", "notes.txt")]
+        assert len({placement["execution"] for placement in actives.values()}) == 2
+        assert [categorie for categorie, _, _ in trieur.statistiques_index()["categories"]] == ["Docs/pdf", "Docs/txt"]
+    print("✅ Re-tri fonctionnel")
+
+def test_historique():
+    """Test de l'historique des tris et de la restauration sélective"""
+    print("\n🗂️  Test de l'historique...")
+    
+    import datetime
+    
+    for index_sqlite in (True, False):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def creer(noms, annee=None):
+                for nom in noms:
+                    chemin = os.path.join(temp_dir, nom)
+                    with open(chemin, 'w') as f:
+                        f.write("contenu de test")
+                    if annee:
+                        horodatage = datetime.datetime(annee, 6, 15).timestamp()
+                        os.utime(chemin, (horodatage, horodatage))
+            
+            config = {"dossier_source": temp_dir, "type_tri": "type", "sous_dossiers_par_extension": False,
+                      "index_sqlite": index_sqlite, "retention_executions": 2}
+            trieur = TrieurFichiers(config)
+            
+            creer(["ancien.pdf", "vacances.jpg"], annee=2020)
+            assert trieur.trier_fichiers().nombre_fichiers == 2
+            creer(["rapport.pdf", "photo.jpg", "notes.txt"])
+            assert trieur.trier_fichiers().nombre_fichiers == 3
+            assert [execution["fichiers_actifs"] for execution in trieur.historique()] == [2, 3]
+            
+            # Le premier tri reste annulable après le second
+            fichiers_restaures, erreurs = trieur.restaurer_fichiers(execution=1)
+            assert fichiers_restaures == 2, erreurs
+            assert os.path.isfile(os.path.join(temp_dir, "ancien.pdf"))
+            
+            # Par catégorie puis par motif glob
+            assert trieur.restaurer_fichiers(categorie="Images").nombre_fichiers == 1
+            assert trieur.restaurer_fichiers(motif="*.txt").nombre_fichiers == 1
+            assert os.path.isfile(os.path.join(temp_dir, "notes.txt"))
+            
+            # Par période de modification
+            trieur.trier_fichiers()
+            rapport = trieur.restaurer_fichiers(periode=("2020-01-01", "2020-12-31"))
+            assert rapport.nombre_fichiers == 2, rapport.erreurs
+            assert os.path.isfile(os.path.join(temp_dir, "vacances.jpg"))
+            
+            # Rétention : au-delà de 2 tris, les plus anciens sont compactés dans la base
+            trieur.trier_fichiers()
+            executions = [execution["execution"] for execution in trieur.historique()]
+            assert executions[0] == 0 and len(executions) == 3, executions
+            
+            # Restauration complète de tout l'historique : plus d'historique ni d'index
+            for execution in executions:
+                trieur.restaurer_fichiers(execution=execution)
+            assert sorted(os.listdir(temp_dir)) == ["ancien.pdf", "notes.txt", "photo.jpg",
+                                                    "rapport.pdf", "vacances.jpg"], os.listdir(temp_dir)
+    print("✅ Historique et restauration sélective fonctionnels")
+
+def test_tri_virtuel():
+    """Test du tri virtuel par liens (aucune donnée déplacée)"""
+    print("\n🔗 Test du tri virtuel...")
+    
+    for mode_vue in ("lien_physique", "reflink", "lien_symbolique"):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            noms = ["document.pdf", "image.jpg"]
+            for filename in noms:
+                with open(os.path.join(temp_dir, filename), 'w') as f:
+                    f.write("contenu de test")
+            
+            config = {"dossier_source": temp_dir, "type_tri": "type", "sous_dossiers_par_extension": False,
+                      "mode_vue": mode_vue}
+            trieur = TrieurFichiers(config)
+            rapport = trieur.trier_fichiers()
+            assert rapport.nombre_fichiers == 2, rapport.erreurs
+            
+            # Les originaux restent en place, la vue pointe vers les mêmes données
+            vue = os.path.join(temp_dir, "Documents", "document.pdf")
+            assert os.path.isfile(os.path.join(temp_dir, "document.pdf"))
+            with open(vue) as f:
+                assert f.read() == "contenu de test"
+            if mode_vue == "lien_physique":
+                assert os.path.samefile(vue, os.path.join(temp_dir, "document.pdf"))
+            
+            # Relancer le tri ne duplique pas la vue
+            assert trieur.trier_fichiers().nombre_fichiers == 0
+            
+            # Restaurer = supprimer la vue
+            fichiers_restaures, erreurs = trieur.restaurer_fichiers()
+            assert fichiers_restaures == 2, erreurs
+            assert sorted(os.listdir(temp_dir)) == noms
+    
+    # Un fichier de la vue de même taille et même date n'est déjà dans la vue que s'il est un lien vers
+    # l'original, ou en mode reflink un clone de même contenu
+    with tempfile.TemporaryDirectory() as temp_dir:
+        original = os.path.join(temp_dir, "document.pdf")
+        with open(original, 'w') as f:
+            f.write("contenu de test")
+        copie, autre = os.path.join(temp_dir, "copie.pdf"), os.path.join(temp_dir, "autre.pdf")
+        shutil.copy2(original, copie)
+        with open(autre, 'w') as f:
+            f.write("contenu de TEST")
+        shutil.copystat(original, autre)
+        infos = os.stat(original)
+        for mode_vue, attendus in (("lien_physique", (False, False)), ("reflink", (True, False))):
+            trieur = TrieurFichiers({"dossier_source": temp_dir, "type_tri": "type", "mode_vue": mode_vue})
+            assert (trieur._deja_dans_vue(original, infos, copie),
+                    trieur._deja_dans_vue(original, infos, autre)) == attendus, mode_vue
+        
+        # Relancé sur une vue où un autre fichier porte le même nom, le tri virtuel lie l'original à côté
+        vue = os.path.join(temp_dir, "Documents", "pdf")
+        os.makedirs(vue)
+        shutil.copy2(autre, os.path.join(vue, "document.pdf"))
+        os.remove(autre)
+        os.remove(copie)
+        config = {"dossier_source": temp_dir, "type_tri": "type", "mode_vue": "lien_physique"}
+        assert TrieurFichiers(config).trier_fichiers().nombre_fichiers == 1
+        assert len(os.listdir(vue)) == 2
+    
+    # Restauration sans historique : le journal de restauration indique le type de lien, et même
+    # un journal sans type de lien ne remplace jamais l'original par un lien vers lui-même
+    import json
+    from trieur_fichiers_auto import DOSSIER_HISTORIQUE
+    for mode_vue in ("lien_symbolique", "lien_physique"):
+        for type_journalise in (True, False):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                original = os.path.join(temp_dir, "doc.pdf")
+                with open(original, 'w') as f:
+                    f.write("contenu de test")
+                config = {"dossier_source": temp_dir, "type_tri": "type", "mode_vue": mode_vue,
+                          "index_sqlite": False}
+                assert TrieurFichiers(config).trier_fichiers().nombre_fichiers == 1
+                shutil.rmtree(os.path.join(temp_dir, DOSSIER_HISTORIQUE))
+                sauvegarde_path = os.path.join(temp_dir, ".trieur_sauvegarde.json")
+                if not type_journalise:
+                    with open(sauvegarde_path) as f:
+                        sauvegarde = json.load(f)
+                    with open(sauvegarde_path, 'w') as f:
+                        json.dump({vue: valeur[0] for vue, valeur in sauvegarde.items()}, f)
+                
+                fichiers_restaures, erreurs = TrieurFichiers(config).restaurer_fichiers()
+                assert fichiers_restaures == 1 and erreurs == [], erreurs
+                assert not os.path.islink(original)
+                with open(original) as f:
+                    assert f.read() == "contenu de test"
+                assert sorted(os.listdir(temp_dir)) == ["doc.pdf"]
+    print("✅ Tri virtuel fonctionnel (liens physiques, reflinks ou repli symbolique)")
+
+def test_ordonnancement_inode():
+    """Test de l'ordonnancement des déplacements par inode"""
+    print("\n📐 Test de l'ordonnancement par inode...")
+    
+    from trieur_fichiers_auto import Deplacement, ordonner_par_inode
+    
+    plan = [Deplacement(f"/src/{nom}", f"/dst/{dossier}/{nom}", 0, 0, inode, 1)
+            for nom, dossier, inode in [("a", "Images", 50), ("b", "Documents", 10),
+                                        ("c", "Images", 5), ("d", "Documents", 30)]]
+    ordre = [deplacement.source[-1] for deplacement in ordonner_par_inode(plan)]
+    # Images (premier inode 5) puis Documents (10), chaque groupe par inode croissant
+    assert ordre == ["c", "a", "b", "d"], ordre
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for filename in ["document.pdf", "image.jpg", "notes.txt"]:
+            with open(os.path.join(temp_dir, filename), 'w') as f:
+                f.write("contenu de test")
+        progression = []
+        trieur = TrieurFichiers({"dossier_source": temp_dir, "type_tri": "type", "ordonnancement": "inode"})
+        rapport = trieur.trier_fichiers(callback=lambda actuel, total: progression.append((actuel, total)))
+        assert rapport.nombre_fichiers == 3, rapport.erreurs
+        assert progression[-1] == (3, 3)
+        assert "ordonnancement" in rapport.metriques.vers_dict()["phases"]
+    print("✅ Ordonnancement par inode fonctionnel")
+
+def test_limitation_debit():
+    """Test de la limitation du débit par seau à jetons"""
+    print("\n🚦 Test de la limitation de débit...")
+    
+    import time
+    from trieur_fichiers_auto import SeauJetons
+    
+    seau = SeauJetons(0)
+    assert seau.consommer(10 ** 9) == 0.0
+    
+    # 20 opérations/s : la capacité (une seconde) est consommée, puis 5 opérations attendent 0,25 s
+    seau.ajuster(20)
+    for _ in range(20):
+        seau.consommer()
+    debut = time.monotonic()
+    for _ in range(5):
+        seau.consommer()
+    assert time.monotonic() - debut >= 0.2
+    assert seau.debit_effectif() > 0
+    assert seau.taille_bloc(64 * 1024 * 1024) == 64 * 1024
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(6):
+            with open(os.path.join(temp_dir, f"document{i}.pdf"), 'w') as f:
+                f.write("contenu de test")
+        trieur = TrieurFichiers({"dossier_source": temp_dir, "type_tri": "type", "limite_operations_par_seconde": 5})
+        trieur.limiteur_operations.jetons = 0
+        debut = time.monotonic()
+        rapport = trieur.trier_fichiers()
+        assert rapport.nombre_fichiers == 6, rapport.erreurs
+        assert time.monotonic() - debut >= 1.0
+        rapport_dict = rapport.metriques.vers_dict()
+        assert "attente_limitation" in rapport_dict["phases"]
+        assert rapport_dict["limitation_debit"]["operations_par_seconde"]["limite"] == 5
+        
+        # Ajustement à chaud : sans limite, la restauration n'attend plus
+        trieur.ajuster_limites(operations_par_seconde=0)
+        rapport = trieur.restaurer_fichiers()
+        assert rapport.nombre_fichiers == 6, rapport.erreurs
+        assert "attente_limitation" not in rapport.metriques.vers_dict()["phases"]
+    print("✅ Limitation de débit fonctionnelle")
+
+def test_voies_deplacement():
+    """Test du déplacement en deux voies (petits et gros fichiers)"""
+    print("\n🛣️  Test des voies de déplacement...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(40):
+            with open(os.path.join(temp_dir, f"note{i}.txt"), 'w') as f:
+                f.write("petit")
+        for i in range(3):
+            with open(os.path.join(temp_dir, f"video{i}.mp4"), 'wb') as f:
+                f.write(b"0" * 4096)
+        
+        progression = []
+        config = {"dossier_source": temp_dir, "type_tri": "type", "voies_deplacement": True,
+                  "categories_tailles": [["Petits", 0], ["Grands", 1024]],
+                  "ouvriers_voie_rapide": 4, "ouvriers_voie_flux": 1}
+        trieur = TrieurFichiers(config)
+        rapport = trieur.trier_fichiers(callback=lambda actuel, total: progression.append((actuel, total)))
+        assert rapport.nombre_fichiers == 43, rapport.erreurs
+        assert progression[-1] == (43, 43), progression[-1]
+        voies = rapport.metriques.vers_dict()["voies"]
+        assert voies["rapide"]["elements"] == 40 and voies["flux"]["elements"] == 3, voies
+        assert voies["flux"]["octets"] == 3 * 4096
+        assert len(os.listdir(os.path.join(temp_dir, "Vidéos", "mp4"))) == 3
+        
+        rapport = TrieurFichiers(config).restaurer_fichiers()
+        assert rapport.nombre_fichiers == 43, rapport.erreurs
+        assert len([f for f in os.listdir(temp_dir) if not f.startswith(".")]) == 43
+        
+        # Même dossier créé par plusieurs ouvriers à la fois : créé, compté et annulable une seule fois
+        import threading
+        import time
+        trieur = TrieurFichiers(config)
+        exists = trieur.systeme_fichiers.exists
+        def exists_lent(chemin):
+            resultat = exists(chemin)
+            time.sleep(0.01)
+            return resultat
+        trieur.systeme_fichiers.exists = exists_lent
+        dossier = os.path.join(temp_dir, "Documents", "txt")
+        ouvriers = [threading.Thread(target=trieur.creer_dossier_securise, args=(dossier,)) for _ in range(8)]
+        for ouvrier in ouvriers:
+            ouvrier.start()
+        for ouvrier in ouvriers:
+            ouvrier.join()
+        assert trieur.metriques.compteurs["dossiers_crees"] == 1
+        assert trieur.operations_realisees == [("create_dir", dossier)]
+    print("✅ Voies de déplacement fonctionnelles")
+
+def test_tri_par_lots():
+    """Test du tri de plusieurs dossiers par lots"""
+    print("\n📚 Test du tri par lots...")
+    
+    from trieur_fichiers_auto import TriParLots
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dossiers = []
+        for nom in ("alice", "bob", "carole"):
+            dossier = os.path.join(temp_dir, nom)
+            os.makedirs(dossier)
+            for filename in ["document.pdf", "image.jpg"]:
+                with open(os.path.join(dossier, filename), 'w') as f:
+                    f.write("contenu de test")
+            dossiers.append(dossier)
+        rapport_json = os.path.join(temp_dir, "lot.json")
+        
+        sources = [dossiers[0], {"dossier_source": dossiers[1], "type_tri": "date"},
+                   dossiers[2], os.path.join(temp_dir, "absent")]
+        lot = TriParLots(sources, {"ouvriers_par_peripherique": 2, "fichier_rapport_json": rapport_json})
+        groupes, invalides = lot.grouper_par_peripherique()
+        assert len(groupes) == 1 and len(invalides) == 1
+        
+        termines = []
+        rapport = lot.executer("trier", callback=lambda n, total, resultat: termines.append(n))
+        assert rapport.nombre_fichiers == 6, rapport.erreurs
+        assert len(rapport.erreurs) == 1 and "absent" in rapport.erreurs[0]
+        assert sorted(termines) == [1, 2, 3, 4]
+        assert [d["dossier_source"] for d in rapport.dossiers] == [s if isinstance(s, str) else s["dossier_source"]
+                                                                  for s in sources]
+        assert os.path.isdir(os.path.join(dossiers[0], "Documents"))
+        assert os.path.isdir(os.path.join(dossiers[1], "Par Date"))
+        assert list(rapport.peripheriques.values())[0]["dossiers"] == 3
+        assert rapport.metriques.compteurs["fichiers_deplaces"] == 6
+        
+        import json
+        with open(rapport_json, encoding="utf-8") as f:
+            assert json.load(f)["fichiers"] == 6
+        assert not os.path.exists(os.path.join(dossiers[0], "lot.json"))
+        
+        rapport = TriParLots(sources[:3]).executer("restaurer")
+        assert rapport.nombre_fichiers == 6, rapport.erreurs
+        
+        # En ligne de commande, le lot part de la configuration enregistrée par l'interface
+        from unittest import mock
+        from trieur_fichiers_auto import main
+        with open(os.path.join(temp_dir, ".trieur_fichiers_config.json"), 'w') as f:
+            json.dump({"type_tri": "date"}, f)
+        with mock.patch.dict(os.environ, {"HOME": temp_dir}), \
+             mock.patch.object(sys, "argv", ["trieur_fichiers_auto.py", "--lot", dossiers[0]]):
+            try:
+                main()
+                assert False, "SystemExit attendue"
+            except SystemExit as fin:
+                assert fin.code == 0
+        assert os.path.isdir(os.path.join(dossiers[0], "Par Date"))
+        assert not os.path.exists(os.path.join(dossiers[0], "Documents"))
+        
+        # Sans interface aussi, SIGUSR1/SIGUSR2 ajustent les limites des trieurs en cours au lieu de
+        # terminer le processus
+        import signal
+        if hasattr(signal, "SIGUSR1"):
+            from trieur_fichiers_auto import installer_signaux_limitation
+            installes = []
+            with mock.patch.dict(os.environ, {"HOME": temp_dir}), \
+                 mock.patch.object(sys, "argv", ["trieur_fichiers_auto.py", "--lot", dossiers[0]]), \
+                 mock.patch("trieur_fichiers_auto.installer_signaux_limitation", installes.append):
+                try:
+                    main()
+                except SystemExit:
+                    pass
+            assert len(installes) == 1 and installes[0].__name__ == "trieurs_en_cours"
+            
+            trieur = TrieurFichiers({"limite_operations_par_seconde": 10})
+            try:
+                installer_signaux_limitation(lambda: [trieur])
+                os.kill(os.getpid(), signal.SIGUSR2)
+                assert trieur.limiteur_operations.debit == 20
+                os.kill(os.getpid(), signal.SIGUSR1)
+                assert trieur.limiteur_operations.debit == 10
+            finally:
+                signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+                signal.signal(signal.SIGUSR2, signal.SIG_DFL)
+    print("✅ Tri par lots fonctionnel")
+
+def test_deplacement_direct():
+    """Test des déplacements tentés directement, sans vérification ni chmod par fichier"""
+    print("\n🎯 Test des déplacements directs...")
+    
+    import errno
+    import stat
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for filename in ["document.pdf", "rapport.pdf", "image.jpg"]:
+            with open(os.path.join(temp_dir, filename), 'w') as f:
+                f.write("contenu de test")
+        lecture_seule = os.path.join(temp_dir, "rapport.pdf")
+        os.chmod(lecture_seule, stat.S_IRUSR)
+        
+        trieur = TrieurFichiers({"dossier_source": temp_dir, "type_tri": "type"})
+        rapport = trieur.trier_fichiers()
+        assert rapport.nombre_fichiers == 3, rapport.erreurs
+        # Le dossier d'origine est vérifié une seule fois, le fichier en lecture seule n'est pas modifié
+        assert rapport.metriques.compteurs["verifications_dossiers"] == 1
+        assert stat.S_IMODE(os.stat(os.path.join(temp_dir, "Documents", "pdf", "rapport.pdf")).st_mode) == stat.S_IRUSR
+        assert "verification_espace" not in rapport.metriques.vers_dict()["phases"]
+        trieur.restaurer_fichiers()
+        
+        # Un échec de droits du système de fichiers devient PermissionError_Custom
+        trieur = TrieurFichiers({"dossier_source": temp_dir, "type_tri": "type"})
+        def renommer_refuse(source, destination):
+            raise OSError(errno.EROFS, "Read-only file system", source)
+        trieur.renommer_ou_transferer = renommer_refuse
+        try:
+            trieur.deplacer_fichier_securise(os.path.join(temp_dir, "image.jpg"),
+                                             os.path.join(temp_dir, "Images", "image.jpg"))
+            assert False, "PermissionError_Custom attendue"
+        except PermissionError_Custom:
+            pass
+        assert os.path.exists(os.path.join(temp_dir, "image.jpg"))
+    print("✅ Déplacements directs fonctionnels")
+
+def test_nouveaux_essais():
+    """Test des nouveaux essais et de la quarantaine après une erreur critique"""
+    print("\n🔁 Test des nouveaux essais et de la quarantaine...")
+    
+    import json
+    
+    def creer_fichiers(dossier):
+        for filename in ["a.pdf", "b.pdf", "verrouille.pdf", "c.pdf"]:
+            with open(os.path.join(dossier, filename), 'w') as f:
+                f.write("contenu de test")
+    
+    def verrouiller(trieur, echecs):
+        # Le fichier "verrouillé" échoue `echecs` fois, puis se déplace normalement
+        deplacer = trieur.deplacer_fichier_securise
+        tentatives = []
+        def deplacer_verrouille(source, destination, taille=None):
+            if source.endswith("verrouille.pdf") and len(tentatives) < echecs:
+                tentatives.append(source)
+                raise PermissionError_Custom(f"Fichier verrouillé: {source}")
+            return deplacer(source, destination, taille)
+        trieur.deplacer_fichier_securise = deplacer_verrouille
+        return tentatives
+    
+    config = {"type_tri": "type", "tentatives_max": 3, "delai_nouvel_essai": 0.01, "pipeline": False}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        creer_fichiers(temp_dir)
+        
+        # Deux échecs puis succès : le tri continue et aucun fichier n'est annulé
+        trieur = TrieurFichiers(dict(config, dossier_source=temp_dir))
+        tentatives = verrouiller(trieur, 2)
+        rapport = trieur.trier_fichiers()
+        assert rapport.nombre_fichiers == 4 and not rapport.erreurs, rapport.erreurs
+        assert len(tentatives) == 2
+        assert rapport.metriques.compteurs["nouveaux_essais"] == 2
+        trieur.restaurer_fichiers()
+        
+        # Échec permanent : quarantaine après trois tentatives, les autres fichiers restent triés
+        trieur = TrieurFichiers(dict(config, dossier_source=temp_dir))
+        verrouiller(trieur, 10)
+        rapport = trieur.trier_fichiers()
+        assert rapport.nombre_fichiers == 3, rapport.erreurs
+        assert len(rapport.erreurs) == 1 and "quarantaine" in rapport.erreurs[0]
+        assert os.path.exists(os.path.join(temp_dir, "verrouille.pdf"))
+        with open(os.path.join(temp_dir, ".trieur_quarantaine.json"), encoding="utf-8") as f:
+            quarantaine = json.load(f)
+        assert quarantaine[os.path.join(temp_dir, "verrouille.pdf")]["tentatives"] == 3
+        
+        # Le tri suivant déplace le fichier et le retire de la quarantaine
+        rapport = TrieurFichiers(dict(config, dossier_source=temp_dir)).trier_fichiers()
+        assert rapport.nombre_fichiers == 1, rapport.erreurs
+        assert not os.path.exists(os.path.join(temp_dir, ".trieur_quarantaine.json"))
+        TrieurFichiers(dict(config, dossier_source=temp_dir)).restaurer_fichiers()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        creer_fichiers(temp_dir)
+        
+        # Dossier refusé puis autorisé entre deux tentatives : le refus n'est pas retenu
+        trieur = TrieurFichiers(dict(config, dossier_source=temp_dir))
+        refus = []
+        def access_retabli(chemin, mode):
+            if not refus:
+                refus.append(chemin)
+                return False
+            return True
+        trieur.systeme_fichiers.access = access_retabli
+        rapport = trieur.trier_fichiers()
+        assert rapport.nombre_fichiers == 4 and not rapport.erreurs, rapport.erreurs
+        assert refus == [temp_dir] and rapport.metriques.compteurs["nouveaux_essais"] == 1
+        assert rapport.metriques.compteurs["verifications_dossiers"] == 2
+        trieur.restaurer_fichiers()
+        
+        # Erreur fatale en cours de tri : les déplacements terminés ne sont annulés qu'en mode tout ou rien
+        for tout_ou_rien in (False, True):
+            trieur = TrieurFichiers(dict(config, dossier_source=temp_dir, tout_ou_rien=tout_ou_rien))
+            entrees = sorted(trieur.parcourir_fichiers(False, []))
+            def plan_interrompu():
+                for entree in entrees[:2]:
+                    yield trieur.planifier_deplacement(entree)
+                raise RuntimeError("panne du plan")
+            rapport = trieur._executer_tri("tri", None, None, plan_interrompu())
+            assert "Erreur fatale" in rapport.erreurs[0] and "panne du plan" in rapport.erreurs[0]
+            restants = sorted(f for f in os.listdir(temp_dir) if f.endswith(".pdf"))
+            if tout_ou_rien:
+                assert rapport.nombre_fichiers == 0 and restants == ["a.pdf", "b.pdf", "c.pdf", "verrouille.pdf"]
+            else:
+                assert rapport.nombre_fichiers == 2 and restants == ["c.pdf", "verrouille.pdf"], restants
+                assert TrieurFichiers(dict(config, dossier_source=temp_dir)).restaurer_fichiers().nombre_fichiers == 2
+        
+        # Mode tout ou rien : la première erreur critique annule le tri entier
+        trieur = TrieurFichiers(dict(config, dossier_source=temp_dir, tout_ou_rien=True))
+        verrouiller(trieur, 10)
+        rapport = trieur.trier_fichiers()
+        assert rapport.nombre_fichiers == 0
+        assert "Erreur critique" in rapport.erreurs[0]
+        assert sorted(f for f in os.listdir(temp_dir) if f.endswith(".pdf")) == \
+            ["a.pdf", "b.pdf", "c.pdf", "verrouille.pdf"]
+    print("✅ Nouveaux essais et quarantaine fonctionnels")
+
+def test_dossier_destination():
+    """Test du tri vers une racine de destination distincte (éventuellement un autre disque)"""
+    print("\n🎯 Test du dossier de destination...")
+    
+    # Un autre système de fichiers (tmpfs) quand il est disponible, sinon un dossier voisin
+    racine_cible = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+    with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory(dir=racine_cible) as destination:
+        os.makedirs(os.path.join(source, "sous"))
+        for filename in ["document.pdf", "image.jpg", os.path.join("sous", "notes.txt")]:
+            with open(os.path.join(source, filename), 'w') as f:
+                f.write("contenu de test")
+        
+        config = {"dossier_source": source, "dossier_destination": destination, "type_tri": "type",
+                  "recursif": True, "copie_pipeline": True}
+        trieur = TrieurFichiers(config)
+        rapport = trieur.trier_fichiers()
+        assert rapport.nombre_fichiers == 3, rapport.erreurs
+        assert os.path.isfile(os.path.join(destination, "Documents", "pdf", "document.pdf"))
+        assert os.path.isfile(os.path.join(destination, "Documents", "txt", "notes.txt"))
+        assert not os.path.exists(os.path.join(source, "Documents"))
+        assert {categorie for categorie, _, _ in trieur.ouvrir_index(creer=False).statistiques_categories()} == \
+            {"Documents/pdf", "Documents/txt", "Images/jpg"}
+        trieur.fermer_index()
+        
+        rapport = TrieurFichiers(config).restaurer_fichiers()
+        assert rapport.nombre_fichiers == 3, rapport.erreurs
+        assert os.path.isfile(os.path.join(source, "sous", "notes.txt"))
+        assert os.listdir(destination) == []
+        
+        # Destination placée dans le dossier source : jamais reparcourue par le tri récursif
+        interne = os.path.join(source, "Trié")
+        config["dossier_destination"] = interne
+        rapport = TrieurFichiers(config).trier_fichiers()
+        assert rapport.nombre_fichiers == 3, rapport.erreurs
+        rapport = TrieurFichiers(config).trier_fichiers()
+        assert rapport.nombre_fichiers == 0
+        TrieurFichiers(config).restaurer_fichiers()
+        assert os.path.isfile(os.path.join(source, "document.pdf"))
+    
+    # Destination prise entre la planification et le déplacement : jamais écrasée, le fichier est renommé
+    with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as destination:
+        with open(os.path.join(source, "document.pdf"), 'w') as f:
+            f.write("contenu de test")
+        trieur = TrieurFichiers({"dossier_source": source, "dossier_destination": destination, "type_tri": "type"})
+        planifier = trieur.planifier_deplacement
+        def planifier_puis_occuper(entree):
+            deplacement = planifier(entree)
+            with open(deplacement.destination, 'w') as f:
+                f.write("autre tri")
+            return deplacement
+        trieur.creer_dossier_securise(os.path.join(destination, "Documents", "pdf"))
+        trieur.planifier_deplacement = planifier_puis_occuper
+        rapport = trieur.trier_fichiers()
+        assert rapport.nombre_fichiers == 1 and rapport.metriques.compteurs["destinations_replanifiees"] == 1
+        noms = sorted(os.listdir(os.path.join(destination, "Documents", "pdf")))
+        assert noms[0] == "document.pdf" and noms[1].startswith("document_"), noms
+        with open(os.path.join(destination, "Documents", "pdf", "document.pdf")) as f:
+            assert f.read() == "autre tri"
+    
+    # Lot de dossiers aux mêmes noms de fichiers vers une même racine, sur plusieurs threads
+    from trieur_fichiers_auto import TriParLots
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = [os.path.join(temp_dir, nom) for nom in ("a", "b", "c")]
+        destination = os.path.join(temp_dir, "trie")
+        for dossier in sources:
+            os.makedirs(dossier)
+            for i in range(100):
+                open(os.path.join(dossier, f"fichier{i}.txt"), 'w').close()
+        rapport = TriParLots(sources, {"type_tri": "type", "dossier_destination": destination,
+                                       "ouvriers_par_peripherique": 3}).executer()
+        assert rapport.nombre_fichiers == 300 and rapport.erreurs == [], rapport.erreurs
+        assert len(os.listdir(os.path.join(destination, "Documents", "txt"))) == 300
+    print("✅ Dossier de destination fonctionnel")
+
+def test_archivage():
+    """Test de l'archivage des périodes anciennes et de la restauration depuis les archives"""
+    import datetime
+    import tarfile
+    from trieur_fichiers_auto import ArchivePeriode, ClassificateurDates
+    print("\n🗜️ Test de l'archivage des périodes...")
+    
+    assert ClassificateurDates.periode("2023-02") == (datetime.datetime(2023, 2, 1), datetime.datetime(2023, 3, 1))
+    assert ClassificateurDates.periode("2023-T4")[1] == datetime.datetime(2024, 1, 1)
+    assert ClassificateurDates.periode("2023-S01")[0] == datetime.datetime(2023, 1, 2)
+    assert ClassificateurDates.periode("Documents") is None
+    
+    ancien = datetime.datetime(2020, 3, 15).timestamp()
+    with tempfile.TemporaryDirectory() as source:
+        contenus = {}
+        for i in range(6):
+            nom = f"releve_{i}.txt"
+            contenus[nom] = f"ligne {i}\n" * (500 * (i + 1))
+            with open(os.path.join(source, nom), 'w') as f:
+                f.write(contenus[nom])
+            # Trois mois de 2020 : trois archives compressées en parallèle
+            date = ancien + 31 * 86400 * (i % 3)
+            os.utime(os.path.join(source, nom), (date, date))
+        with open(os.path.join(source, "recent.txt"), 'w') as f:
+            f.write("récent")
+        
+        for format_archive in ("xz", "gz"):
+            config = {"dossier_source": source, "type_tri": "date", "format_archive": format_archive,
+                      "processus_archivage": 2}
+            assert TrieurFichiers(config).trier_fichiers().nombre_fichiers == 7
+            
+            rapport = TrieurFichiers(config).archiver_periodes()
+            assert rapport.nombre_fichiers == 6, rapport.erreurs
+            assert rapport.metriques.compteurs["periodes_archivees"] == 3
+            dossier_dates = os.path.join(source, "Par Date")
+            assert sorted(os.listdir(dossier_dates)) == sorted(
+                [f"2020-0{mois}.tar.{format_archive}{suffixe}" for mois in (3, 4, 5) for suffixe in ("", ".index.json")]
+                + [datetime.date.today().strftime("%Y-%m")])
+            
+            # Archive standard, lisible par tarfile d'un bloc
+            chemin_archive = os.path.join(dossier_dates, f"2020-03.tar.{format_archive}")
+            with tarfile.open(chemin_archive) as tar:
+                assert tar.getnames() == ["releve_0.txt", "releve_3.txt"]
+            
+            # Extraction d'un seul membre grâce à l'index des positions
+            archive = ArchivePeriode(chemin_archive)
+            extrait = os.path.join(source, "extrait.txt")
+            archive.extraire("releve_3.txt", extrait)
+            with open(extrait) as f:
+                assert f.read() == contenus["releve_3.txt"]
+            # Un fichier recréé à l'emplacement d'origine n'est jamais écrasé
+            with open(extrait, 'w') as f:
+                f.write("recréé")
+            try:
+                archive.extraire("releve_3.txt", extrait)
+                assert False, "FileExistsError attendue"
+            except FileExistsError:
+                pass
+            with open(extrait) as f:
+                assert f.read() == "recréé"
+            assert [nom for nom in os.listdir(source) if nom.startswith("extrait")] == ["extrait.txt"]
+            os.remove(extrait)
+            
+            # Un nouvel archivage ne trouve plus rien à faire
+            assert TrieurFichiers(config).archiver_periodes().nombre_fichiers == 0
+            
+            rapport = TrieurFichiers(config).restaurer_fichiers()
+            assert rapport.nombre_fichiers == 7, rapport.erreurs
+            for nom, contenu in contenus.items():
+                with open(os.path.join(source, nom)) as f:
+                    assert f.read() == contenu
+            assert int(os.path.getmtime(os.path.join(source, "releve_0.txt"))) == int(ancien)
+            assert not os.path.exists(dossier_dates)
+        
+        # Fichier modifié pendant la compression : laissé en place et retiré de l'index, jamais supprimé
+        from unittest import mock
+        import trieur_fichiers_auto
+        config = {"dossier_source": source, "type_tri": "date", "processus_archivage": 1}
+        assert TrieurFichiers(config).trier_fichiers().nombre_fichiers == 7
+        archiver = trieur_fichiers_auto.archiver_dossier_periode
+        def archiver_puis_modifier(dossier, chemin_archive, format_archive):
+            resultat = archiver(dossier, chemin_archive, format_archive)
+            if os.path.basename(dossier) == "2020-03":
+                with open(os.path.join(dossier, "releve_3.txt"), 'a') as f:
+                    f.write("ajout pendant la compression")
+            return resultat
+        with mock.patch.object(trieur_fichiers_auto, "archiver_dossier_periode", archiver_puis_modifier):
+            rapport = TrieurFichiers(config).archiver_periodes()
+        assert rapport.nombre_fichiers == 5, rapport.erreurs
+        assert rapport.metriques.compteurs["fichiers_modifies_archivage"] == 1
+        modifie = os.path.join(source, "Par Date", "2020-03", "releve_3.txt")
+        with open(modifie) as f:
+            assert f.read() == contenus["releve_3.txt"] + "ajout pendant la compression"
+        archive = ArchivePeriode(os.path.join(source, "Par Date", "2020-03.tar.xz"))
+        assert list(archive.index["membres"]) == ["releve_0.txt"]
+        rapport = TrieurFichiers(config).restaurer_fichiers()
+        assert rapport.nombre_fichiers == 7, rapport.erreurs
+        with open(os.path.join(source, "releve_3.txt")) as f:
+            assert f.read().endswith("ajout pendant la compression")
+    
+    # Nombreux petits fichiers : les membres partagent des flux d'environ 1 Mio, et l'archive reste
+    # proche d'un tar compressé d'un seul flux
+    from trieur_fichiers_auto import archiver_dossier_periode
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dossier = os.path.join(temp_dir, "2020-01")
+        os.makedirs(dossier)
+        contenus = {f"journal_{i:04d}.txt": f"entrée {i} : traitement terminé sans erreur\n" * 3 for i in range(1500)}
+        contenus["gros.bin"] = os.urandom(3 * 1024 * 1024)
+        for nom, contenu in contenus.items():
+            with open(os.path.join(dossier, nom), 'wb') as f:
+                f.write(contenu.encode() if isinstance(contenu, str) else contenu)
+        for format_archive in ("xz", "gz"):
+            chemin_archive = os.path.join(temp_dir, f"blocs.tar.{format_archive}")
+            index, _ = archiver_dossier_periode(dossier, chemin_archive, format_archive)
+            assert 1 < len({membre["flux"] for membre in index["membres"].values()}) < 10
+            chemin_reference = os.path.join(temp_dir, f"reference.tar.{format_archive}")
+            with tarfile.open(chemin_reference, f"w:{format_archive}") as tar:
+                for nom in sorted(contenus):
+                    tar.add(os.path.join(dossier, nom), nom)
+            assert os.path.getsize(chemin_archive) < os.path.getsize(chemin_reference) * 1.1
+            archive = ArchivePeriode(chemin_archive)
+            for nom in ("gros.bin", "journal_0000.txt", "journal_0777.txt", "journal_1499.txt"):
+                extrait = os.path.join(temp_dir, "extrait")
+                archive.extraire(nom, extrait)
+                with open(extrait, 'rb') as f:
+                    attendu = contenus[nom]
+                    assert f.read() == (attendu.encode() if isinstance(attendu, str) else attendu), nom
+                os.remove(extrait)
+    print("✅ Archivage des périodes fonctionnel")
+
+def test_plan_deplacements():
+    """Test du plan de tri exporté puis appliqué plus tard, avec validation de chaque entrée"""
+    from trieur_fichiers_auto import PlanDeplacements
+    print("\n🗒️ Test du plan de déplacements...")
+    
+    with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as dossier_plan:
+        for filename in ["document.pdf", "image.jpg", "notes.txt", "musique.mp3", "rapport.pdf"]:
+            with open(os.path.join(source, filename), 'w') as f:
+                f.write("contenu de test")
+        chemin_plan = os.path.join(dossier_plan, "nuit.plan")
+        config = {"dossier_source": source, "type_tri": "type", "voies_deplacement": True}
+        
+        # Le calcul du plan ne déplace rien
+        rapport = TrieurFichiers(config).exporter_plan(chemin_plan)
+        assert rapport.nombre_fichiers == 5, rapport.erreurs
+        assert len(os.listdir(source)) == 5
+        plan = PlanDeplacements(chemin_plan)
+        assert plan.entete()["type_tri"] == "type"
+        assert {os.path.relpath(d.destination, source) for d in plan.deplacements()} >= {
+            os.path.join("Documents", "pdf", "document.pdf"), os.path.join("Images", "jpg", "image.jpg")}
+        
+        # Changements survenus entre le calcul et l'application
+        with open(os.path.join(source, "image.jpg"), 'a') as f:
+            f.write(" modifié")
+        os.remove(os.path.join(source, "notes.txt"))
+        os.makedirs(os.path.join(source, "Documents", "pdf"))
+        with open(os.path.join(source, "Documents", "pdf", "rapport.pdf"), 'w') as f:
+            f.write("déjà là")
+        
+        # L'application ne reclasse rien : un changement de mode de tri est sans effet
+        rapport = TrieurFichiers(dict(config, type_tri="taille")).appliquer_plan(chemin_plan)
+        assert rapport.nombre_fichiers == 2, rapport.erreurs
+        compteurs = rapport.metriques.compteurs
+        assert (compteurs["plan_sources_modifiees"], compteurs["plan_sources_disparues"],
+                compteurs["plan_destinations_occupees"]) == (1, 1, 1)
+        assert os.path.isfile(os.path.join(source, "Documents", "pdf", "document.pdf"))
+        assert os.path.isfile(os.path.join(source, "Audio", "mp3", "musique.mp3"))
+        assert os.path.isfile(os.path.join(source, "image.jpg"))
+        with open(os.path.join(source, "Documents", "pdf", "rapport.pdf")) as f:
+            assert f.read() == "déjà là"
+        
+        # Un plan ne s'applique qu'aux racines pour lesquelles il a été calculé
+        rapport = TrieurFichiers(dict(config, dossier_destination=dossier_plan)).appliquer_plan(chemin_plan)
+        assert rapport.nombre_fichiers == 0 and "dossier_destination" in rapport.erreurs[0]
+        
+        # Les fichiers déplacés par le plan se restaurent comme ceux d'un tri
+        assert TrieurFichiers(config).restaurer_fichiers().nombre_fichiers == 2
+        assert os.path.isfile(os.path.join(source, "document.pdf"))
+        
+        # En ligne de commande, un plan absent ou invalide termine proprement en erreur
+        from unittest import mock
+        from trieur_fichiers_auto import main
+        invalide = os.path.join(dossier_plan, "invalide.plan")
+        with open(invalide, 'w') as f:
+            f.write("pas un plan\n")
+        for chemin in (os.path.join(dossier_plan, "absent.plan"), invalide):
+            with mock.patch.dict(os.environ, {"HOME": dossier_plan}), \
+                 mock.patch.object(sys, "argv", ["trieur_fichiers_auto.py", "--appliquer-plan", chemin]):
+                try:
+                    main()
+                    assert False, "SystemExit attendue"
+                except SystemExit as fin:
+                    assert fin.code == 1
+    print("✅ Plan de déplacements fonctionnel")
+
+def test_verification_restauration():
+    """Test de la vérification des fichiers après restauration"""
+    from trieur_fichiers_auto import FICHIER_VERIFICATION
+    print("\n🔎 Test de la vérification après restauration...")
+    
+    with tempfile.TemporaryDirectory() as source:
+        for filename in ["document.pdf", "image.jpg", "notes.txt", "musique.mp3"]:
+            with open(os.path.join(source, filename), 'w') as f:
+                f.write("contenu de test")
+        config = {"dossier_source": source, "type_tri": "type", "empreintes_contenu": True,
+                  "verification_restauration": True, "ouvriers_verification": 2}
+        assert TrieurFichiers(config).trier_fichiers().nombre_fichiers == 4
+        
+        # Restauration fidèle : aucun écart, aucun diff
+        rapport = TrieurFichiers(config).restaurer_fichiers()
+        assert rapport.nombre_fichiers == 4 and rapport.erreurs == []
+        assert rapport.metriques.informations["verification"]["fichiers_verifies"] == 4
+        assert not os.path.exists(os.path.join(source, FICHIER_VERIFICATION))
+        
+        assert TrieurFichiers(config).trier_fichiers().nombre_fichiers == 4
+        # Contenu changé sans changer ni taille ni date : seule l'empreinte le révèle
+        pdf = os.path.join(source, "Documents", "pdf", "document.pdf")
+        infos = os.stat(pdf)
+        with open(pdf, 'w') as f:
+            f.write("contenu de TEST")
+        os.utime(pdf, ns=(infos.st_atime_ns, infos.st_mtime_ns))
+        with open(os.path.join(source, "Documents", "txt", "notes.txt"), 'a') as f:
+            f.write(" allonge")
+        # Fichier déplacé à la main, fichier ajouté dans un dossier de tri
+        shutil.move(os.path.join(source, "Images", "jpg", "image.jpg"), os.path.join(source, "ailleurs.jpg"))
+        with open(os.path.join(source, "Audio", "mp3", "ajout.mp3"), 'w') as f:
+            f.write("ajout")
+        
+        rapport = TrieurFichiers(config).restaurer_fichiers()
+        assert rapport.nombre_fichiers == 3
+        verification = rapport.metriques.informations["verification"]
+        assert (verification["manquants"], verification["modifies"], verification["en_trop"]) == (1, 2, 1)
+        assert any("Vérification" in erreur for erreur in rapport.erreurs)
+        with open(verification["diff"], encoding="utf-8") as f:
+            lignes = f.read().splitlines()[1:]
+        assert sorted(lignes) == sorted([
+            "- image.jpg", "M document.pdf (contenu)", "M notes.txt (taille 23 au lieu de 15, date de modification)",
+            "+ " + os.path.join("Audio", "mp3", "ajout.mp3")])
+    
+    # Fichiers de deux tris restaurés ensemble : l'historique est relu un tri à la fois
+    with tempfile.TemporaryDirectory() as source:
+        config = {"dossier_source": source, "type_tri": "type", "verification_restauration": True}
+        for filename in ["premier.pdf", "second.pdf"]:
+            with open(os.path.join(source, filename), 'w') as f:
+                f.write("contenu de test")
+            assert TrieurFichiers(config).trier_fichiers().nombre_fichiers == 1
+        with open(os.path.join(source, "Documents", "pdf", "premier.pdf"), 'a') as f:
+            f.write(" modifié")
+        rapport = TrieurFichiers(config).restaurer_fichiers(categorie="Documents")
+        assert rapport.nombre_fichiers == 2
+        verification = rapport.metriques.informations["verification"]
+        assert (verification["fichiers_verifies"], verification["modifies"]) == (2, 1), verification
+        with open(verification["diff"], encoding="utf-8") as f:
+            assert f.read().splitlines()[1].startswith("M premier.pdf (taille")
+    print("✅ Vérification après restauration fonctionnelle")
+
+
+def test_systeme_fichiers_memoire():
+    """Test du tri sur le système de fichiers en mémoire, avec pannes injectées"""
+    import errno
+    import json
+    from trieur_fichiers_auto import SystemeFichiers, SystemeFichiersMemoire, FICHIER_QUARANTAINE
+    print("\n🧪 Test du système de fichiers en mémoire...")
+    
+    # Un système de fichiers incomplet est refusé dès sa création, pas au premier appel manquant
+    try:
+        type("Incomplet", (SystemeFichiers,), {"stat": lambda self, chemin: None})()
+        assert False, "TypeError attendue"
+    except TypeError as e:
+        assert "rename_noreplace" in str(e)
+    
+    fs = SystemeFichiersMemoire(["/", "/externe"], latence={"rename": 0.0005})
+    source = "/memoire/source"
+    contenus = {"document.pdf": b"pdf", "image.jpg": b"jpg", "notes.txt": b"txt", "musique.mp3": b"mp3"}
+    for nom, contenu in contenus.items():
+        fs.creer_fichier(f"{source}/{nom}", contenu, mtime=1_700_000_000)
+    fs.creer_fichier(f"{source}/film.mkv", taille=5 * 1024 ** 2)  # Taille simulée, aucun contenu stocké
+    config = {"dossier_source": source, "type_tri": "type", "empreintes_contenu": True,
+              "verification_restauration": True, "tentatives_max": 3, "delai_nouvel_essai": 0.01}
+    
+    # Tri puis restauration sans toucher au disque
+    rapport = TrieurFichiers(config, fs).trier_fichiers()
+    assert rapport.nombre_fichiers == 5 and rapport.erreurs == [], rapport.erreurs
+    assert fs.lire(f"{source}/Documents/pdf/document.pdf") == b"pdf"
+    assert fs.stat(f"{source}/Vidéos/mkv/film.mkv").st_size == 5 * 1024 ** 2
+    assert fs.isfile(f"{source}/.trieur_sauvegarde.json") and not os.path.exists(source)
+    rapport = TrieurFichiers(config, fs).restaurer_fichiers()
+    assert rapport.nombre_fichiers == 5 and rapport.erreurs == [], rapport.erreurs
+    assert sorted(fs.listdir(source)) == sorted(list(contenus) + ["film.mkv"])
+    assert fs.stat(f"{source}/notes.txt").st_mtime_ns == 1_700_000_000 * 10 ** 9
+    
+    # Panne passagère : nouvel essai réussi ; panne permanente : quarantaine
+    fs.injecter_panne("rename", "*/image.jpg", errno.EIO, nombre=1)
+    fs.injecter_panne("rename", "*/musique.mp3", errno.EACCES)
+    rapport = TrieurFichiers(config, fs).trier_fichiers()
+    assert rapport.nombre_fichiers == 4, rapport.erreurs
+    assert rapport.metriques.compteurs["nouveaux_essais"] == 3
+    assert fs.isfile(f"{source}/Images/jpg/image.jpg") and fs.isfile(f"{source}/musique.mp3")
+    with fs.open(f"{source}/{FICHIER_QUARANTAINE}") as f:
+        assert list(json.load(f)) == [f"{source}/musique.mp3"]
+    fs.pannes.clear()
+    assert TrieurFichiers(config, fs).restaurer_fichiers().nombre_fichiers == 4
+    
+    # Destination sur un autre périphérique : le renommage échoue (EXDEV), le fichier est copié
+    rapport = TrieurFichiers(dict(config, dossier_destination="/externe/tri"), fs).trier_fichiers()
+    assert rapport.nombre_fichiers == 5, rapport.erreurs
+    assert fs.operations["copy"] == 5
+    assert fs.stat("/externe/tri/Audio/mp3/musique.mp3").st_dev != fs.stat(source).st_dev
+    assert fs.disk_usage("/externe").used == 5 * 1024 ** 2 + 12
+    rapport = TrieurFichiers(dict(config, dossier_destination="/externe/tri"), fs).restaurer_fichiers()
+    assert rapport.nombre_fichiers == 5 and rapport.erreurs == [], rapport.erreurs
+    assert fs.lire(f"{source}/musique.mp3") == b"mp3" and fs.disk_usage("/externe").used == 0
+    
+    # Le plan de déplacements est écrit et relu sur le même système de fichiers
+    chemin_plan = "/memoire/nuit.plan"
+    assert TrieurFichiers(config, fs).exporter_plan(chemin_plan).nombre_fichiers == 5
+    assert fs.isfile(chemin_plan) and not os.path.exists(chemin_plan)
+    rapport = TrieurFichiers(config, fs).appliquer_plan(chemin_plan)
+    assert rapport.nombre_fichiers == 5 and rapport.erreurs == [], rapport.erreurs
+    assert fs.lire(f"{source}/Documents/pdf/document.pdf") == b"pdf"
+    assert TrieurFichiers(config, fs).restaurer_fichiers().nombre_fichiers == 5
+    
+    # Espace insuffisant sur le périphérique de destination
+    fs.capacite = 1024 ** 2
+    try:
+        fs.copy(f"{source}/film.mkv", "/externe/film.mkv")
+        assert False, "ENOSPC attendu"
+    except OSError as e:
+        assert e.errno == errno.ENOSPC
+    
+    print("✅ Système de fichiers en mémoire OK")
+
+
 if __name__ == "__main__":
     print("🧪 Tests des améliorations du Trieur de Fichiers\n")
     
@@ -130,6 +1462,31 @@ if __name__ == "__main__":
         test_permission_checking()
         test_disk_space_checking()
         test_rollback_mechanism()
+        test_hierarchie_composite()
+        test_categories_configurables()
+        test_tri_recursif()
+        test_motifs_ignores()
+        test_transfert_inter_peripherique()
+        test_pipeline()
+        test_metriques()
+        test_generateur_benchmark()
+        test_journalisation_echantillonnee()
+        test_profilage()
+        test_index_sqlite()
+        test_retri()
+        test_historique()
+        test_tri_virtuel()
+        test_ordonnancement_inode()
+        test_limitation_debit()
+        test_voies_deplacement()
+        test_tri_par_lots()
+        test_deplacement_direct()
+        test_nouveaux_essais()
+        test_dossier_destination()
+        test_archivage()
+        test_plan_deplacements()
+        test_verification_restauration()
+        test_systeme_fichiers_memoire()
         
         print("\n🎉 Tous les tests sont terminés!")
         print("\n📊 Résumé des améliorations implémentées:")
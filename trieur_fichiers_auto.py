@@ -5,11 +5,53 @@ import datetime
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import customtkinter as ctk
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
 import threading
 import logging
+import logging.handlers
+import atexit
+import sys
+import cProfile
+import pstats
 import stat
 import time
+import itertools
+import errno
+import queue
+from collections import Counter, deque
+from contextlib import contextmanager
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+import heapq
+import re
+import sqlite3
+import fnmatch
+import filecmp
+import io
+import tempfile
+import random
+import tarfile
+import lzma
+import zlib
+import concurrent.futures
+import hashlib
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de clonage FICLONE, la vue se replie sur les liens
+    fcntl = None
+
+try:
+    import numpy as np
+except ImportError:  # numpy est optionnel : la classification par lot se replie sur bisect
+    np = None
+
+try:
+    import ctypes
+    _renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    _renameat2.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint)
+except (ImportError, OSError, AttributeError, TypeError):  # Hors Linux (glibc 2.28+) : repli sur link + unlink
+    _renameat2 = None
 
 # Dictionnaire des types de fichiers par extension (vous pouvez ajouter d'autres types si nécessaire)
 TYPES_FICHIERS = {
@@ -34,23 +76,241 @@ TAILLES_FICHIERS = {
 CONFIG_PAR_DEFAUT = {
     "theme": "dark",
     "dossier_source": "",
+    "dossier_destination": "",  # Racine des dossiers triés, éventuellement sur un autre disque (vide = dossier source)
     "type_tri": "type",
     "noms_dossiers": {k: k for k in TYPES_FICHIERS.keys()},
     "tailles_fichiers": {k: k for k in TAILLES_FICHIERS.keys()},
-    "sous_dossiers_par_extension": True
+    "sous_dossiers_par_extension": True,
+    "hierarchie_tri": ["type", "date", "taille"],  # Utilisé par le tri "composite"
+    # Seuils inférieurs (en octets) des catégories de taille, nombre quelconque
+    "categories_tailles": [[k, v[0]] for k, v in TAILLES_FICHIERS.items()],
+    "granularite_date": "mois",  # jour, semaine, mois, trimestre ou annee
+    "recursif": False,  # Inclure les fichiers des sous-dossiers
+    "motifs_ignores": [],  # Motifs supplémentaires (syntaxe .gitignore) à ignorer
+    "fichier_ignore": ".trieurignore",  # Fichier de motifs lu dans le dossier source
+    "pipeline": True,  # Parcours, classification et déplacement en parallèle
+    "taille_files_pipeline": 1000,  # Capacité des files entre les étapes du pipeline
+    "fichier_rapport_json": "",  # Rapport d'exécution JSON écrit après chaque opération (vide = aucun)
+    "fichier_prometheus": "",  # Fichier .prom pour le collecteur textfile de node_exporter (vide = aucun)
+    "niveau_journal": "INFO",  # DEBUG, INFO, WARNING, ERROR
+    "journal_json": False,  # Journal compact au format JSON Lines
+    "dossier_journal": "",  # Dossier de trieur_fichiers.log (vide = $TRIEUR_DOSSIER_JOURNAL, sinon dossier temporaire)
+    "seuil_journal_fichiers": 1000,  # Messages par fichier journalisés intégralement avant échantillonnage
+    "taux_echantillonnage_journal": 100,  # Au-delà du seuil, un message sur N est conservé
+    "profilage": False,  # Profile le tri et la restauration (.pstats, piles repliées, appels système)
+    "dossier_profilage": "",  # Dossier des profils (vide = à côté du fichier journal)
+    "index_sqlite": True,  # Index des dossiers parcourus et des fichiers triés (.trieur_index.sqlite)
+    "retention_executions": 20,  # Tris conservés individuellement dans l'historique (0 = tous), les plus anciens sont compactés
+    "mode_vue": "",  # Tri virtuel sans déplacement : "lien_physique", "reflink" ou "lien_symbolique" (vide = déplacer)
+    "ordonnancement": "parcours",  # Ordre des déplacements : "parcours" (au fil du listing) ou "inode"
+    "limite_operations_par_seconde": 0,  # Déplacements ou liens par seconde au plus (0 = illimité)
+    "limite_octets_par_seconde": 0,  # Débit maximal des copies entre périphériques (0 = illimité)
+    "voies_deplacement": False,  # Déplacements en deux voies parallèles : petits fichiers / gros fichiers
+    "ouvriers_voie_rapide": 8,  # Threads de la voie des petits fichiers
+    "ouvriers_voie_flux": 2,  # Threads de la voie des gros fichiers (catégorie de taille la plus grande)
+    "ouvriers_par_peripherique": 1,  # Tri par lots : dossiers traités simultanément sur un même disque
+    "tout_ou_rien": False,  # Une erreur critique annule tout le tri (sinon le fichier est retenté plus tard)
+    "tentatives_max": 3,  # Tentatives d'un déplacement en échec avant sa mise en quarantaine
+    "delai_nouvel_essai": 0.5,  # Délai (s) avant le premier nouvel essai, doublé à chaque échec
+    "copie_pipeline": False,  # Copies entre disques : lecture anticipée des blocs suivants pendant l'écriture (disques lents)
+    "archivage_age_mois": 12,  # Les dossiers "Par Date" terminés depuis plus de N mois sont archivés
+    "format_archive": "xz",  # Compression des archives de périodes : "xz" ou "gz"
+    "processus_archivage": 0,  # Processus compressant les périodes en parallèle (0 = un par cœur)
+    "empreintes_contenu": False,  # Relève au tri une empreinte BLAKE2 du contenu de chaque fichier
+    "verification_restauration": False,  # Vérifie taille, date (et empreinte) des fichiers après restauration
+    "ouvriers_verification": 8  # Threads de la vérification après restauration
 }
 
+# Motifs toujours ignorés : fichiers cachés, téléchargements partiels, verrous Office
+MOTIFS_IGNORES_PAR_DEFAUT = [
+    ".*",
+    "*.part",
+    "*.crdownload",
+    "*.download",
+    "*.partial",
+    "~$*",
+    "*.trieur-partiel",
+]
+
+# Copie entre périphériques : suffixe du fichier temporaire (reprise possible) et taille des blocs
+SUFFIXE_PARTIEL = ".trieur-partiel"
+TAILLE_BLOC_COPIE = 64 * 1024 * 1024
+# Copie en pipeline entre disques : taille des blocs lus et nombre de blocs lus d'avance
+TAILLE_BLOC_PIPELINE = 64 * 1024 * 1024
+PROFONDEUR_PIPELINE_COPIE = 2
+# Tri sans pipeline et export de plan : fichiers du parcours classés ensemble par taille et par date
+TAILLE_LOT_CLASSIFICATION = 1024
+# Archives des périodes anciennes : compressions possibles, taille des lectures et index des membres
+FORMATS_ARCHIVE = ("xz", "gz")
+TAILLE_BLOC_ARCHIVE = 1024 * 1024
+# Taille (tar non compressé) d'un flux d'archive : au-delà, le membre suivant commence un nouveau flux.
+# L'extraction d'un membre décompresse au plus un flux
+TAILLE_FLUX_ARCHIVE = 1024 * 1024
+SUFFIXE_INDEX_ARCHIVE = ".index.json"
+FICLONE = 0x40049409  # ioctl Linux de clonage (reflink) d'un fichier entier : _IOW(0x94, 9, int)
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1  # renameat2 : échec EEXIST au lieu d'écraser la destination
+MODES_VUE = ("lien_physique", "reflink", "lien_symbolique")
+# Erreurs indiquant qu'un lien ou un clone n'est pas possible ici : repli sur un lien symbolique
+ERREURS_LIEN = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.EINVAL, errno.ENOTTY,
+                errno.EOPNOTSUPP, getattr(errno, "ENOTSUP", errno.EOPNOTSUPP)}
+# Échecs d'un déplacement dus aux droits ou au support : signalés par PermissionError_Custom
+ERREURS_PERMISSION = {errno.EACCES, errno.EPERM, errno.EROFS}
+
+# Fichiers internes de l'application, jamais triés même si un motif les réinclut
+FICHIER_INDEX = ".trieur_index.sqlite"
+DOSSIER_HISTORIQUE = ".trieur_historique"
+FICHIER_QUARANTAINE = ".trieur_quarantaine.json"
+FICHIER_VERIFICATION = ".trieur_verification.diff"
+FICHIERS_INTERNES = {".trieur_sauvegarde.json", FICHIER_INDEX, FICHIER_INDEX + "-journal", DOSSIER_HISTORIQUE,
+                     FICHIER_QUARANTAINE, FICHIER_VERIFICATION}
+# Un dossier modifié moins de 2 s avant son relevé n'est pas mis en cache : une modification
+# dans la même unité de temps du système de fichiers ne changerait pas son mtime
+MARGE_RELEVE_NS = 2 * 10 ** 9
+
+# Fonctions d'entrée/sortie dont le profilage compte les appels système
+FONCTIONS_IO = ("_parcourir", "verifier_permissions_fichier", "verifier_espace_disque", "creer_dossier_securise",
+                "renommer_ou_transferer", "transferer_inter_peripherique", "_copier_bloc",
+                "_synchroniser_dossier", "effectuer_rollback", "_restaurer_fichiers")
+MOTIF_APPEL_SYSTEME = re.compile(r"<built-in method (?:posix|nt|_io)\.(\w+)>")
+APPELS_SYSTEME_CTYPES = ("renameat2",)  # Appels faits par ctypes, invisibles sans leur fonction d'enveloppe
+
+
+
+class FormateurJsonLignes(logging.Formatter):
+    """Formate chaque enregistrement en une ligne JSON compacte"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        donnees = {
+            "t": round(record.created, 3),
+            "niveau": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            donnees["exception"] = self.formatException(record.exc_info)
+        return json.dumps(donnees, ensure_ascii=False, separators=(",", ":"))
+
+
+class GestionnaireFileJournal(logging.handlers.QueueHandler):
+    """
+    Dépose les enregistrements dans une file sans les formater : le formatage et
+    les écritures (fichier, terminal) se font dans le thread du QueueListener
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_ecouteur_journal = None  # QueueListener actif
+_fichier_journal = None  # Fichier journal courant
+NOM_FICHIER_JOURNAL = "trieur_fichiers.log"
+
+
+def chemin_journal(dossier: str = None) -> str:
+    """
+    :param dossier: Dossier du journal (vide = variable TRIEUR_DOSSIER_JOURNAL, sinon dossier temporaire)
+    :return: Chemin du fichier journal, jamais dans le dossier courant
+    """
+    dossier = dossier or os.environ.get("TRIEUR_DOSSIER_JOURNAL") or tempfile.gettempdir()
+    os.makedirs(dossier, exist_ok=True)
+    return os.path.join(dossier, NOM_FICHIER_JOURNAL)
+
+
+def configurer_journalisation(niveau: str = "INFO", format_json: bool = False,
+                              fichier: str = None, taille_max: int = 5 * 1024 * 1024,
+                              nombre_archives: int = 3) -> logging.handlers.QueueListener:
+    """
+    Configure une journalisation non bloquante : les appels au logger déposent les
+    enregistrements dans une file, un thread d'arrière-plan les écrit
+    :param niveau: Niveau minimal ("DEBUG", "INFO", "WARNING"...)
+    :param format_json: Journal compact au format JSON Lines
+    :param fichier: Fichier journal (avec rotation), chemin_journal() par défaut
+    :param taille_max: Taille au-delà de laquelle le fichier journal est archivé
+    :param nombre_archives: Nombre d'archives conservées
+    :return: L'écouteur démarré
+    """
+    global _ecouteur_journal, _fichier_journal
+    
+    _fichier_journal = fichier = fichier or chemin_journal()
+    if format_json:
+        formateur = FormateurJsonLignes()
+    else:
+        formateur = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    
+    gestionnaires = [logging.handlers.RotatingFileHandler(fichier, maxBytes=taille_max,
+                                                          backupCount=nombre_archives, encoding='utf-8'),
+                     logging.StreamHandler()]
+    for gestionnaire in gestionnaires:
+        gestionnaire.setFormatter(formateur)
+    
+    racine = logging.getLogger()
+    if _ecouteur_journal is not None:
+        _ecouteur_journal.stop()
+        for gestionnaire in _ecouteur_journal.handlers:
+            gestionnaire.close()
+    for gestionnaire in list(racine.handlers):
+        if isinstance(gestionnaire, GestionnaireFileJournal):
+            racine.removeHandler(gestionnaire)
+    
+    file_journal = queue.SimpleQueue()
+    racine.addHandler(GestionnaireFileJournal(file_journal))
+    racine.setLevel(getattr(logging, str(niveau).upper(), logging.INFO))
+    
+    _ecouteur_journal = logging.handlers.QueueListener(file_journal, *gestionnaires, respect_handler_level=True)
+    _ecouteur_journal.start()
+    return _ecouteur_journal
+
+
+@atexit.register
+def _arreter_journalisation():
+    # Vide la file avant la fin du programme
+    if _ecouteur_journal is not None:
+        _ecouteur_journal.stop()
+
+
 # Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('trieur_fichiers.log'),
-        logging.StreamHandler()
-    ]
-)
+configurer_journalisation()
 logger = logging.getLogger(__name__)
 
+
+class EchantillonneurJournal:
+    """Limite le volume des messages émis pour chaque fichier traité"""
+    
+    def __init__(self, journal: logging.Logger, seuil: int = 1000, taux: int = 100):
+        """
+        :param journal: Logger cible
+        :param seuil: Nombre de messages d'une même catégorie émis intégralement
+        :param taux: Au-delà du seuil, un message sur `taux` est émis
+        """
+        self.journal = journal
+        self.seuil = seuil
+        self.taux = max(1, taux)
+        self.compteurs = Counter()
+        self._verrou = threading.Lock()
+    
+    def info(self, categorie: str, message: str, *args):
+        """
+        Journalise un message par fichier (formatage paresseux avec %s)
+        :param categorie: Catégorie du message ("deplacement", "creation_dossier"...)
+        """
+        with self._verrou:
+            self.compteurs[categorie] += 1
+            numero = self.compteurs[categorie]
+        if numero <= self.seuil or numero % self.taux == 0:
+            self.journal.info(message, *args)
+    
+    def resumer(self):
+        """
+        Journalise le nombre de messages omis par catégorie, puis remet les compteurs à zéro
+        """
+        with self._verrou:
+            compteurs, self.compteurs = self.compteurs, Counter()
+        for categorie, nombre in sorted(compteurs.items()):
+            omis = nombre - self.seuil - (nombre // self.taux - self.seuil // self.taux)
+            if omis > 0:
+                self.journal.info(f"{nombre} messages '{categorie}' ({omis} omis par échantillonnage)")
+
 class TrieurError(Exception):
     """Exception personnalisée pour les erreurs du trieur"""
     pass
@@ -64,485 +324,4819 @@ class EspaceDisqueError(TrieurError):
     pass
 
 
-class TrieurFichiers:
-    """Classe principale pour la gestion du tri des fichiers"""
-    
-    def __init__(self, config: Dict = None):
-        """
-        Initialise l'outil de tri des fichiers avec la configuration spécifiée
-        :param config: Dictionnaire de configuration
-        """
-        self.config = config or CONFIG_PAR_DEFAUT.copy()
-        self.dossier_source = self.config.get("dossier_source", "")
-        self.sauvegarde = {}  # Pour stocker les emplacements originaux des fichiers
-        self.operations_realisees = []  # Pour le rollback
-        logger.info(f"Initialisation du TrieurFichiers avec dossier: {self.dossier_source}")
+class EntreeFichier(NamedTuple):
+    """Fichier rencontré lors du parcours du dossier source"""
+    chemin: str  # Chemin complet du fichier
+    nom: str  # Nom du fichier
+    infos_stat: os.stat_result  # Résultat de stat obtenu pendant le parcours
+
+
+class Deplacement(NamedTuple):
+    """Déplacement planifié d'un fichier"""
+    source: str  # Chemin complet d'origine
+    destination: str  # Chemin complet de destination (doublons déjà résolus)
+    taille: int  # Taille en octets au moment de la planification
+    mtime_ns: int  # Date de modification (ns) au moment de la planification
+    inode: int  # Numéro d'inode
+    peripherique: int  # Identifiant du périphérique (st_dev)
+
+
+def ordonner_par_inode(deplacements) -> List[Deplacement]:
+    """
+    Regroupe les déplacements par dossier de destination et les ordonne par (st_dev, st_ino),
+    les groupes se suivant dans l'ordre de leur premier inode : les renommages successifs
+    touchent des métadonnées voisines (table d'inodes ext4, disques rotatifs)
+    :param deplacements: Déplacements planifiés (itérable consommé entièrement)
+    :return: Liste ordonnée
+    """
+    groupes = {}
+    for deplacement in deplacements:
+        groupes.setdefault(os.path.dirname(deplacement.destination), []).append(deplacement)
+    for groupe in groupes.values():
+        groupe.sort(key=lambda d: (d.peripherique, d.inode))
+    return [deplacement for groupe in sorted(groupes.values(), key=lambda g: (g[0].peripherique, g[0].inode))
+            for deplacement in groupe]
+
+
+class TriAnnule(TrieurError):
+    """Le tri a été annulé par l'utilisateur"""
+    pass
+
+
+class FiltreIgnore:
+    """Motifs d'exclusion de style .gitignore compilés en expressions régulières"""
     
-    def verifier_permissions_fichier(self, chemin_fichier: str) -> bool:
+    def __init__(self, motifs: List[str]):
         """
-        Vérifie si on a les permissions pour lire et déplacer un fichier
-        :param chemin_fichier: Chemin du fichier à vérifier
-        :return: True si les permissions sont OK
+        Compile une liste de motifs (syntaxe .gitignore)
+        :param motifs: Lignes de motifs ; "#" commente, "!" réinclut, "/" final cible les dossiers
         """
-        try:
-            # Vérifier lecture
-            if not os.access(chemin_fichier, os.R_OK):
-                raise PermissionError_Custom(f"Pas de permission de lecture sur {chemin_fichier}")
-            
-            # Vérifier si le fichier est en lecture seule
-            if not os.access(chemin_fichier, os.W_OK):
-                # Essayer de rendre le fichier modifiable temporairement
-                try:
-                    os.chmod(chemin_fichier, stat.S_IWRITE | stat.S_IREAD)
-                except PermissionError:
-                    raise PermissionError_Custom(f"Fichier en lecture seule et impossible à modifier: {chemin_fichier}")
-            
-            return True
+        # Les motifs consécutifs de même signe sont fusionnés en une seule expression :
+        # le dernier groupe qui correspond décide, comme dans git.
+        self.groupes = []  # (negation, regex tous types, regex dossiers seulement)
+        options = re.IGNORECASE if os.name == "nt" else 0
+        courant = None
+        
+        for ligne in motifs:
+            motif = ligne.rstrip("\n").rstrip()
+            if not motif or motif.startswith("#"):
+                continue
+            negation = motif.startswith("!")
+            if negation:
+                motif = motif[1:]
+            elif motif.startswith("\\"):
+                motif = motif[1:]  # "\#" et "\!" désignent les caractères littéraux
+            dossiers_seulement = motif.endswith("/")
+            motif = motif.rstrip("/")
+            if not motif:
+                continue
             
-        except (OSError, IOError) as e:
-            logger.error(f"Erreur de permissions sur {chemin_fichier}: {e}")
-            raise PermissionError_Custom(f"Erreur de permissions sur {chemin_fichier}: {e}")
+            if courant is None or courant[0] != negation:
+                courant = (negation, [], [])
+                self.groupes.append(courant)
+            courant[2 if dossiers_seulement else 1].append(self._traduire(motif))
+        
+        self.groupes = [
+            (negation,
+             re.compile("|".join(tous), options) if tous else None,
+             re.compile("|".join(dossiers), options) if dossiers else None)
+            for negation, tous, dossiers in self.groupes
+        ]
     
-    def verifier_espace_disque(self, chemin: str, taille_requise: int) -> bool:
+    @staticmethod
+    def _traduire(motif: str) -> str:
         """
-        Vérifie s'il y a suffisamment d'espace disque
-        :param chemin: Chemin du répertoire
-        :param taille_requise: Taille requise en octets
-        :return: True si l'espace est suffisant
+        Traduit un motif .gitignore en expression régulière sur un chemin relatif "a/b/c"
         """
-        try:
-            stat_disque = shutil.disk_usage(chemin)
-            espace_libre = stat_disque.free
-            
-            if espace_libre < taille_requise * 1.1:  # 10% de marge
-                raise EspaceDisqueError(f"Espace disque insuffisant. Requis: {taille_requise}, Disponible: {espace_libre}")
-            
-            return True
-            
-        except OSError as e:
-            logger.error(f"Erreur lors de la vérification de l'espace disque: {e}")
-            raise EspaceDisqueError(f"Impossible de vérifier l'espace disque: {e}")
+        ancre = "/" in motif
+        motif = motif.lstrip("/")
+        regex = []
+        i = 0
+        while i < len(motif):
+            caractere = motif[i]
+            if motif.startswith("**/", i):
+                regex.append("(?:.*/)?")
+                i += 3
+                continue
+            if motif.startswith("/**", i) and i + 3 == len(motif):
+                regex.append("/.*")
+                break
+            if motif.startswith("**", i):
+                regex.append(".*")
+                i += 2
+                continue
+            if caractere == "*":
+                regex.append("[^/]*")
+            elif caractere == "?":
+                regex.append("[^/]")
+            elif caractere == "[":
+                fin = motif.find("]", i + 2)
+                if fin == -1:
+                    regex.append("\\[")
+                else:
+                    classe = motif[i + 1:fin].replace("\\", "\\\\")
+                    if classe.startswith("!"):
+                        classe = "^" + classe[1:]
+                    regex.append(f"[{classe}]")
+                    i = fin
+            else:
+                regex.append(re.escape(caractere))
+            i += 1
+        
+        prefixe = "" if ancre else "(?:.*/)?"
+        return f"(?:{prefixe}{''.join(regex)})\\Z"
     
-    def creer_dossier_securise(self, chemin_dossier: str) -> bool:
+    def est_ignore(self, chemin_relatif: str, est_dossier: bool = False) -> bool:
         """
-        Crée un dossier de manière sécurisée avec gestion d'erreurs
-        :param chemin_dossier: Chemin du dossier à créer
-        :return: True si succès
+        Indique si une entrée doit être ignorée
+        :param chemin_relatif: Chemin relatif au dossier source, séparé par "/"
+        :param est_dossier: True si l'entrée est un dossier
+        :return: True si l'entrée est exclue
         """
-        try:
-            if not os.path.exists(chemin_dossier):
-                os.makedirs(chemin_dossier, exist_ok=True)
-                # Ajouter à la liste des opérations pour rollback
-                self.operations_realisees.append(("create_dir", chemin_dossier))
-                logger.info(f"Dossier créé: {chemin_dossier}")
-            return True
-            
-        except PermissionError as e:
-            logger.error(f"Permission refusée pour créer {chemin_dossier}: {e}")
-            raise PermissionError_Custom(f"Permission refusée pour créer le dossier {chemin_dossier}")
-        except OSError as e:
-            logger.error(f"Erreur système lors de la création de {chemin_dossier}: {e}")
-            raise TrieurError(f"Impossible de créer le dossier {chemin_dossier}: {e}")
+        for negation, regex_tous, regex_dossiers in reversed(self.groupes):
+            if ((regex_tous is not None and regex_tous.match(chemin_relatif))
+                    or (est_dossier and regex_dossiers is not None and regex_dossiers.match(chemin_relatif))):
+                return not negation
+        return False
+
+
+class ClassificateurDates:
+    """Classe des timestamps en périodes à partir de bornes précalculées"""
     
-    def deplacer_fichier_securise(self, source: str, destination: str) -> bool:
+    GRANULARITES = ("jour", "semaine", "mois", "trimestre", "annee")
+    # Forme des étiquettes de chaque granularité, pour retrouver la période d'un dossier
+    MOTIFS_ETIQUETTES = (("jour", re.compile(r"(\d{4})-(\d{2})-(\d{2})")),
+                         ("semaine", re.compile(r"(\d{4})-S(\d{2})")),
+                         ("mois", re.compile(r"(\d{4})-(\d{2})")),
+                         ("trimestre", re.compile(r"(\d{4})-T([1-4])")),
+                         ("annee", re.compile(r"(\d{4})")))
+
+    def __init__(self, granularite: str = "mois"):
         """
-        Déplace un fichier de manière sécurisée avec gestion d'erreurs complète
-        :param source: Chemin source
-        :param destination: Chemin destination
-        :return: True si succès
+        Initialise le classificateur pour une granularité donnée
+        :param granularite: "jour", "semaine", "mois", "trimestre" ou "annee"
         """
-        try:
-            # Vérifications préalables
-            if not os.path.exists(source):
-                raise FileNotFoundError(f"Fichier source introuvable: {source}")
-            
-            # Vérifier les permissions
-            self.verifier_permissions_fichier(source)
-            
-            # Vérifier l'espace disque
-            taille_fichier = os.path.getsize(source)
-            self.verifier_espace_disque(os.path.dirname(destination), taille_fichier)
-            
-            # Créer le dossier de destination
-            self.creer_dossier_securise(os.path.dirname(destination))
-            
-            # Effectuer le déplacement
-            shutil.move(source, destination)
-            
-            # Enregistrer l'opération pour rollback
-            self.operations_realisees.append(("move_file", source, destination))
-            logger.info(f"Fichier déplacé: {source} -> {destination}")
-            
-            return True
-            
-        except FileNotFoundError as e:
-            logger.error(f"Fichier introuvable: {e}")
-            raise
-        except PermissionError_Custom as e:
-            logger.error(f"Erreur de permissions: {e}")
-            raise
-        except EspaceDisqueError as e:
-            logger.error(f"Erreur d'espace disque: {e}")
-            raise
-        except shutil.Error as e:
-            logger.error(f"Erreur lors du déplacement: {e}")
-            raise TrieurError(f"Erreur lors du déplacement de {source} vers {destination}: {e}")
-        except OSError as e:
-            logger.error(f"Erreur système: {e}")
-            raise TrieurError(f"Erreur système lors du déplacement: {e}")
+        if granularite not in self.GRANULARITES:
+            raise TrieurError(f"Granularité de date invalide: {granularite}")
+        self.granularite = granularite
+        self.bornes = []  # Timestamps entiers de début de chaque période (triés)
+        self.etiquettes = []  # Étiquette de la période commençant à bornes[i]
+        self.fin = None  # Timestamp de fin de la dernière période connue
+        self._annees = None  # Années civiles couvertes (première, dernière)
     
-    def effectuer_rollback(self) -> List[str]:
+    def _debut_periode(self, date: datetime.datetime) -> datetime.datetime:
+        if self.granularite == "jour":
+            return datetime.datetime(date.year, date.month, date.day)
+        if self.granularite == "semaine":
+            jour = datetime.datetime(date.year, date.month, date.day)
+            return jour - datetime.timedelta(days=jour.weekday())
+        if self.granularite == "mois":
+            return datetime.datetime(date.year, date.month, 1)
+        if self.granularite == "trimestre":
+            return datetime.datetime(date.year, 3 * ((date.month - 1) // 3) + 1, 1)
+        return datetime.datetime(date.year, 1, 1)
+    
+    def _periode_suivante(self, debut: datetime.datetime) -> datetime.datetime:
+        if self.granularite == "jour":
+            return debut + datetime.timedelta(days=1)
+        if self.granularite == "semaine":
+            return debut + datetime.timedelta(days=7)
+        if self.granularite == "annee":
+            return datetime.datetime(debut.year + 1, 1, 1)
+        mois = debut.month + (1 if self.granularite == "mois" else 3)
+        return datetime.datetime(debut.year + (mois - 1) // 12, (mois - 1) % 12 + 1, 1)
+    
+    def _etiquette(self, debut: datetime.datetime) -> str:
+        if self.granularite == "jour":
+            return f"{debut.year}-{debut.month:02d}-{debut.day:02d}"
+        if self.granularite == "semaine":
+            annee_iso, semaine, _ = debut.isocalendar()
+            return f"{annee_iso}-S{semaine:02d}"
+        if self.granularite == "mois":
+            return f"{debut.year}-{debut.month:02d}"
+        if self.granularite == "trimestre":
+            return f"{debut.year}-T{(debut.month - 1) // 3 + 1}"
+        return f"{debut.year}"
+    
+    def _etendre(self, ts_min: float, ts_max: float):
         """
-        Effectue un rollback des opérations réalisées en cas d'erreur
-        :return: Liste des erreurs rencontrées pendant le rollback
+        Recalcule les bornes pour couvrir les années civiles de ts_min à ts_max
         """
-        erreurs_rollback = []
-        logger.info(f"Début du rollback de {len(self.operations_realisees)} opérations")
-        
-        # Inverser l'ordre des opérations
-        operations_inverses = reversed(self.operations_realisees)
+        premiere = datetime.datetime.fromtimestamp(ts_min).year
+        derniere = datetime.datetime.fromtimestamp(ts_max).year
+        if self._annees:
+            premiere = min(premiere, self._annees[0])
+            derniere = max(derniere, self._annees[1])
         
-        for operation in operations_inverses:
-            try:
-                if operation[0] == "move_file":
-                    source, destination = operation[1], operation[2]
-                    if os.path.exists(destination):
-                        shutil.move(destination, source)
-                        logger.info(f"Rollback: fichier restauré {destination} -> {source}")
-                        
-                elif operation[0] == "create_dir":
-                    dossier = operation[1]
-                    if os.path.exists(dossier) and not os.listdir(dossier):
-                        os.rmdir(dossier)
-                        logger.info(f"Rollback: dossier supprimé {dossier}")
-                        
-            except Exception as e:
-                erreur_msg = f"Erreur lors du rollback de l'opération {operation}: {e}"
-                logger.error(erreur_msg)
-                erreurs_rollback.append(erreur_msg)
+        bornes, etiquettes = [], []
+        debut = self._debut_periode(datetime.datetime(premiere, 1, 1))
+        limite = datetime.datetime(derniere + 1, 1, 1)
+        while debut < limite:
+            bornes.append(int(debut.timestamp()))
+            etiquettes.append(self._etiquette(debut))
+            debut = self._periode_suivante(debut)
         
-        self.operations_realisees.clear()
-        return erreurs_rollback
-
-    def obtenir_type_fichier(self, fichier: str) -> str:
+        self.bornes, self.etiquettes = bornes, etiquettes
+        self.fin = int(debut.timestamp())
+        self._annees = (premiere, derniere)
+    
+    def categorie(self, date_timestamp: float) -> str:
         """
-        Détermine le type d'un fichier en fonction de son extension
-        :param fichier: Chemin du fichier
-        :return: Type du fichier ou "Autres" si inconnu
+        Détermine la période d'un timestamp par recherche dichotomique
+        :param date_timestamp: Timestamp (secondes depuis l'epoch)
+        :return: Étiquette de la période (ex: "2023-01", "2023-S05", "2023-T1")
         """
-        _, extension = os.path.splitext(fichier.lower())
-        for type_fichier, extensions in TYPES_FICHIERS.items():
-            if extension in extensions:
-                return self.config["noms_dossiers"].get(type_fichier, type_fichier)
-        return "Autres"
-
-    def obtenir_categorie_taille(self, taille: int) -> str:
+        ts = int(date_timestamp)
+        if not self.bornes or ts < self.bornes[0] or ts >= self.fin:
+            self._etendre(ts, ts)
+        return self.etiquettes[bisect_right(self.bornes, ts) - 1]
+    
+    def categories_lot(self, dates) -> List[str]:
         """
-        Détermine la catégorie de taille d'un fichier
-        :param taille: Taille du fichier en octets
-        :return: Catégorie de taille
+        Classe un lot de timestamps en une seule passe
+        :param dates: Séquence de timestamps (liste, array ou tableau numpy)
+        :return: Liste des étiquettes de période, dans le même ordre
         """
-        for categorie, (min_taille, max_taille) in TAILLES_FICHIERS.items():
-            if min_taille <= taille < max_taille:
-                return self.config["tailles_fichiers"].get(categorie, categorie)
-        return "Autres"
+        if len(dates) == 0:
+            return []
+        ts_min, ts_max = int(min(dates)), int(max(dates))
+        if not self.bornes or ts_min < self.bornes[0] or ts_max >= self.fin:
+            self._etendre(ts_min, ts_max)
+        
+        etiquettes = self.etiquettes
+        if np is not None:
+            indices = np.searchsorted(self.bornes, np.asarray(dates, dtype=np.int64), side="right") - 1
+            return [etiquettes[i] for i in indices.tolist()]
+        bornes = self.bornes
+        return [etiquettes[bisect_right(bornes, int(ts)) - 1] for ts in dates]
 
-    def obtenir_categorie_date(self, date_timestamp: float) -> str:
+    @classmethod
+    def periode(cls, etiquette: str) -> Optional[Tuple[datetime.datetime, datetime.datetime]]:
         """
-        Détermine la catégorie de date d'un fichier
-        :param date_timestamp: Timestamp de la date de modification du fichier
-        :return: Catégorie de date (ex: "2023-01")
+        Retrouve la période désignée par une étiquette, quelle que soit sa granularité
+        :param etiquette: Étiquette de période (ex: "2023-01", "2023-S05", "2023-T1")
+        :return: (début, début de la période suivante), None si ce n'est pas une étiquette valide
         """
-        date = datetime.datetime.fromtimestamp(date_timestamp)
-        return f"{date.year}-{date.month:02d}"
+        for granularite, motif in cls.MOTIFS_ETIQUETTES:
+            correspondance = motif.fullmatch(etiquette)
+            if correspondance is None:
+                continue
+            nombres = [int(groupe) for groupe in correspondance.groups()]
+            try:
+                if granularite == "jour":
+                    debut = datetime.datetime(*nombres)
+                elif granularite == "semaine":
+                    debut = datetime.datetime.fromisocalendar(nombres[0], nombres[1], 1)
+                elif granularite == "mois":
+                    debut = datetime.datetime(nombres[0], nombres[1], 1)
+                elif granularite == "trimestre":
+                    debut = datetime.datetime(nombres[0], 3 * (nombres[1] - 1) + 1, 1)
+                else:
+                    debut = datetime.datetime(nombres[0], 1, 1)
+            except ValueError:
+                return None
+            return debut, cls(granularite)._periode_suivante(debut)
+        return None
+
+
+class EntreeIndexee:
+    """Entrée de dossier relue depuis l'index, avec l'interface de os.DirEntry utilisée par le parcours"""
+    
+    __slots__ = ("name", "path", "_est_dossier", "_est_fichier", "_infos_stat")
+    
+    def __init__(self, dossier: str, nom: str, est_dossier, est_fichier, infos_stat):
+        self.name = nom
+        self.path = os.path.join(dossier, nom)
+        self._est_dossier = est_dossier
+        self._est_fichier = est_fichier
+        self._infos_stat = infos_stat
+    
+    def is_dir(self, follow_symlinks: bool = False) -> bool:
+        # Le relevé enregistre is_dir(follow_symlinks=False), seul appel fait par le parcours
+        if self._est_dossier is None:
+            self._est_dossier = stat.S_ISDIR(os.lstat(self.path).st_mode)
+        return self._est_dossier
+    
+    def is_file(self) -> bool:
+        # Entrée exclue lors du relevé : son type n'a pas été lu
+        if self._est_fichier is None:
+            self._est_fichier = os.path.isfile(self.path)
+        return self._est_fichier
+    
+    def stat(self) -> os.stat_result:
+        if self._infos_stat is None:
+            self._infos_stat = os.stat(self.path)
+        return self._infos_stat
 
-    def creer_dossier_destination(self, fichier: str) -> str:
+
+class IndexFichiers:
+    """
+    Index SQLite du dossier source : contenu des dossiers parcourus (pour éviter de les
+    relister tant que leur mtime ne change pas) et emplacements des fichiers triés
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS dossiers (
+            chemin TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS entrees (
+            dossier TEXT NOT NULL,
+            nom TEXT NOT NULL,
+            est_dossier INTEGER,
+            est_fichier INTEGER,
+            mode INTEGER,
+            inode INTEGER,
+            peripherique INTEGER,
+            taille INTEGER,
+            mtime_ns INTEGER,
+            PRIMARY KEY (dossier, nom)
+        );
+        CREATE TABLE IF NOT EXISTS executions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            debut REAL NOT NULL,
+            fin REAL NOT NULL,
+            fichiers INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS placements (
+            destination TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            taille INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            categorie TEXT NOT NULL,
+            execution INTEGER NOT NULL REFERENCES executions(id),
+            lien TEXT
+        );
+        CREATE INDEX IF NOT EXISTS placements_categorie ON placements (categorie);
+        CREATE INDEX IF NOT EXISTS placements_execution ON placements (execution);
+    """
+    
+    def __init__(self, chemin: str):
         """
-        Détermine le dossier de destination pour un fichier selon le mode de tri
-        :param fichier: Chemin du fichier
-        :return: Chemin du dossier de destination
+        :param chemin: Fichier de la base SQLite (créé s'il n'existe pas)
         """
-        chemin_complet = os.path.join(self.dossier_source, fichier)
-        
-        try:
-            if not os.path.isfile(chemin_complet):
-                logger.warning(f"Fichier inexistant: {chemin_complet}")
-                return None
-                
-            type_tri = self.config.get("type_tri", "type")
-            
-            if type_tri == "type":
-                type_fichier = self.obtenir_type_fichier(fichier)
-                dossier_destination = os.path.join(self.dossier_source, type_fichier)
-                
-                # Création de sous-dossiers par extension si activé
-                if self.config.get("sous_dossiers_par_extension", True):
-                    _, extension = os.path.splitext(fichier.lower())
-                    extension = extension[1:]  # Supprimer le point
-                    if extension:
-                        dossier_destination = os.path.join(dossier_destination, extension)
-            
-            elif type_tri == "date":
-                try:
-                    date_modif = os.path.getmtime(chemin_complet)
-                    categorie_date = self.obtenir_categorie_date(date_modif)
-                    dossier_destination = os.path.join(self.dossier_source, "Par Date", categorie_date)
-                except OSError as e:
-                    logger.error(f"Impossible d'obtenir la date de modification de {fichier}: {e}")
-                    return None
-            
-            elif type_tri == "taille":
-                try:
-                    taille = os.path.getsize(chemin_complet)
-                    categorie_taille = self.obtenir_categorie_taille(taille)
-                    dossier_destination = os.path.join(self.dossier_source, "Par Taille", categorie_taille)
-                except OSError as e:
-                    logger.error(f"Impossible d'obtenir la taille de {fichier}: {e}")
-                    return None
-            
-            else:
-                logger.error(f"Type de tri invalide: {type_tri}")
+        self.chemin = chemin
+        # Le parcours peut lire l'index depuis le thread du pipeline : accès sérialisés par un verrou
+        self.connexion = sqlite3.connect(chemin, check_same_thread=False)
+        self._verrou = threading.Lock()
+        # Journal persistant : le créer et le supprimer à chaque transaction changerait
+        # le mtime du dossier source et invaliderait son propre relevé
+        self.connexion.execute("PRAGMA journal_mode = PERSIST")
+        with self._verrou, self.connexion:
+            self.connexion.executescript(self.SCHEMA)
+    
+    def fermer(self):
+        with self._verrou:
+            self.connexion.close()
+    
+    def releve_dossier(self, dossier: str, mtime_ns: int):
+        """
+        :param dossier: Chemin du dossier
+        :param mtime_ns: mtime actuel du dossier
+        :return: Liste d'EntreeIndexee si le dossier n'a pas changé depuis son relevé, sinon None
+        """
+        with self._verrou:
+            ligne = self.connexion.execute("SELECT mtime_ns FROM dossiers WHERE chemin = ?", (dossier,)).fetchone()
+            if ligne is None or ligne[0] != mtime_ns:
                 return None
-                
-            return dossier_destination
-            
-        except Exception as e:
-            logger.error(f"Erreur lors de la détermination du dossier de destination pour {fichier}: {e}")
-            return None
-
-    def sauvegarder_emplacement_original(self, fichier: str, chemin_destination: str):
+            lignes = self.connexion.execute(
+                "SELECT nom, est_dossier, est_fichier, mode, inode, peripherique, taille, mtime_ns "
+                "FROM entrees WHERE dossier = ?", (dossier,)).fetchall()
+        
+        entrees = []
+        for nom, est_dossier, est_fichier, mode, inode, peripherique, taille, mtime in lignes:
+            infos_stat = None
+            if mode is not None:
+                infos_stat = os.stat_result((mode, inode, peripherique, 1, 0, 0, taille, 0, mtime // 10 ** 9, 0),
+                                            {"st_mtime": mtime / 10 ** 9, "st_mtime_ns": mtime})
+            entrees.append(EntreeIndexee(dossier, nom,
+                                         None if est_dossier is None else bool(est_dossier),
+                                         None if est_fichier is None else bool(est_fichier), infos_stat))
+        return entrees
+    
+    def enregistrer_releves(self, releves: Dict[str, Tuple[int, list]], invalides=()):
         """
-        Enregistre l'emplacement original d'un fichier pour permettre la restauration
-        :param fichier: Nom du fichier
-        :param chemin_destination: Chemin de destination du fichier
+        Remplace le relevé des dossiers parcourus
+        :param releves: {dossier: (mtime_ns, [(nom, est_dossier, est_fichier, infos_stat)])}
+        :param invalides: Dossiers dont le relevé doit être oublié (modifiés pendant l'exécution)
         """
-        chemin_complet = os.path.join(self.dossier_source, fichier)
-        chemin_destination_complet = os.path.join(chemin_destination, fichier)
-        self.sauvegarde[chemin_destination_complet] = chemin_complet
-
-    def trier_fichiers(self, callback=None) -> Tuple[int, List[str]]:
+        with self._verrou, self.connexion:
+            for dossier in invalides:
+                self.connexion.execute("DELETE FROM dossiers WHERE chemin = ?", (dossier,))
+                self.connexion.execute("DELETE FROM entrees WHERE dossier = ?", (dossier,))
+            for dossier, (mtime_ns, entrees) in releves.items():
+                self.connexion.execute("DELETE FROM entrees WHERE dossier = ?", (dossier,))
+                self.connexion.executemany(
+                    "INSERT OR REPLACE INTO entrees VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((dossier, nom, est_dossier, est_fichier,
+                      *((infos.st_mode, infos.st_ino, infos.st_dev, infos.st_size, infos.st_mtime_ns)
+                        if infos is not None else (None,) * 5))
+                     for nom, est_dossier, est_fichier, infos in entrees))
+                self.connexion.execute("INSERT OR REPLACE INTO dossiers VALUES (?, ?)", (dossier, mtime_ns))
+    
+    def enregistrer_execution(self, execution: int, type_execution: str, debut: float, placements: List[Tuple]):
         """
-        Trie les fichiers selon le mode spécifié avec gestion d'erreurs améliorée
-        :param callback: Fonction de rappel pour mettre à jour la progression
-        :return: Tuple (nombre de fichiers traités, liste des erreurs)
+        Enregistre une exécution et les fichiers qu'elle a placés
+        :param execution: Identifiant de l'exécution dans l'historique
+        :param type_execution: "tri"
+        :param debut: Horodatage de début
+        :param placements: [(destination, source, taille, mtime_ns, categorie, lien)]
         """
-        logger.info(f"Début du tri des fichiers dans {self.dossier_source}")
-        
-        # Vérifications préalables
-        if not self.dossier_source or not os.path.isdir(self.dossier_source):
-            error_msg = "Dossier source invalide ou inexistant"
-            logger.error(error_msg)
-            return 0, [error_msg]
-            
-        try:
-            fichiers = [f for f in os.listdir(self.dossier_source) 
-                       if os.path.isfile(os.path.join(self.dossier_source, f))]
-        except PermissionError as e:
-            error_msg = f"Permission refusée pour lire le dossier source: {e}"
-            logger.error(error_msg)
-            return 0, [error_msg]
-        except OSError as e:
-            error_msg = f"Erreur d'accès au dossier source: {e}"
+        with self._verrou, self.connexion:
+            self.connexion.execute("INSERT OR REPLACE INTO executions (id, type, debut, fin, fichiers) "
+                                   "VALUES (?, ?, ?, ?, ?)",
+                                   (execution, type_execution, debut, time.time(), len(placements)))
+            self.connexion.executemany(
+                "INSERT OR REPLACE INTO placements (destination, source, taille, mtime_ns, categorie, lien, execution) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (placement + (execution,) for placement in placements))
+    
+    def selectionner_placements(self, execution: int = None, categorie: str = None,
+                                periode: Tuple[int, int] = None) -> List[Tuple[str, str, int, int]]:
+        """
+        :param execution: Identifiant d'une exécution
+        :param categorie: Catégorie, sous-catégories comprises ("Documents" inclut "Documents/pdf")
+        :param periode: Bornes (incluses) de la date de modification des fichiers, en nanosecondes
+        :return: [(destination, source, exécution, lien)] des fichiers triés correspondants
+        """
+        conditions, parametres = [], []
+        if execution is not None:
+            conditions.append("execution = ?")
+            parametres.append(execution)
+        if categorie:
+            conditions.append("(categorie = ? OR substr(categorie, 1, ?) = ?)")
+            parametres += [categorie, len(categorie) + 1, categorie + "/"]
+        if periode is not None:
+            conditions.append("mtime_ns BETWEEN ? AND ?")
+            parametres += list(periode)
+        requete = "SELECT destination, source, execution, lien FROM placements"
+        if conditions:
+            requete += " WHERE " + " AND ".join(conditions)
+        with self._verrou:
+            return self.connexion.execute(requete + " ORDER BY destination", parametres).fetchall()
+    
+    def compacter_executions(self, executions: List[int]):
+        """
+        Rattache les fichiers des exécutions compactées à l'exécution de base (0)
+        :param executions: Identifiants compactés dans l'historique
+        """
+        with self._verrou, self.connexion:
+            for execution in executions:
+                self.connexion.execute("UPDATE placements SET execution = 0 WHERE execution = ?", (execution,))
+                self.connexion.execute("DELETE FROM executions WHERE id = ?", (execution,))
+    
+    def supprimer_placements(self, destinations):
+        """
+        :param destinations: Fichiers qui ne sont plus dans leur dossier de tri (restaurés, disparus)
+        """
+        with self._verrou, self.connexion:
+            self.connexion.executemany("DELETE FROM placements WHERE destination = ?",
+                                       ((destination,) for destination in destinations))
+    
+    def contient_placement(self, destination: str) -> bool:
+        """
+        :param destination: Chemin d'un fichier
+        :return: True si c'est l'emplacement d'un fichier trié
+        """
+        with self._verrou:
+            return self.connexion.execute("SELECT 1 FROM placements WHERE destination = ?",
+                                          (destination,)).fetchone() is not None
+    
+    def statistiques_categories(self) -> List[Tuple[str, int, int]]:
+        """
+        :return: [(catégorie, nombre de fichiers, octets)] des fichiers actuellement triés
+        """
+        with self._verrou:
+            return self.connexion.execute(
+                "SELECT categorie, COUNT(*), SUM(taille) FROM placements "
+                "GROUP BY categorie ORDER BY categorie").fetchall()
+    
+    def deplacer_placements(self, deplacements: List[Tuple[str, str, str]]):
+        """
+        :param deplacements: [(ancienne destination, nouvelle destination, nouvelle catégorie)] d'un re-tri
+        """
+        with self._verrou, self.connexion:
+            self.connexion.executemany("UPDATE placements SET destination = ?, categorie = ? WHERE destination = ?",
+                                       ((nouveau, categorie, ancien) for ancien, nouveau, categorie in deplacements))
+    
+    def changements_dernier_tri(self) -> List[Tuple[str, str, int]]:
+        """
+        :return: [(source, destination, taille)] des fichiers déplacés par le dernier tri
+        """
+        with self._verrou:
+            return self.connexion.execute(
+                "SELECT source, destination, taille FROM placements WHERE execution = "
+                "(SELECT MAX(id) FROM executions WHERE type = 'tri') ORDER BY source").fetchall()
+
+
+def renameat2(source: str, destination: str, drapeaux: int) -> int:
+    """
+    Appel système Linux renameat2
+    :return: 0, ou le code errno de l'échec
+    """
+    if _renameat2(AT_FDCWD, os.fsencode(source), AT_FDCWD, os.fsencode(destination), drapeaux) == 0:
+        return 0
+    return ctypes.get_errno()
+
+
+class UtilisationDisque(NamedTuple):
+    """Occupation d'un disque, comme shutil.disk_usage"""
+    total: int
+    used: int
+    free: int
+
+
+class SystemeFichiers(ABC):
+    """
+    Accès au système de fichiers du moteur de tri : parcours, déplacements, restauration,
+    rollback et fichiers de suivi (sauvegarde, historique, quarantaine) passent par cette
+    interface. Les sous-classes fournissent les opérations élémentaires (méthodes abstraites) ;
+    les tests dérivés (exists, isfile, listdir, walk...) s'appuient dessus
+    """
+    
+    # Vrai disque : copies par blocs entre périphériques, tri virtuel, archives et index SQLite
+    local = False
+    
+    @abstractmethod
+    def scandir(self, chemin: str):
+        ...
+    
+    @abstractmethod
+    def stat(self, chemin: str) -> os.stat_result:
+        ...
+    
+    @abstractmethod
+    def lstat(self, chemin: str) -> os.stat_result:
+        ...
+    
+    @abstractmethod
+    def rename(self, source: str, destination: str):
+        ...
+    
+    @abstractmethod
+    def replace(self, source: str, destination: str):
+        ...
+    
+    @abstractmethod
+    def rename_noreplace(self, source: str, destination: str):
+        """Renomme sans jamais écraser : FileExistsError si la destination existe déjà"""
+    
+    @abstractmethod
+    def makedirs(self, chemin: str, exist_ok: bool = False):
+        ...
+    
+    @abstractmethod
+    def rmdir(self, chemin: str):
+        ...
+    
+    @abstractmethod
+    def remove(self, chemin: str):
+        ...
+    
+    @abstractmethod
+    def copy(self, source: str, destination: str):
+        """Copie le contenu et les dates d'un fichier"""
+    
+    @abstractmethod
+    def disk_usage(self, chemin: str) -> UtilisationDisque:
+        ...
+    
+    @abstractmethod
+    def access(self, chemin: str, mode: int) -> bool:
+        ...
+    
+    @abstractmethod
+    def open(self, chemin: str, mode: str = "r", encoding: str = None):
+        ...
+    
+    def exists(self, chemin: str) -> bool:
+        try:
+            self.stat(chemin)
+        except OSError:
+            return False
+        return True
+    
+    def lexists(self, chemin: str) -> bool:
+        try:
+            self.lstat(chemin)
+        except OSError:
+            return False
+        return True
+    
+    def isfile(self, chemin: str) -> bool:
+        try:
+            return stat.S_ISREG(self.stat(chemin).st_mode)
+        except OSError:
+            return False
+    
+    def isdir(self, chemin: str) -> bool:
+        try:
+            return stat.S_ISDIR(self.stat(chemin).st_mode)
+        except OSError:
+            return False
+    
+    def listdir(self, chemin: str) -> List[str]:
+        with self.scandir(chemin) as entrees:
+            return [entree.name for entree in entrees]
+    
+    def walk(self, racine: str, topdown: bool = True) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Comme os.walk, sans suivre les liens ; un dossier illisible est ignoré"""
+        try:
+            with self.scandir(racine) as entrees:
+                entrees = list(entrees)
+        except OSError:
+            return
+        dossiers = [entree.name for entree in entrees if entree.is_dir(follow_symlinks=False)]
+        fichiers = [entree.name for entree in entrees if not entree.is_dir(follow_symlinks=False)]
+        if topdown:
+            yield racine, dossiers, fichiers
+        for nom in dossiers:
+            yield from self.walk(os.path.join(racine, nom), topdown)
+        if not topdown:
+            yield racine, dossiers, fichiers
+    
+    def rmtree(self, chemin: str):
+        """Supprime une arborescence, en ignorant les erreurs"""
+        for dossier, _, fichiers in self.walk(chemin, topdown=False):
+            for nom in fichiers:
+                try:
+                    self.remove(os.path.join(dossier, nom))
+                except OSError:
+                    pass
+            try:
+                self.rmdir(dossier)
+            except OSError:
+                pass
+    
+    def ecrire_atomiquement(self, chemin: str, contenu: str):
+        """Écrit un fichier texte complet puis le renomme : il n'est jamais lu à moitié écrit"""
+        temporaire = f"{chemin}.{os.getpid()}.tmp"
+        with self.open(temporaire, 'w', encoding='utf-8') as f:
+            f.write(contenu)
+        self.replace(temporaire, chemin)
+
+
+class SystemeFichiersLocal(SystemeFichiers):
+    """Disque local : appels directs à os et shutil"""
+    
+    local = True
+    
+    def scandir(self, chemin: str):
+        return os.scandir(chemin)
+    
+    def stat(self, chemin: str) -> os.stat_result:
+        return os.stat(chemin)
+    
+    def lstat(self, chemin: str) -> os.stat_result:
+        return os.lstat(chemin)
+    
+    def rename(self, source: str, destination: str):
+        os.rename(source, destination)
+    
+    def replace(self, source: str, destination: str):
+        os.replace(source, destination)
+    
+    def rename_noreplace(self, source: str, destination: str):
+        if _renameat2 is not None:
+            code = renameat2(source, destination, RENAME_NOREPLACE)
+            if code == 0:
+                return
+            if code not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                raise OSError(code, os.strerror(code), source, None, destination)
+        # renameat2 indisponible ou non géré par ce système de fichiers : le lien physique échoue
+        # lui aussi si la destination existe, puis la source est retirée
+        try:
+            os.link(source, destination, follow_symlinks=False)
+        except OSError as e:
+            if e.errno == errno.EXDEV or e.errno not in ERREURS_LIEN:
+                raise
+            # Ni renameat2 ni liens physiques (FAT, certains partages) : vérification puis renommage
+            if os.path.lexists(destination):
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), destination)
+            os.rename(source, destination)
+            return
+        os.unlink(source)
+    
+    def makedirs(self, chemin: str, exist_ok: bool = False):
+        os.makedirs(chemin, exist_ok=exist_ok)
+    
+    def rmdir(self, chemin: str):
+        os.rmdir(chemin)
+    
+    def remove(self, chemin: str):
+        os.remove(chemin)
+    
+    def copy(self, source: str, destination: str):
+        shutil.copy2(source, destination)
+    
+    def disk_usage(self, chemin: str) -> UtilisationDisque:
+        return UtilisationDisque(*shutil.disk_usage(chemin))
+    
+    def access(self, chemin: str, mode: int) -> bool:
+        return os.access(chemin, mode)
+    
+    def open(self, chemin: str, mode: str = "r", encoding: str = None):
+        return open(chemin, mode, encoding=encoding)
+    
+    def exists(self, chemin: str) -> bool:
+        return os.path.exists(chemin)
+    
+    def lexists(self, chemin: str) -> bool:
+        return os.path.lexists(chemin)
+    
+    def isfile(self, chemin: str) -> bool:
+        return os.path.isfile(chemin)
+    
+    def isdir(self, chemin: str) -> bool:
+        return os.path.isdir(chemin)
+    
+    def listdir(self, chemin: str) -> List[str]:
+        return os.listdir(chemin)
+    
+    def walk(self, racine: str, topdown: bool = True) -> Iterator[Tuple[str, List[str], List[str]]]:
+        return os.walk(racine, topdown=topdown)
+    
+    def rmtree(self, chemin: str):
+        shutil.rmtree(chemin, ignore_errors=True)
+
+
+class _NoeudMemoire:
+    """Fichier ou dossier du système de fichiers en mémoire"""
+    
+    __slots__ = ("enfants", "donnees", "taille", "mtime_ns", "inode", "peripherique")
+    
+    def __init__(self, inode: int, peripherique: int, mtime_ns: int, enfants: Dict = None,
+                 donnees: bytes = None, taille: int = 0):
+        self.enfants = enfants  # {nom: _NoeudMemoire} pour un dossier, None pour un fichier
+        self.donnees = donnees  # Contenu, ou None pour un fichier simulé dont seule la taille compte
+        self.taille = taille
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.peripherique = peripherique
+    
+    def stat(self) -> os.stat_result:
+        mode = stat.S_IFDIR | 0o755 if self.enfants is not None else stat.S_IFREG | 0o644
+        secondes = self.mtime_ns / 10 ** 9
+        return os.stat_result((mode, self.inode, self.peripherique, 1, 0, 0, self.taille,
+                               int(secondes), int(secondes), int(secondes)),
+                              {"st_atime": secondes, "st_mtime": secondes, "st_ctime": secondes,
+                               "st_atime_ns": self.mtime_ns, "st_mtime_ns": self.mtime_ns,
+                               "st_ctime_ns": self.mtime_ns})
+
+
+class _EntreeMemoire:
+    """Entrée d'un listing en mémoire, avec l'interface d'os.DirEntry utilisée par le parcours"""
+    
+    __slots__ = ("name", "path", "_noeud")
+    
+    def __init__(self, dossier: str, nom: str, noeud: _NoeudMemoire):
+        self.name = nom
+        self.path = os.path.join(dossier, nom)
+        self._noeud = noeud
+    
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return self._noeud.enfants is not None
+    
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return self._noeud.enfants is None
+    
+    def is_symlink(self) -> bool:
+        return False
+    
+    def inode(self) -> int:
+        return self._noeud.inode
+    
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        return self._noeud.stat()
+
+
+class _ListingMemoire:
+    """Itérateur de listing refermable, comme celui d'os.scandir"""
+    
+    def __init__(self, entrees: List[_EntreeMemoire]):
+        self._entrees = iter(entrees)
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self) -> _EntreeMemoire:
+        return next(self._entrees)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        self._entrees = iter(())
+
+
+class _FluxTexteMemoire(io.StringIO):
+    """Fichier texte ouvert en mémoire : son contenu est enregistré à la fermeture"""
+    
+    def __init__(self, valeur: str, enregistrer=None):
+        super().__init__(valeur)
+        self._enregistrer = enregistrer
+    
+    def close(self):
+        if not self.closed and self._enregistrer is not None:
+            self._enregistrer(self.getvalue().encode("utf-8"))
+        super().close()
+
+
+class _FluxBinaireMemoire(io.BytesIO):
+    """Fichier binaire ouvert en mémoire : son contenu est enregistré à la fermeture"""
+    
+    def __init__(self, valeur: bytes, enregistrer=None):
+        super().__init__(valeur)
+        self._enregistrer = enregistrer
+    
+    def close(self):
+        if not self.closed and self._enregistrer is not None:
+            self._enregistrer(self.getvalue())
+        super().close()
+
+
+class SystemeFichiersMemoire(SystemeFichiers):
+    """
+    Système de fichiers entièrement en mémoire, pour les tests du moteur et les bancs d'essai de
+    grands volumes sans disque. Chaque point de montage est un périphérique distinct (un
+    renommage de l'un à l'autre échoue avec EXDEV, comme entre deux disques), avec sa capacité.
+    Une latence par opération et des pannes (OSError avec un errno donné, selon un motif de
+    chemin et une probabilité) peuvent être injectées pour simuler disques lents et rafales d'erreurs
+    """
+    
+    def __init__(self, points_montage: List[str] = ("/",), capacite: int = 1 << 40, latence: float = 0.0,
+                 graine: int = 0):
+        """
+        :param points_montage: Dossiers racines de chaque périphérique simulé
+        :param capacite: Capacité (octets) de chaque périphérique
+        :param latence: Durée (s) de chaque opération, ou {opération: durée}
+        :param graine: Graine du tirage des pannes probabilistes (exécutions reproductibles)
+        """
+        self._verrou = threading.RLock()
+        self._inodes = itertools.count(2)
+        self.racine = _NoeudMemoire(1, 1, time.time_ns(), enfants={})
+        self.capacite = capacite
+        self.occupation = Counter()  # Octets occupés par périphérique
+        self.latence = latence
+        self.pannes = []  # [opération, motif, errno, probabilité, nombre restant ou None]
+        self.operations = Counter()  # Opérations effectuées, par nom
+        self._aleatoire = random.Random(graine)
+        for numero, point in enumerate(points_montage, 1):
+            if os.path.normpath(point) != os.sep:
+                self.makedirs(point, exist_ok=True)
+            self._noeud(point).peripherique = numero
+    
+    def injecter_panne(self, operation: str = "*", motif: str = "*", erreur: int = errno.EIO,
+                       probabilite: float = 1.0, nombre: int = None):
+        """
+        Fait échouer des opérations
+        :param operation: Nom de l'opération ("rename", "stat"... ou "*" pour toutes)
+        :param motif: Motif glob sur le chemin concerné
+        :param erreur: errno de l'OSError levée
+        :param probabilite: Probabilité d'échec de chaque opération concernée
+        :param nombre: Nombre maximal d'échecs (None = illimité)
+        """
+        with self._verrou:
+            self.pannes.append([operation, motif, erreur, probabilite, nombre])
+    
+    def _operation(self, nom: str, chemin: str):
+        """Compte l'opération, applique sa latence et, le cas échéant, une panne injectée"""
+        latence = self.latence.get(nom, 0.0) if isinstance(self.latence, dict) else self.latence
+        if latence:
+            time.sleep(latence)  # Hors verrou : les opérations lentes se recouvrent comme sur un disque
+        with self._verrou:
+            self.operations[nom] += 1
+            for panne in self.pannes:
+                operation, motif, erreur, probabilite, nombre = panne
+                if (operation in ("*", nom) and nombre != 0 and fnmatch.fnmatch(chemin, motif)
+                        and (probabilite >= 1 or self._aleatoire.random() < probabilite)):
+                    if nombre is not None:
+                        panne[4] -= 1
+                    raise OSError(erreur, f"{os.strerror(erreur)} (panne injectée)", chemin)
+    
+    @staticmethod
+    def _parties(chemin: str) -> List[str]:
+        return [partie for partie in os.path.normpath(chemin).split(os.sep) if partie]
+    
+    def _noeud(self, chemin: str) -> _NoeudMemoire:
+        noeud = self.racine
+        for partie in self._parties(chemin):
+            if noeud.enfants is None:
+                raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), chemin)
+            noeud = noeud.enfants.get(partie)
+            if noeud is None:
+                raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), chemin)
+        return noeud
+    
+    def _parent(self, chemin: str) -> Tuple[_NoeudMemoire, str]:
+        parent = self._noeud(os.path.dirname(os.path.normpath(chemin)))
+        if parent.enfants is None:
+            raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), chemin)
+        return parent, os.path.basename(os.path.normpath(chemin))
+    
+    def _ecrire(self, chemin: str, donnees: bytes, mtime_ns: int = None, taille: int = None):
+        with self._verrou:
+            parent, nom = self._parent(chemin)
+            ancien = parent.enfants.get(nom)
+            if ancien is not None and ancien.enfants is not None:
+                raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), chemin)
+            taille = len(donnees) if taille is None else taille
+            liberes = ancien.taille if ancien is not None else 0
+            if self.occupation[parent.peripherique] - liberes + taille > self.capacite:
+                raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC), chemin)
+            self.occupation[parent.peripherique] += taille - liberes
+            parent.enfants[nom] = _NoeudMemoire(next(self._inodes), parent.peripherique,
+                                                time.time_ns() if mtime_ns is None else mtime_ns,
+                                                donnees=donnees, taille=taille)
+    
+    def creer_fichier(self, chemin: str, contenu: bytes = b"", mtime: float = None, taille: int = None):
+        """
+        Crée un fichier et ses dossiers parents (préparation des tests et bancs d'essai)
+        :param contenu: Contenu du fichier
+        :param mtime: Date de modification (timestamp), maintenant par défaut
+        :param taille: Taille simulée sans contenu stocké (grands volumes)
+        """
+        with self._verrou:
+            self.makedirs(os.path.dirname(os.path.normpath(chemin)), exist_ok=True)
+            self._ecrire(chemin, None if taille is not None else contenu,
+                         None if mtime is None else int(mtime * 10 ** 9), taille)
+    
+    def lire(self, chemin: str) -> bytes:
+        """:return: Contenu d'un fichier (des zéros pour un fichier simulé par sa seule taille)"""
+        with self._verrou:
+            noeud = self._noeud(chemin)
+            if noeud.enfants is not None:
+                raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), chemin)
+            return noeud.donnees if noeud.donnees is not None else bytes(noeud.taille)
+    
+    def scandir(self, chemin: str) -> _ListingMemoire:
+        self._operation("scandir", chemin)
+        with self._verrou:
+            noeud = self._noeud(chemin)
+            if noeud.enfants is None:
+                raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), chemin)
+            return _ListingMemoire([_EntreeMemoire(chemin, nom, enfant) for nom, enfant in noeud.enfants.items()])
+    
+    def stat(self, chemin: str) -> os.stat_result:
+        self._operation("stat", chemin)
+        with self._verrou:
+            return self._noeud(chemin).stat()
+    
+    def lstat(self, chemin: str) -> os.stat_result:
+        return self.stat(chemin)
+    
+    def rename(self, source: str, destination: str):
+        self._operation("rename", source)
+        self._renommer(source, destination, ecraser=True)
+    
+    def rename_noreplace(self, source: str, destination: str):
+        self._operation("rename", source)
+        self._renommer(source, destination, ecraser=False)
+    
+    def _renommer(self, source: str, destination: str, ecraser: bool):
+        with self._verrou:
+            parent_source, nom_source = self._parent(source)
+            noeud = parent_source.enfants.get(nom_source)
+            if noeud is None:
+                raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), source)
+            parent, nom = self._parent(destination)
+            if parent.peripherique != noeud.peripherique:
+                raise OSError(errno.EXDEV, os.strerror(errno.EXDEV), source)
+            ancien = parent.enfants.get(nom)
+            if ancien is noeud:
+                return
+            if ancien is not None and not ecraser:
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), destination)
+            if ancien is not None:
+                if (ancien.enfants is None) != (noeud.enfants is None):
+                    code = errno.EISDIR if ancien.enfants is not None else errno.ENOTDIR
+                    raise OSError(code, os.strerror(code), destination)
+                if ancien.enfants:
+                    raise OSError(errno.ENOTEMPTY, os.strerror(errno.ENOTEMPTY), destination)
+                self.occupation[parent.peripherique] -= ancien.taille
+            if noeud.enfants is not None and os.path.normpath(destination).startswith(
+                    os.path.normpath(source) + os.sep):
+                raise OSError(errno.EINVAL, os.strerror(errno.EINVAL), destination)
+            parent.enfants[nom] = parent_source.enfants.pop(nom_source)
+    
+    def replace(self, source: str, destination: str):
+        self.rename(source, destination)
+    
+    def makedirs(self, chemin: str, exist_ok: bool = False):
+        self._operation("makedirs", chemin)
+        with self._verrou:
+            noeud = self.racine
+            cree = False
+            for partie in self._parties(chemin):
+                if noeud.enfants is None:
+                    raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), chemin)
+                enfant = noeud.enfants.get(partie)
+                if enfant is None:
+                    enfant = noeud.enfants[partie] = _NoeudMemoire(next(self._inodes), noeud.peripherique,
+                                                                   time.time_ns(), enfants={})
+                    cree = True
+                noeud = enfant
+            if noeud.enfants is None or (not cree and not exist_ok):
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), chemin)
+    
+    def rmdir(self, chemin: str):
+        self._operation("rmdir", chemin)
+        with self._verrou:
+            parent, nom = self._parent(chemin)
+            noeud = self._noeud(chemin)
+            if noeud.enfants is None:
+                raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), chemin)
+            if noeud.enfants:
+                raise OSError(errno.ENOTEMPTY, os.strerror(errno.ENOTEMPTY), chemin)
+            del parent.enfants[nom]
+    
+    def remove(self, chemin: str):
+        self._operation("remove", chemin)
+        with self._verrou:
+            parent, nom = self._parent(chemin)
+            noeud = self._noeud(chemin)
+            if noeud.enfants is not None:
+                raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), chemin)
+            self.occupation[noeud.peripherique] -= noeud.taille
+            del parent.enfants[nom]
+    
+    def copy(self, source: str, destination: str):
+        self._operation("copy", source)
+        with self._verrou:
+            noeud = self._noeud(source)
+            if noeud.enfants is not None:
+                raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), source)
+            self._ecrire(destination, noeud.donnees, noeud.mtime_ns, noeud.taille)
+    
+    def disk_usage(self, chemin: str) -> UtilisationDisque:
+        self._operation("disk_usage", chemin)
+        with self._verrou:
+            occupe = self.occupation[self._noeud(chemin).peripherique]
+            return UtilisationDisque(self.capacite, occupe, self.capacite - occupe)
+    
+    def access(self, chemin: str, mode: int) -> bool:
+        try:
+            self._operation("access", chemin)
+            with self._verrou:
+                self._noeud(chemin)
+        except OSError:
+            return False
+        return True
+    
+    def open(self, chemin: str, mode: str = "r", encoding: str = None):
+        self._operation("open", chemin)
+        binaire = "b" in mode
+        with self._verrou:
+            if "r" in mode:
+                donnees = self.lire(chemin)
+                return _FluxBinaireMemoire(donnees) if binaire else _FluxTexteMemoire(donnees.decode("utf-8"))
+            if "x" in mode and self.lexists(chemin):
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), chemin)
+            donnees = self.lire(chemin) if "a" in mode and self.lexists(chemin) else b""
+            self._ecrire(chemin, donnees)  # Le fichier existe dès son ouverture, comme sur disque
+        enregistrer = lambda contenu: self._ecrire(chemin, contenu)
+        flux = (_FluxBinaireMemoire(donnees, enregistrer) if binaire
+                else _FluxTexteMemoire(donnees.decode("utf-8"), enregistrer))
+        flux.seek(0, io.SEEK_END)
+        return flux
+
+
+class HistoriqueTri:
+    """
+    Historique des tris dans .trieur_historique/ : un journal JSON Lines par exécution, en
+    ajout seul (placements du tri, puis restaurations et re-tris de ses fichiers), et un
+    journal de base (000000.jsonl) où la rétention compacte les exécutions anciennes
+    """
+    
+    def __init__(self, dossier_source: str, systeme_fichiers: SystemeFichiers = None):
+        """
+        :param dossier_source: Dossier trié
+        :param systeme_fichiers: Système de fichiers du dossier trié (disque local par défaut)
+        """
+        self.dossier = os.path.join(dossier_source, DOSSIER_HISTORIQUE)
+        self.systeme_fichiers = systeme_fichiers or SystemeFichiersLocal()
+    
+    def _chemin(self, execution: int) -> str:
+        return os.path.join(self.dossier, f"{execution:06d}.jsonl")
+    
+    def identifiants(self) -> List[int]:
+        """
+        :return: Identifiants des journaux présents (0 = base compactée), par ordre croissant
+        """
+        try:
+            noms = self.systeme_fichiers.listdir(self.dossier)
+        except FileNotFoundError:
+            return []
+        return sorted(int(nom[:6]) for nom in noms if len(nom) == 12 and nom.endswith(".jsonl") and nom[:6].isdigit())
+    
+    def creer_execution(self, informations: Dict, placements: List[Tuple], empreintes: Dict[str, str] = None) -> int:
+        """
+        Écrit le journal d'un nouveau tri
+        :param informations: En-tête du journal (début, fin, mode de tri...)
+        :param placements: [(destination, source, taille, mtime_ns, categorie, lien)]
+        :param empreintes: Empreintes du contenu relevées au tri : {destination: empreinte}
+        :return: Identifiant de l'exécution
+        """
+        empreintes = empreintes or {}
+        self.systeme_fichiers.makedirs(self.dossier, exist_ok=True)
+        execution = max(self.identifiants(), default=0) + 1
+        with self.systeme_fichiers.open(self._chemin(execution), 'x', encoding='utf-8') as f:
+            f.write(json.dumps(dict(informations, execution=execution), ensure_ascii=False) + "\n")
+            for destination, source, taille, mtime_ns, categorie, lien in placements:
+                ligne = {"destination": destination, "source": source, "taille": taille,
+                         "mtime_ns": mtime_ns, "categorie": categorie}
+                if lien:
+                    ligne["lien"] = lien
+                if destination in empreintes:
+                    ligne["empreinte"] = empreintes[destination]
+                f.write(json.dumps(ligne, ensure_ascii=False) + "\n")
+        return execution
+    
+    def ajouter(self, execution: int, evenements: List[Dict]):
+        """
+        Ajoute des événements au journal d'une exécution :
+        {"restaure": destination} ou {"ancien": destination, "destination": nouvelle, "categorie": ...}
+        """
+        if not self.systeme_fichiers.isfile(self._chemin(execution)):
+            return
+        with self.systeme_fichiers.open(self._chemin(execution), 'a', encoding='utf-8') as f:
+            for evenement in evenements:
+                f.write(json.dumps(evenement, ensure_ascii=False) + "\n")
+    
+    def lire(self, execution: int, restaures: bool = False) -> Tuple[Dict, Dict[str, Dict]]:
+        """
+        Rejoue le journal d'une exécution
+        :param restaures: Garde aussi les fichiers restaurés (vérification d'une restauration)
+        :return: (en-tête, {destination actuelle: placement}) des fichiers non restaurés
+        """
+        entete, actifs = {}, {}
+        with self.systeme_fichiers.open(self._chemin(execution), 'r', encoding='utf-8') as f:
+            for numero, ligne in enumerate(f):
+                try:
+                    evenement = json.loads(ligne)
+                except ValueError:
+                    continue  # Ligne tronquée par une interruption
+                if numero == 0:
+                    entete = evenement
+                elif "restaure" in evenement:
+                    if not restaures:
+                        actifs.pop(evenement["restaure"], None)
+                elif "ancien" in evenement:
+                    placement = actifs.pop(evenement["ancien"], None)
+                    if placement is not None:
+                        placement["categorie"] = evenement["categorie"]
+                        actifs[evenement["destination"]] = placement
+                else:
+                    actifs[evenement.pop("destination")] = evenement
+        return entete, actifs
+    
+    def executions(self) -> List[Dict]:
+        """
+        :return: En-têtes des exécutions, avec leur nombre de fichiers non restaurés
+        """
+        resultat = []
+        for execution in self.identifiants():
+            entete, actifs = self.lire(execution)
+            resultat.append(dict(entete, execution=execution, fichiers_actifs=len(actifs)))
+        return resultat
+    
+    def entrees_actives(self) -> Dict[str, Dict]:
+        """
+        :return: {destination: placement avec son exécution} de tout l'historique
+        """
+        entrees = {}
+        for execution in self.identifiants():
+            for destination, placement in self.lire(execution)[1].items():
+                entrees[destination] = dict(placement, execution=execution)
+        return entrees
+    
+    def compacter(self, conserver: int) -> List[int]:
+        """
+        Fusionne les exécutions les plus anciennes dans le journal de base
+        :param conserver: Nombre d'exécutions récentes conservées individuellement
+        :return: Identifiants compactés
+        """
+        executions = [execution for execution in self.identifiants() if execution > 0]
+        anciennes = executions[:-conserver] if len(executions) > conserver else []
+        if not anciennes:
+            return []
+        
+        entete, actifs = self.lire(0) if 0 in self.identifiants() else ({}, {})
+        for execution in anciennes:
+            actifs.update(self.lire(execution)[1])
+        
+        temporaire = self._chemin(0) + ".tmp"
+        with self.systeme_fichiers.open(temporaire, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"execution": 0, "compacte": entete.get("compacte", 0) + len(anciennes),
+                                "fin": time.time()}) + "\n")
+            for destination, placement in actifs.items():
+                f.write(json.dumps(dict(placement, destination=destination), ensure_ascii=False) + "\n")
+        self.systeme_fichiers.replace(temporaire, self._chemin(0))
+        for execution in anciennes:
+            self.systeme_fichiers.remove(self._chemin(execution))
+        return anciennes
+    
+    def supprimer(self):
+        self.systeme_fichiers.rmtree(self.dossier)
+
+
+class FluxArchive:
+    """
+    Fichier de sortie d'une archive tar compressée en une suite de flux gzip ou xz indépendants,
+    chacun regroupant les membres d'environ TAILLE_FLUX_ARCHIVE octets de tar. Les flux concaténés
+    forment un .tar.gz / .tar.xz standard, et un membre se relit en ne décompressant que son flux
+    """
+    
+    def __init__(self, sortie, format_archive: str = "xz"):
+        """
+        :param sortie: Fichier binaire ouvert en écriture
+        :param format_archive: "xz" ou "gz"
+        """
+        if format_archive not in FORMATS_ARCHIVE:
+            raise TrieurError(f"Format d'archive invalide: {format_archive}")
+        self.sortie = sortie
+        self.format = format_archive
+        self.position = 0  # Position dans le tar non compressé (tell() pour tarfile)
+        self.octets_compresses = 0
+        self.flux = 0  # Position, dans le fichier compressé, du flux en cours
+        self.debut_flux = 0  # Position, dans le tar non compressé, du début du flux en cours
+        self._compresseur = None
+    
+    def _ecrire_compresse(self, donnees: bytes):
+        if donnees:
+            self.sortie.write(donnees)
+            self.octets_compresses += len(donnees)
+    
+    def write(self, donnees: bytes) -> int:
+        if self._compresseur is None:
+            self._compresseur = (zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if self.format == "gz"
+                                 else lzma.LZMACompressor(format=lzma.FORMAT_XZ))
+        self._ecrire_compresse(self._compresseur.compress(donnees))
+        self.position += len(donnees)
+        return len(donnees)
+    
+    def tell(self) -> int:
+        return self.position
+    
+    def nouveau_flux(self) -> int:
+        """
+        Termine le flux en cours : les données suivantes commencent un nouveau flux
+        :return: Position, dans le fichier compressé, du flux suivant
+        """
+        if self._compresseur is not None:
+            self._ecrire_compresse(self._compresseur.flush())
+            self._compresseur = None
+        self.flux = self.octets_compresses
+        self.debut_flux = self.position
+        return self.octets_compresses
+    
+    def emplacement_membre(self) -> Tuple[int, int]:
+        """
+        Appelé avant l'ajout d'un membre : change de flux si le flux en cours est plein
+        :return: (position du flux dans le fichier compressé, décalage du membre dans le flux décompressé)
+        """
+        if self.position - self.debut_flux >= TAILLE_FLUX_ARCHIVE:
+            self.nouveau_flux()
+        return self.flux, self.position - self.debut_flux
+
+
+class LecteurFlux:
+    """Lecture décompressée d'un seul flux gzip ou xz, à partir de sa position dans l'archive"""
+    
+    def __init__(self, fichier, position: int, format_archive: str = "xz"):
+        """
+        :param fichier: Archive ouverte en lecture binaire
+        :param position: Position du flux dans l'archive
+        :param format_archive: "xz" ou "gz"
+        """
+        fichier.seek(position)
+        self.fichier = fichier
+        self.format = format_archive
+        self._decompresseur = (zlib.decompressobj(16 + zlib.MAX_WBITS) if format_archive == "gz"
+                               else lzma.LZMADecompressor(format=lzma.FORMAT_XZ))
+        self._entree = b""
+    
+    def read(self, taille: int = -1) -> bytes:
+        morceaux = []
+        restant = taille
+        while (taille < 0 or restant > 0) and not self._decompresseur.eof:
+            besoin = not self._entree if self.format == "gz" else self._decompresseur.needs_input
+            if besoin:
+                self._entree = self.fichier.read(TAILLE_BLOC_ARCHIVE)
+                if not self._entree:
+                    raise tarfile.ReadError("Flux d'archive tronqué")
+            # Sortie bornée : un membre très compressible ne se décompresse pas d'un bloc en mémoire
+            donnees = self._decompresseur.decompress(self._entree, restant if taille >= 0 else TAILLE_BLOC_ARCHIVE)
+            self._entree = self._decompresseur.unconsumed_tail if self.format == "gz" else b""
+            morceaux.append(donnees)
+            restant -= len(donnees)
+        return b"".join(morceaux)
+    
+    def sauter(self, taille: int):
+        """
+        Décompresse et ignore les `taille` premiers octets (membres précédents du même flux)
+        """
+        while taille > 0:
+            donnees = self.read(min(taille, TAILLE_BLOC_ARCHIVE))
+            if not donnees:
+                raise tarfile.ReadError("Flux d'archive tronqué")
+            taille -= len(donnees)
+
+
+def archiver_dossier_periode(dossier: str, chemin_archive: str, format_archive: str = "xz") -> Tuple[Dict, float]:
+    """
+    Archive un dossier de période, dans un processus du pool d'archivage. Chaque fichier est lu
+    par blocs directement dans l'archive, sans copie intermédiaire ; l'index écrit à côté de
+    l'archive donne, pour chaque membre, la position de son flux compressé et sa position dans ce
+    flux une fois décompressé. Les originaux ne sont pas supprimés ici : le processus principal le
+    fait une fois l'archive et son index en place
+    :param dossier: Dossier de la période
+    :param chemin_archive: Archive à créer
+    :param format_archive: "xz" ou "gz"
+    :return: (index {"format", "dossier", "membres": {nom: {"flux", "decalage", "taille", "mtime_ns"}}},
+              durée en secondes)
+    """
+    debut = time.perf_counter()
+    membres = {}
+    temporaire = chemin_archive + SUFFIXE_PARTIEL
+    try:
+        with open(temporaire, 'wb') as sortie:
+            flux = FluxArchive(sortie, format_archive)
+            with tarfile.open(fileobj=flux, mode="w", format=tarfile.PAX_FORMAT) as tar:
+                for racine, dossiers, fichiers in os.walk(dossier):
+                    dossiers.sort()
+                    for nom in sorted(fichiers):
+                        chemin = os.path.join(racine, nom)
+                        nom_membre = os.path.relpath(chemin, dossier).replace(os.sep, "/")
+                        infos = tar.gettarinfo(chemin, nom_membre)
+                        if not infos.isreg():
+                            continue  # Liens et fichiers spéciaux restent dans le dossier
+                        position, decalage = flux.emplacement_membre()
+                        with open(chemin, 'rb') as f:
+                            # Date relevée avant la lecture : une modification pendant la compression
+                            # la change, et le fichier est alors conservé (voir _archiver_periodes)
+                            mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+                            tar.addfile(infos, f)
+                        membres[nom_membre] = {"flux": position, "decalage": decalage, "taille": infos.size,
+                                               "mtime_ns": mtime_ns}
+            flux.nouveau_flux()
+            sortie.flush()
+            os.fsync(sortie.fileno())
+        os.replace(temporaire, chemin_archive)
+    except BaseException:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+        raise
+    index = {"format": format_archive, "dossier": os.path.basename(dossier), "membres": membres}
+    MetriquesExecution._ecrire_atomiquement(chemin_archive + SUFFIXE_INDEX_ARCHIVE,
+                                            json.dumps(index, ensure_ascii=False, indent=2))
+    return index, time.perf_counter() - debut
+
+
+class ArchivePeriode:
+    """
+    Archive d'un dossier de période ("Par Date/2023-01.tar.xz") et son index de membres
+    ("2023-01.tar.xz.index.json"). Les membres restaurés sont retirés de l'index ; l'archive
+    est supprimée quand il n'en reste plus
+    """
+    
+    def __init__(self, chemin: str):
+        """
+        :param chemin: Chemin de l'archive
+        """
+        self.chemin = chemin
+        self.chemin_index = chemin + SUFFIXE_INDEX_ARCHIVE
+        with open(self.chemin_index, 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+    
+    @staticmethod
+    def nouveau_chemin(dossier: str, format_archive: str) -> str:
+        """
+        :param dossier: Dossier de période à archiver
+        :param format_archive: "xz" ou "gz"
+        :return: Chemin libre pour son archive (2023-01.tar.xz, puis 2023-01.2.tar.xz...)
+        """
+        for numero in itertools.count(1):
+            suffixe = f".{numero}" if numero > 1 else ""
+            chemin = f"{dossier}{suffixe}.tar.{format_archive}"
+            if not os.path.exists(chemin) and not os.path.exists(chemin + SUFFIXE_INDEX_ARCHIVE):
+                return chemin
+    
+    @classmethod
+    def du_dossier(cls, dossier: str) -> List["ArchivePeriode"]:
+        """
+        :param dossier: Dossier de période, archivé ou non
+        :return: Archives indexées de ce dossier
+        """
+        parent, nom = os.path.split(dossier)
+        motif = re.compile(re.escape(nom) + r"(?:\.\d+)?\.tar\.(?:" + "|".join(FORMATS_ARCHIVE) + ")")
+        try:
+            noms = os.listdir(parent)
+        except OSError:
+            return []
+        archives = []
+        for nom_archive in sorted(noms):
+            if motif.fullmatch(nom_archive) and nom_archive + SUFFIXE_INDEX_ARCHIVE in noms:
+                try:
+                    archives.append(cls(os.path.join(parent, nom_archive)))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Index d'archive illisible {nom_archive}: {e}")
+        return archives
+    
+    def extraire(self, membre: str, destination: str):
+        """
+        Extrait un membre en ne décompressant que son flux, avec ses droits et sa date de modification
+        :param membre: Nom du membre (chemin relatif au dossier de période)
+        :param destination: Fichier à créer
+        :raises FileExistsError: Si un fichier occupe déjà la destination
+        """
+        entree = self.index["membres"][membre]
+        mtime_ns = entree["mtime_ns"]
+        temporaire = destination + SUFFIXE_PARTIEL
+        try:
+            with open(self.chemin, 'rb') as f:
+                lecteur = LecteurFlux(f, entree["flux"], self.index["format"])
+                lecteur.sauter(entree["decalage"])
+                with tarfile.open(fileobj=lecteur, mode="r|") as tar:
+                    infos = tar.next()
+                    if infos is None or infos.name != membre:
+                        raise TrieurError(f"Index d'archive incohérent pour {membre} dans {self.chemin}")
+                    with open(temporaire, 'wb') as sortie:
+                        shutil.copyfileobj(tar.extractfile(infos), sortie, TAILLE_BLOC_ARCHIVE)
+            os.chmod(temporaire, infos.mode & 0o7777)
+            os.utime(temporaire, ns=(mtime_ns, mtime_ns))  # Date exacte : le tar n'en garde qu'une approximation
+            # Comme une restauration ordinaire : un fichier recréé depuis à l'emplacement d'origine est gardé
+            SystemeFichiersLocal().rename_noreplace(temporaire, destination)
+        except BaseException:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+            raise
+    
+    def retirer(self, membres: List[str]) -> bool:
+        """
+        Retire des membres restaurés de l'index
+        :param membres: Noms des membres
+        :return: True si l'archive, vidée, a été supprimée
+        """
+        for membre in membres:
+            self.index["membres"].pop(membre, None)
+        if self.index["membres"]:
+            MetriquesExecution._ecrire_atomiquement(self.chemin_index,
+                                                    json.dumps(self.index, ensure_ascii=False, indent=2))
+            return False
+        os.remove(self.chemin)
+        os.remove(self.chemin_index)
+        return True
+
+
+class PlanDeplacements:
+    """
+    Plan de tri sérialisé en JSON Lines : un en-tête (racines, mode de tri...), puis une ligne
+    compacte par déplacement [source, destination, taille, mtime_ns, inode, périphérique], les
+    chemins étant relatifs au dossier source et à la racine de destination de l'en-tête
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, chemin: str, systeme_fichiers: SystemeFichiers = None):
+        """
+        :param chemin: Fichier du plan
+        :param systeme_fichiers: Système de fichiers du plan (disque local par défaut)
+        """
+        self.chemin = chemin
+        self.systeme_fichiers = systeme_fichiers or SystemeFichiersLocal()
+    
+    def ecrire(self, entete: Dict, deplacements: Iterator[Deplacement]) -> int:
+        """
+        Écrit le plan (dans un fichier temporaire renommé à la fin : un plan interrompu n'est jamais appliqué)
+        :param entete: En-tête, avec au moins dossier_source et dossier_destination
+        :param deplacements: Déplacements planifiés
+        :return: Nombre de déplacements écrits
+        """
+        source, destination = entete["dossier_source"], entete["dossier_destination"]
+        nombre = 0
+        temporaire = f"{self.chemin}.{os.getpid()}.tmp"
+        try:
+            with self.systeme_fichiers.open(temporaire, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(dict(entete, version=self.VERSION), ensure_ascii=False) + "\n")
+                for d in deplacements:
+                    ligne = [os.path.relpath(d.source, source).replace(os.sep, "/"),
+                             os.path.relpath(d.destination, destination).replace(os.sep, "/"),
+                             d.taille, d.mtime_ns, d.inode, d.peripherique]
+                    f.write(json.dumps(ligne, ensure_ascii=False, separators=(",", ":")) + "\n")
+                    nombre += 1
+            self.systeme_fichiers.replace(temporaire, self.chemin)
+        except BaseException:
+            if self.systeme_fichiers.lexists(temporaire):
+                self.systeme_fichiers.remove(temporaire)
+            raise
+        return nombre
+    
+    def entete(self) -> Dict:
+        """
+        :return: En-tête du plan
+        """
+        with self.systeme_fichiers.open(self.chemin, 'r', encoding='utf-8') as f:
+            entete = json.loads(f.readline())
+        if not isinstance(entete, dict) or entete.get("version") != self.VERSION:
+            raise ValueError(f"{self.chemin} n'est pas un plan de tri (version {self.VERSION})")
+        return entete
+    
+    def deplacements(self) -> Iterator[Deplacement]:
+        """
+        :return: Déplacements du plan, lus au fil de l'eau
+        """
+        with self.systeme_fichiers.open(self.chemin, 'r', encoding='utf-8') as f:
+            entete = json.loads(f.readline())
+            source, destination = entete["dossier_source"], entete["dossier_destination"]
+            for ligne in f:
+                chemin_source, chemin_destination, taille, mtime_ns, inode, peripherique = json.loads(ligne)
+                yield Deplacement(os.path.join(source, *chemin_source.split("/")),
+                                  os.path.join(destination, *chemin_destination.split("/")),
+                                  taille, mtime_ns, inode, peripherique)
+
+
+class MetriquesExecution:
+    """Compteurs et histogrammes de latence par phase d'une exécution"""
+    
+    # Bornes supérieures (en secondes) des histogrammes de latence
+    BORNES_HISTOGRAMME = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+    
+    def __init__(self, execution: str):
+        """
+        :param execution: Nom de l'opération mesurée ("tri", "restauration", "rollback")
+        """
+        self.execution = execution
+        self.debut = time.time()
+        self.compteurs = Counter()
+        self.erreurs = Counter()  # Nombre d'erreurs par classe d'exception
+        self.histogrammes = {}  # phase -> [effectifs par borne (+ dépassement), somme, nombre]
+        self.informations = {}  # Données complémentaires (débit du pipeline...)
+        self._verrou = threading.Lock()
+    
+    def observer(self, phase: str, duree: float):
+        """
+        Enregistre la durée d'une opération
+        :param phase: Nom de la phase (parcours, classification, deplacement...)
+        :param duree: Durée en secondes
+        """
+        indice = bisect_right(self.BORNES_HISTOGRAMME, duree) if duree > self.BORNES_HISTOGRAMME[0] else 0
+        with self._verrou:
+            histogramme = self.histogrammes.get(phase)
+            if histogramme is None:
+                histogramme = self.histogrammes[phase] = [[0] * (len(self.BORNES_HISTOGRAMME) + 1), 0.0, 0]
+            histogramme[0][indice] += 1
+            histogramme[1] += duree
+            histogramme[2] += 1
+    
+    @contextmanager
+    def mesurer(self, phase: str):
+        """
+        Mesure la durée du bloc et l'enregistre dans l'histogramme de la phase
+        """
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observer(phase, time.perf_counter() - debut)
+    
+    def incrementer(self, nom: str, valeur: int = 1):
+        with self._verrou:
+            self.compteurs[nom] += valeur
+    
+    def erreur(self, exception: BaseException):
+        """
+        Comptabilise une erreur selon sa classe
+        """
+        with self._verrou:
+            self.erreurs[type(exception).__name__] += 1
+    
+    def fusionner(self, autres: "MetriquesExecution"):
+        """
+        Ajoute les mesures d'une autre exécution (ex: rollback déclenché pendant un tri)
+        """
+        with self._verrou:
+            self.compteurs.update(autres.compteurs)
+            self.erreurs.update(autres.erreurs)
+            for phase, (effectifs, somme, nombre) in autres.histogrammes.items():
+                histogramme = self.histogrammes.setdefault(phase, [[0] * len(effectifs), 0.0, 0])
+                histogramme[0] = [a + b for a, b in zip(histogramme[0], effectifs)]
+                histogramme[1] += somme
+                histogramme[2] += nombre
+    
+    def vers_dict(self) -> Dict:
+        """
+        :return: Rapport structuré (compteurs, erreurs par classe, latences par phase)
+        """
+        with self._verrou:
+            phases = {}
+            for phase, (effectifs, somme, nombre) in self.histogrammes.items():
+                phases[phase] = {
+                    "nombre": nombre,
+                    "duree_totale": round(somme, 6),
+                    "duree_moyenne": round(somme / nombre, 9) if nombre else 0.0,
+                    "histogramme": {str(borne): effectif for borne, effectif
+                                    in zip(self.BORNES_HISTOGRAMME + ("+Inf",), effectifs)},
+                }
+            return {
+                "execution": self.execution,
+                "debut": self.debut,
+                "compteurs": dict(self.compteurs),
+                "erreurs": dict(self.erreurs),
+                "phases": phases,
+                **self.informations,
+            }
+    
+    def vers_json(self) -> str:
+        return json.dumps(self.vers_dict(), ensure_ascii=False, indent=2)
+    
+    def vers_prometheus(self) -> str:
+        """
+        :return: Mesures au format d'exposition texte de Prometheus
+        """
+        execution = self.execution
+        lignes = [
+            "# HELP trieur_duree_phase_secondes Durée des opérations par phase",
+            "# TYPE trieur_duree_phase_secondes histogram",
+        ]
+        with self._verrou:
+            for phase, (effectifs, somme, nombre) in sorted(self.histogrammes.items()):
+                etiquettes = f'execution="{execution}",phase="{phase}"'
+                cumul = 0
+                for borne, effectif in zip(self.BORNES_HISTOGRAMME, effectifs):
+                    cumul += effectif
+                    lignes.append(f'trieur_duree_phase_secondes_bucket{{{etiquettes},le="{borne}"}} {cumul}')
+                lignes.append(f'trieur_duree_phase_secondes_bucket{{{etiquettes},le="+Inf"}} {nombre}')
+                lignes.append(f"trieur_duree_phase_secondes_sum{{{etiquettes}}} {somme:.9f}")
+                lignes.append(f"trieur_duree_phase_secondes_count{{{etiquettes}}} {nombre}")
+            
+            lignes += ["# HELP trieur_operations_total Compteurs d'opérations",
+                       "# TYPE trieur_operations_total counter"]
+            for nom, valeur in sorted(self.compteurs.items()):
+                lignes.append(f'trieur_operations_total{{execution="{execution}",nom="{nom}"}} {valeur}')
+            
+            lignes += ["# HELP trieur_erreurs_total Erreurs par classe d'exception",
+                       "# TYPE trieur_erreurs_total counter"]
+            for classe, valeur in sorted(self.erreurs.items()):
+                lignes.append(f'trieur_erreurs_total{{execution="{execution}",classe="{classe}"}} {valeur}')
+        
+        lignes += ["# HELP trieur_derniere_execution_timestamp_secondes Début de la dernière exécution",
+                   "# TYPE trieur_derniere_execution_timestamp_secondes gauge",
+                   f'trieur_derniere_execution_timestamp_secondes{{execution="{execution}"}} {self.debut:.3f}']
+        return "\n".join(lignes) + "\n"
+    
+    @staticmethod
+    def _ecrire_atomiquement(chemin: str, contenu: str):
+        # Écriture puis renommage : node_exporter ne lit jamais un fichier à moitié écrit.
+        # Les rapports et index d'archives sont toujours sur le disque local, hors de l'arborescence triée
+        SystemeFichiersLocal().ecrire_atomiquement(chemin, contenu)
+    
+    def ecrire_json(self, chemin: str):
+        self._ecrire_atomiquement(chemin, self.vers_json())
+    
+    def ecrire_textfile_prometheus(self, chemin: str):
+        self._ecrire_atomiquement(chemin, self.vers_prometheus())
+
+
+class RapportExecution(tuple):
+    """
+    Résultat d'un tri ou d'une restauration : se décompose comme l'ancien tuple
+    (nombre de fichiers, erreurs) et expose les métriques de l'exécution
+    """
+    
+    def __new__(cls, nombre_fichiers: int, erreurs: List[str], metriques: MetriquesExecution):
+        rapport = super().__new__(cls, (nombre_fichiers, erreurs))
+        rapport.metriques = metriques
+        return rapport
+    
+    @property
+    def nombre_fichiers(self) -> int:
+        return self[0]
+    
+    @property
+    def erreurs(self) -> List[str]:
+        return self[1]
+    
+    def vers_dict(self) -> Dict:
+        return {"fichiers": self[0], "erreurs": self[1], "metriques": self.metriques.vers_dict()}
+
+
+class RapportLot(RapportExecution):
+    """
+    Résultat agrégé d'un tri par lots : se décompose comme un RapportExecution (total des fichiers,
+    erreurs préfixées par leur dossier) et détaille chaque dossier et chaque périphérique
+    """
+    
+    def __new__(cls, dossiers: List[Dict], peripheriques: Dict[str, Dict], metriques: MetriquesExecution):
+        erreurs = [f"{dossier['dossier_source']}: {erreur}" for dossier in dossiers for erreur in dossier["erreurs"]]
+        rapport = super().__new__(cls, sum(dossier["fichiers"] for dossier in dossiers), erreurs, metriques)
+        rapport.dossiers = dossiers
+        rapport.peripheriques = peripheriques
+        return rapport
+    
+    def vers_dict(self) -> Dict:
+        return dict(super().vers_dict(), dossiers=self.dossiers, peripheriques=self.peripheriques)
+
+
+class RapportRollback(list):
+    """Liste des erreurs d'un rollback, accompagnée de ses métriques"""
+    
+    def __init__(self, erreurs: List[str], metriques: MetriquesExecution):
+        super().__init__(erreurs)
+        self.metriques = metriques
+
+
+class ProfileurExecution:
+    """
+    Profile une exécution avec cProfile (thread appelant) et un échantillonneur de piles
+    (tous les threads, y compris ceux du pipeline). N'est instancié que si le profilage
+    est activé : sans lui, aucun coût n'est ajouté
+    """
+    
+    def __init__(self, execution: str, intervalle: float = 0.005):
+        """
+        :param execution: Nom de l'exécution profilée ("tri", "restauration")
+        :param intervalle: Période d'échantillonnage des piles en secondes
+        """
+        self.execution = execution
+        self.intervalle = intervalle
+        self.profil = cProfile.Profile()
+        self.piles = Counter()  # pile repliée -> nombre d'échantillons
+        self._arret = threading.Event()
+        self._echantillonneur = None
+    
+    def __enter__(self):
+        self._arret.clear()
+        self._echantillonneur = threading.Thread(target=self._echantillonner, name="profilage", daemon=True)
+        self._echantillonneur.start()
+        self.profil.enable()
+        return self
+    
+    def __exit__(self, *exc):
+        self.profil.disable()
+        self._arret.set()
+        self._echantillonneur.join()
+        return False
+    
+    def _echantillonner(self):
+        noms = {}
+        moi = threading.get_ident()
+        while not self._arret.wait(self.intervalle):
+            for thread in threading.enumerate():
+                noms[thread.ident] = thread.name
+            for ident, cadre in sys._current_frames().items():
+                if ident == moi:
+                    continue
+                pile = []
+                while cadre is not None:
+                    code = cadre.f_code
+                    pile.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    cadre = cadre.f_back
+                pile.append(noms.get(ident, str(ident)))
+                self.piles[";".join(reversed(pile))] += 1
+    
+    def appels_systeme(self) -> Dict[str, Dict[str, int]]:
+        """
+        Compte les appels système (fonctions natives de os/io) par fonction d'entrée/sortie.
+        Les appels passant par la bibliothèque standard (os.makedirs, shutil...) ou par le
+        système de fichiers du trieur sont attribués à la fonction d'entrée/sortie appelante
+        :return: {fonction: {appel système: nombre}}
+        """
+        statistiques = pstats.Stats(self.profil).stats
+        compteurs = {}
+        intermediaires = set(vars(SystemeFichiers))
+        
+        def attribuer(cle, nombre, appel, profondeur):
+            appelants = statistiques.get(cle, (0, 0, 0, 0, {}))[4]
+            total = sum(valeurs[1] for valeurs in appelants.values()) or 1
+            for appelant, valeurs in appelants.items():
+                part = nombre * valeurs[1] / total
+                if appelant[2] in FONCTIONS_IO and appelant[0] == __file__:
+                    fonction = compteurs.setdefault(appelant[2], Counter())
+                    fonction[appel] += part
+                elif (appelant[0] != __file__ or appelant[2] in intermediaires) and profondeur < 4:
+                    attribuer(appelant, part, appel, profondeur + 1)
+        
+        for cle, (_, nombre, _, _, _) in statistiques.items():
+            correspondance = MOTIF_APPEL_SYSTEME.fullmatch(cle[2])
+            if cle[0] == "~" and correspondance and correspondance.group(1) != "fspath":
+                attribuer(cle, nombre, correspondance.group(1), 0)
+            elif cle[0] == __file__ and cle[2] in APPELS_SYSTEME_CTYPES:
+                attribuer(cle, nombre, cle[2], 0)
+        
+        return {fonction: {appel: round(nombre) for appel, nombre in sorted(appels.items())}
+                for fonction, appels in sorted(compteurs.items())}
+    
+    def ecrire(self, dossier: str) -> Dict[str, str]:
+        """
+        Écrit le profil (.pstats), les piles repliées (.collapsed, pour flamegraph.pl ou
+        speedscope) et les appels système (.json)
+        :param dossier: Dossier de destination
+        :return: Chemins des fichiers écrits
+        """
+        os.makedirs(dossier, exist_ok=True)
+        horodatage = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(dossier, f"profil_{self.execution}_{horodatage}")
+        fichiers = {"pstats": base + ".pstats", "piles": base + ".collapsed",
+                    "appels_systeme": base + ".appels_systeme.json"}
+        
+        self.profil.dump_stats(fichiers["pstats"])
+        with open(fichiers["piles"], 'w', encoding='utf-8') as f:
+            for pile, nombre in sorted(self.piles.items()):
+                f.write(f"{pile} {nombre}\n")
+        with open(fichiers["appels_systeme"], 'w', encoding='utf-8') as f:
+            json.dump(self.appels_systeme(), f, indent=2)
+        return fichiers
+
+
+class CompteurEtape:
+    """Compteur de débit d'une étape du pipeline"""
+    
+    def __init__(self, nom: str):
+        self.nom = nom
+        self.elements = 0
+        self.duree_active = 0.0  # Temps passé à travailler (hors attente des files)
+        self.debut = None
+        self.fin = None
+    
+    def statistiques(self) -> Dict:
+        """
+        :return: Dictionnaire (éléments, durée active, durée totale, débit en éléments/s)
+        """
+        fin = self.fin or time.perf_counter()
+        duree_totale = fin - self.debut if self.debut else 0.0
+        return {
+            "elements": self.elements,
+            "duree_active": round(self.duree_active, 6),
+            "duree_totale": round(duree_totale, 6),
+            "debit": round(self.elements / duree_totale, 1) if duree_totale > 0 else 0.0,
+        }
+
+
+class PipelineTri:
+    """Étapes parcours → classification → déplacement reliées par des files bornées"""
+    
+    _FIN = object()  # Marqueur de fin de flux
+    
+    def __init__(self, trieur: "TrieurFichiers", taille_files: int = 1000):
+        """
+        :param trieur: Trieur fournissant la classification
+        :param taille_files: Capacité de chaque file (contre-pression sur les étapes amont)
+        """
+        self.trieur = trieur
+        self.file_entrees = queue.Queue(maxsize=taille_files)
+        self.file_deplacements = queue.Queue(maxsize=taille_files)
+        self.annulation = threading.Event()
+        self.compteurs = {nom: CompteurEtape(nom) for nom in ("parcours", "classification", "deplacement")}
+        self._erreur = None  # Exception survenue dans une étape amont
+        self._threads = []
+    
+    def _deposer(self, file: queue.Queue, element) -> bool:
+        """
+        Dépose un élément en attendant de la place, sauf en cas d'annulation
+        :return: False si le pipeline a été annulé
+        """
+        while not self.annulation.is_set():
+            try:
+                file.put(element, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _retirer(self, file: queue.Queue):
+        """
+        Retire un élément en attendant qu'il y en ait un, sauf en cas d'annulation
+        """
+        while not self.annulation.is_set():
+            try:
+                return file.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return self._FIN
+    
+    def _etape_parcours(self, entrees: Iterator[EntreeFichier]):
+        compteur = self.compteurs["parcours"]
+        compteur.debut = time.perf_counter()
+        try:
+            debut = time.perf_counter()
+            for entree in entrees:
+                compteur.duree_active += time.perf_counter() - debut
+                compteur.elements += 1
+                if not self._deposer(self.file_entrees, entree):
+                    return
+                debut = time.perf_counter()
+        except Exception as e:
+            self._erreur = e
+        finally:
+            compteur.fin = time.perf_counter()
+            if hasattr(entrees, "close"):
+                entrees.close()  # Libère les itérateurs scandir encore ouverts
+            self._deposer(self.file_entrees, self._FIN)
+    
+    def _etape_classification(self):
+        compteur = self.compteurs["classification"]
+        compteur.debut = time.perf_counter()
+        try:
+            while True:
+                entree = self._retirer(self.file_entrees)
+                if entree is self._FIN:
+                    return
+                debut = time.perf_counter()
+                deplacement = self.trieur.planifier_deplacement(entree)
+                compteur.duree_active += time.perf_counter() - debut
+                if deplacement is None:
+                    continue
+                compteur.elements += 1
+                if not self._deposer(self.file_deplacements, deplacement):
+                    return
+        except Exception as e:
+            self._erreur = e
+        finally:
+            compteur.fin = time.perf_counter()
+            self._deposer(self.file_deplacements, self._FIN)
+    
+    def demarrer(self, entrees: Iterator[EntreeFichier]) -> Iterator[Deplacement]:
+        """
+        Lance le parcours et la classification dans des threads
+        :param entrees: Flux d'entrées produit par le parcours
+        :return: Générateur des déplacements planifiés, à consommer par l'étape de déplacement
+        """
+        self._threads = [
+            threading.Thread(target=self._etape_parcours, args=(entrees,), daemon=True, name="trieur-parcours"),
+            threading.Thread(target=self._etape_classification, daemon=True, name="trieur-classification"),
+        ]
+        for thread in self._threads:
+            thread.start()
+        
+        compteur = self.compteurs["deplacement"]
+        compteur.debut = time.perf_counter()
+        try:
+            while True:
+                deplacement = self._retirer(self.file_deplacements)
+                if deplacement is self._FIN:
+                    break
+                debut = time.perf_counter()
+                yield deplacement
+                compteur.duree_active += time.perf_counter() - debut
+                compteur.elements += 1
+        finally:
+            compteur.fin = time.perf_counter()
+            self.arreter()
+        
+        if self._erreur is not None:
+            raise self._erreur
+    
+    def arreter(self):
+        """
+        Annule les étapes amont et attend leur fin
+        """
+        self.annulation.set()
+        for thread in self._threads:
+            thread.join()
+    
+    def statistiques(self) -> Dict[str, Dict]:
+        """
+        :return: Statistiques de débit par étape
+        """
+        return {nom: compteur.statistiques() for nom, compteur in self.compteurs.items()}
+
+
+class VoiesDeplacement:
+    """
+    Étape de déplacement répartie en deux voies selon la taille : une voie rapide où de nombreux
+    threads enchaînent les petits fichiers, et une voie de flux où quelques threads copient les gros.
+    Une longue copie entre périphériques ne bloque plus les milliers de renommages qui la suivent.
+    """
+    
+    _FIN = object()  # Marqueur de fin de flux, un par thread
+    
+    def __init__(self, seuil: int, ouvriers_rapides: int = 8, ouvriers_flux: int = 2, taille_files: int = 1000):
+        """
+        :param seuil: Taille (octets) à partir de laquelle un fichier passe par la voie de flux
+        :param ouvriers_rapides: Threads de la voie rapide
+        :param ouvriers_flux: Threads de la voie de flux
+        :param taille_files: Capacité de la file de chaque voie
+        """
+        self.seuil = seuil
+        self.ouvriers = {"rapide": max(1, ouvriers_rapides), "flux": max(1, ouvriers_flux)}
+        self.files = {voie: queue.Queue(maxsize=taille_files) for voie in self.ouvriers}
+        self.compteurs = {voie: CompteurEtape(f"voie_{voie}") for voie in self.ouvriers}
+        self.octets = Counter()
+        self.arret = threading.Event()  # Posé quand un déplacement demande l'arrêt du tri
+        self._verrou = threading.Lock()
+    
+    def voie(self, deplacement: Deplacement) -> str:
+        return "flux" if deplacement.taille >= self.seuil else "rapide"
+    
+    def _ouvrier(self, voie: str, traiter):
+        file = self.files[voie]
+        compteur = self.compteurs[voie]
+        while True:
+            deplacement = file.get()
+            if deplacement is self._FIN:
+                break
+            if self.arret.is_set():
+                continue  # Vide la file sans traiter
+            debut = time.perf_counter()
+            continuer = traiter(deplacement)
+            with self._verrou:
+                compteur.duree_active += time.perf_counter() - debut
+                compteur.elements += 1
+                self.octets[voie] += deplacement.taille
+            if not continuer:
+                self.arret.set()
+        with self._verrou:
+            compteur.fin = time.perf_counter()
+    
+    def executer(self, deplacements: Iterator[Deplacement], traiter):
+        """
+        Répartit les déplacements entre les voies et attend qu'ils soient tous traités
+        :param deplacements: Déplacements planifiés
+        :param traiter: Fonction appelée pour chaque déplacement, renvoyant False pour arrêter le tri
+        """
+        threads = [threading.Thread(target=self._ouvrier, args=(voie, traiter), daemon=True,
+                                    name=f"trieur-voie-{voie}-{numero}")
+                   for voie, nombre in self.ouvriers.items() for numero in range(nombre)]
+        for compteur in self.compteurs.values():
+            compteur.debut = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            for deplacement in deplacements:
+                if self.arret.is_set():
+                    break
+                self.files[self.voie(deplacement)].put(deplacement)
+        finally:
+            for voie, file in self.files.items():
+                for _ in range(self.ouvriers[voie]):
+                    file.put(self._FIN)
+            for thread in threads:
+                thread.join()
+    
+    def statistiques(self) -> Dict[str, Dict]:
+        """
+        :return: Statistiques de chaque voie (fichiers, durées, débits en fichiers/s et en octets/s)
+        """
+        with self._verrou:
+            statistiques = {}
+            for voie, compteur in self.compteurs.items():
+                infos = compteur.statistiques()
+                infos["ouvriers"] = self.ouvriers[voie]
+                infos["octets"] = self.octets[voie]
+                infos["debit_octets"] = round(self.octets[voie] / infos["duree_totale"], 1) \
+                    if infos["duree_totale"] > 0 else 0.0
+                statistiques[voie] = infos
+            return statistiques
+
+
+class FileNouvelEssai:
+    """
+    Déplacements en échec à retenter plus tard, le délai doublant à chaque tentative.
+    Après `tentatives_max` échecs, le fichier est mis en quarantaine et le tri continue sans lui.
+    """
+    
+    def __init__(self, tentatives_max: int = 3, delai: float = 0.5):
+        """
+        :param tentatives_max: Nombre total de tentatives d'un déplacement
+        :param delai: Délai (s) avant le premier nouvel essai
+        """
+        self.tentatives_max = max(1, int(tentatives_max))
+        self.delai = max(0.0, float(delai))
+        self.quarantaine = {}  # source -> {"destination", "tentatives", "erreur"}
+        self._tas = []  # (échéance, ordre, déplacement, numéro de la prochaine tentative)
+        self._ordre = itertools.count()
+        self._verrou = threading.Lock()
+    
+    def __len__(self) -> int:
+        with self._verrou:
+            return len(self._tas)
+    
+    def ajouter(self, deplacement: Deplacement, tentative: int, erreur: BaseException) -> bool:
+        """
+        Planifie un nouvel essai après l'échec d'une tentative
+        :param deplacement: Déplacement en échec
+        :param tentative: Numéro de la tentative qui vient d'échouer (à partir de 1)
+        :param erreur: Erreur rencontrée
+        :return: False si le fichier a épuisé ses tentatives et passe en quarantaine
+        """
+        with self._verrou:
+            if tentative >= self.tentatives_max:
+                self.quarantaine[deplacement.source] = {"destination": deplacement.destination,
+                                                        "tentatives": tentative, "erreur": str(erreur)}
+                return False
+            echeance = time.monotonic() + self.delai * 2 ** (tentative - 1)
+            heapq.heappush(self._tas, (echeance, next(self._ordre), deplacement, tentative + 1))
+            return True
+    
+    def extraire(self, bloquant: bool, annulation: threading.Event = None) -> Optional[Tuple[Deplacement, int]]:
+        """
+        Retire le prochain déplacement dont le délai est écoulé
+        :param bloquant: Attendre la prochaine échéance plutôt que de rendre None
+        :param annulation: Événement interrompant l'attente
+        :return: (déplacement, numéro de tentative), ou None si rien n'est à retenter maintenant
+        """
+        while True:
+            with self._verrou:
+                if not self._tas:
+                    return None
+                attente = self._tas[0][0] - time.monotonic()
+                if attente <= 0:
+                    _, _, deplacement, tentative = heapq.heappop(self._tas)
+                    return deplacement, tentative
+            if not bloquant or (annulation.wait(attente) if annulation is not None else time.sleep(attente)):
+                return None
+
+
+class SeauJetons:
+    """Seau à jetons partagé entre threads : limite un débit d'opérations ou d'octets par seconde"""
+    
+    FENETRE = 2.0  # Durée (s) sur laquelle le débit effectif est mesuré
+    
+    def __init__(self, debit: float = 0):
+        """
+        :param debit: Jetons ajoutés par seconde (0 = illimité), la capacité vaut une seconde de débit
+        """
+        self._verrou = threading.Lock()
+        self._consommations = deque()  # (instant, jetons) sur la fenêtre de mesure
+        self.debit = 0.0
+        self.capacite = 0.0
+        self.jetons = 0.0
+        self._dernier_ajout = time.monotonic()
+        self.ajuster(debit)
+    
+    def _remplir(self, maintenant: float):
+        if self.debit > 0:
+            self.jetons = min(self.capacite, self.jetons + (maintenant - self._dernier_ajout) * self.debit)
+        self._dernier_ajout = maintenant
+    
+    def ajuster(self, debit: float):
+        """
+        Modifie le débit autorisé, y compris pendant un tri
+        :param debit: Nouveau débit par seconde (0 = illimité)
+        """
+        with self._verrou:
+            self._remplir(time.monotonic())
+            self.debit = max(0.0, float(debit or 0))
+            self.capacite = max(1.0, self.debit)
+            self.jetons = min(self.jetons, self.capacite) if self.debit else self.capacite
+    
+    def consommer(self, nombre: float = 1) -> float:
+        """
+        Prélève des jetons, en attendant qu'ils soient disponibles. Une demande supérieure à la capacité
+        est servie à crédit : le seau devient négatif et les demandes suivantes attendent d'autant.
+        :param nombre: Jetons à prélever (1 opération, ou un nombre d'octets)
+        :return: Durée d'attente imposée, en secondes
+        """
+        with self._verrou:
+            maintenant = time.monotonic()
+            self._remplir(maintenant)
+            self._consommations.append((maintenant, nombre))
+            while self._consommations[0][0] < maintenant - self.FENETRE:
+                self._consommations.popleft()
+            if not self.debit:
+                return 0.0
+            self.jetons -= nombre
+            attente = -self.jetons / self.debit if self.jetons < 0 else 0.0
+        if attente:
+            time.sleep(attente)
+        return attente
+    
+    def debit_effectif(self) -> float:
+        """
+        :return: Jetons consommés par seconde sur la fenêtre de mesure
+        """
+        with self._verrou:
+            maintenant = time.monotonic()
+            while self._consommations and self._consommations[0][0] < maintenant - self.FENETRE:
+                self._consommations.popleft()
+            if not self._consommations:
+                return 0.0
+            duree = max(maintenant - self._consommations[0][0], 1.0 / max(self.debit, 1.0), 0.001)
+            return sum(nombre for _, nombre in self._consommations) / duree
+
+    def taille_bloc(self, maximum: int) -> int:
+        """
+        :param maximum: Taille de bloc sans limitation
+        :return: Taille de bloc d'un dixième de seconde de débit, pour une limitation régulière
+        """
+        if not self.debit:
+            return maximum
+        return int(min(maximum, max(64 * 1024, self.debit / 10)))
+
+
+def empreinte_fichier(chemin: str, systeme_fichiers: SystemeFichiers = None) -> str:
+    """
+    :param chemin: Fichier à lire
+    :param systeme_fichiers: Système de fichiers du fichier (disque local par défaut)
+    :return: Empreinte BLAKE2b (128 bits, hexadécimale) du contenu
+    """
+    empreinte = hashlib.blake2b(digest_size=16)
+    with (systeme_fichiers.open(chemin, 'rb') if systeme_fichiers else open(chemin, 'rb')) as f:
+        for bloc in iter(lambda: f.read(TAILLE_BLOC_ARCHIVE), b""):
+            empreinte.update(bloc)
+    return empreinte.hexdigest()
+
+
+def _fermer_iterateur(iterateur):
+    # Les relevés de l'index sont de simples itérateurs de liste, sans close()
+    if hasattr(iterateur, "close"):
+        iterateur.close()
+
+
+class TrieurFichiers:
+    """Classe principale pour la gestion du tri des fichiers"""
+    
+    def __init__(self, config: Dict = None, systeme_fichiers: SystemeFichiers = None):
+        """
+        Initialise l'outil de tri des fichiers avec la configuration spécifiée
+        :param config: Dictionnaire de configuration
+        :param systeme_fichiers: Système de fichiers trié (disque local par défaut)
+        """
+        self.config = config or CONFIG_PAR_DEFAUT.copy()
+        self.systeme_fichiers = systeme_fichiers or SystemeFichiersLocal()
+        self.dossier_source = self.config.get("dossier_source", "")
+        self.sauvegarde = {}  # Pour stocker les emplacements originaux des fichiers
+        self.operations_realisees = []  # Pour le rollback
+        self.dossiers_sortie = set()  # Dossiers de premier niveau créés par le tri
+        self.filtre_ignore = None  # Motifs d'exclusion compilés au début de chaque parcours
+        self.callback_octets = None  # Progression en octets des copies entre périphériques
+        self.fichiers_decouverts = 0  # Fichiers retenus par le dernier parcours
+        self._destinations_reservees = set()  # Destinations planifiées pendant le tri en cours
+        self._verrou_dossiers = threading.Lock()  # Création des dossiers par les voies de déplacement
+        self._annulation = threading.Event()
+        self.pipeline = None  # Pipeline du dernier tri (statistiques de débit par étape)
+        self.voies = None  # Voies de déplacement du dernier tri (statistiques par voie)
+        self.nouveaux_essais = None  # Déplacements en échec du dernier tri, à retenter ou en quarantaine
+        self.metriques = MetriquesExecution("hors_execution")  # Mesures de l'opération en cours
+        self.index = None  # IndexFichiers ouvert pendant un tri ou une restauration
+        self._releves = {}  # Dossiers entièrement relus pendant le parcours : {chemin: (mtime_ns, entrées)}
+        self._placements = []  # Fichiers déplacés par le tri en cours, pour l'index
+        self._empreintes = {}  # Empreintes du contenu des fichiers déplacés par le tri en cours
+        self.journal_fichiers = EchantillonneurJournal(logger, self.config.get("seuil_journal_fichiers", 1000),
+                                                       self.config.get("taux_echantillonnage_journal", 100))
+        self.limiteur_operations = SeauJetons(self.config.get("limite_operations_par_seconde", 0))
+        self.limiteur_octets = SeauJetons(self.config.get("limite_octets_par_seconde", 0))
+        self.reinitialiser_caches()
+        logger.info(f"Initialisation du TrieurFichiers avec dossier: {self.dossier_source}")
+    
+    def verifier_permissions_fichier(self, chemin_fichier: str) -> bool:
+        """
+        Vérifie qu'un fichier peut être déplacé. Sous Linux, déplacer un fichier dépend des droits
+        sur son dossier et non sur le fichier : un dossier autorisé est vérifié une seule fois par
+        opération, le fichier lui-même n'est ni testé ni modifié (le déplacement est tenté directement).
+        Un refus n'est pas retenu : les droits rétablis entre deux tentatives sont pris en compte.
+        :param chemin_fichier: Chemin du fichier à vérifier
+        :return: True si les permissions sont OK
+        """
+        dossier = os.path.dirname(chemin_fichier) or os.curdir
+        autorise = dossier in self._dossiers_autorises
+        if not autorise:
+            with self.metriques.mesurer("verification_permissions"):
+                autorise = self.systeme_fichiers.access(dossier, os.W_OK | os.X_OK)
+            self.metriques.incrementer("verifications_dossiers")
+            if autorise:
+                self._dossiers_autorises.add(dossier)
+        if not autorise:
+            raise PermissionError_Custom(f"Permission d'écriture refusée sur le dossier {dossier}")
+        return True
+    
+    def verifier_espace_disque(self, chemin: str, taille_requise: int) -> bool:
+        """
+        Vérifie s'il y a suffisamment d'espace disque
+        :param chemin: Chemin du répertoire
+        :param taille_requise: Taille requise en octets
+        :return: True si l'espace est suffisant
+        """
+        try:
+            stat_disque = self.systeme_fichiers.disk_usage(chemin)
+            espace_libre = stat_disque.free
+            
+            if espace_libre < taille_requise * 1.1:  # 10% de marge
+                raise EspaceDisqueError(f"Espace disque insuffisant. Requis: {taille_requise}, Disponible: {espace_libre}")
+            
+            return True
+            
+        except OSError as e:
+            logger.error(f"Erreur lors de la vérification de l'espace disque: {e}")
+            raise EspaceDisqueError(f"Impossible de vérifier l'espace disque: {e}")
+    
+    def creer_dossier_securise(self, chemin_dossier: str) -> bool:
+        """
+        Crée un dossier de manière sécurisée avec gestion d'erreurs. Les threads des voies de
+        déplacement passent un par un : chaque dossier créé est compté et annulable une seule fois.
+        :param chemin_dossier: Chemin du dossier à créer
+        :return: True si succès
+        """
+        if chemin_dossier in self._dossiers_existants:
+            return True
+        try:
+            with self._verrou_dossiers:
+                if chemin_dossier in self._dossiers_existants:
+                    return True
+                if not self.systeme_fichiers.exists(chemin_dossier):
+                    self.systeme_fichiers.makedirs(chemin_dossier, exist_ok=True)
+                    self.metriques.incrementer("dossiers_crees")
+                    # Ajouter à la liste des opérations pour rollback
+                    self.operations_realisees.append(("create_dir", chemin_dossier))
+                    self.enregistrer_dossier_sortie(chemin_dossier)
+                    self.journal_fichiers.info("creation_dossier", "Dossier créé: %s", chemin_dossier)
+                self._dossiers_existants.add(chemin_dossier)
+            return True
+            
+        except PermissionError as e:
+            logger.error(f"Permission refusée pour créer {chemin_dossier}: {e}")
+            raise PermissionError_Custom(f"Permission refusée pour créer le dossier {chemin_dossier}")
+        except OSError as e:
+            logger.error(f"Erreur système lors de la création de {chemin_dossier}: {e}")
+            raise TrieurError(f"Impossible de créer le dossier {chemin_dossier}: {e}")
+    
+    def deplacer_fichier_securise(self, source: str, destination: str, taille: int = None) -> bool:
+        """
+        Déplace un fichier de manière sécurisée avec gestion d'erreurs complète
+        :param source: Chemin source
+        :param destination: Chemin destination
+        :param taille: Taille du fichier si elle est connue (relevée au parcours)
+        :return: True si succès
+        """
+        try:
+            metriques = self.metriques
+            
+            # Droits du dossier d'origine, vérifiés une fois par dossier
+            self.verifier_permissions_fichier(source)
+            
+            with metriques.mesurer("creation_dossier"):
+                self.creer_dossier_securise(os.path.dirname(destination))
+            
+            # Déplacement tenté directement : un fichier absent ou protégé est signalé par l'échec
+            # du renommage, l'espace disque n'est vérifié qu'avant une copie entre périphériques
+            if taille is None:
+                taille = self.systeme_fichiers.lstat(source).st_size
+            with metriques.mesurer("deplacement"):
+                self.renommer_ou_transferer(source, destination)
+            metriques.incrementer("fichiers_deplaces")
+            metriques.incrementer("octets_deplaces", taille)
+            
+            # Enregistrer l'opération pour rollback
+            self.operations_realisees.append(("move_file", source, destination))
+            self.journal_fichiers.info("deplacement", "Fichier déplacé: %s -> %s", source, destination)
+            
+            return True
+            
+        except FileNotFoundError as e:
+            logger.error(f"Fichier introuvable: {e}")
+            raise
+        except FileExistsError:
+            raise  # Destination prise entre-temps : replanifiée par executer_deplacement
+        except PermissionError_Custom as e:
+            logger.error(f"Erreur de permissions: {e}")
+            raise
+        except EspaceDisqueError as e:
+            logger.error(f"Erreur d'espace disque: {e}")
+            raise
+        except shutil.Error as e:
+            logger.error(f"Erreur lors du déplacement: {e}")
+            raise TrieurError(f"Erreur lors du déplacement de {source} vers {destination}: {e}")
+        except OSError as e:
+            if e.errno in ERREURS_PERMISSION:
+                logger.error(f"Erreur de permissions: {e}")
+                raise PermissionError_Custom(f"Permission refusée pour déplacer {source}: {e}")
+            logger.error(f"Erreur système: {e}")
+            raise TrieurError(f"Erreur système lors du déplacement: {e}")
+    
+    def lier_fichier_securise(self, source: str, destination: str) -> str:
+        """
+        Place un fichier dans la vue triée sans déplacer ses données : lien physique ou
+        clone (reflink) selon mode_vue, avec repli sur un lien symbolique
+        :param source: Fichier d'origine (laissé en place)
+        :param destination: Chemin dans la vue triée
+        :return: Type de lien créé ("lien_physique", "reflink" ou "lien_symbolique")
+        """
+        try:
+            if not self.systeme_fichiers.exists(source):
+                raise FileNotFoundError(f"Fichier source introuvable: {source}")
+            
+            metriques = self.metriques
+            with metriques.mesurer("creation_dossier"):
+                self.creer_dossier_securise(os.path.dirname(destination))
+            
+            with metriques.mesurer("liaison"):
+                lien = self.lier_fichier(source, destination)
+            metriques.incrementer(f"fichiers_{lien}")
+            
+            # Le rollback supprime le lien, le fichier d'origine n'a pas bougé
+            self.operations_realisees.append(("link_file", source, destination))
+            self.journal_fichiers.info("liaison", "Fichier lié (%s): %s -> %s", lien, source, destination)
+            return lien
+            
+        except FileNotFoundError as e:
+            logger.error(f"Fichier introuvable: {e}")
+            raise
+        except FileExistsError:
+            raise  # Destination prise entre-temps : replanifiée par executer_deplacement
+        except OSError as e:
+            logger.error(f"Erreur système: {e}")
+            raise TrieurError(f"Erreur système lors de la création du lien {destination}: {e}")
+
+    def lier_fichier(self, source: str, destination: str) -> str:
+        """
+        :param source: Fichier d'origine
+        :param destination: Chemin du lien (ne doit pas exister)
+        :return: Type de lien créé
+        """
+        mode = self.config.get("mode_vue")
+        if mode not in MODES_VUE:
+            raise TrieurError(f"Mode de vue invalide: {mode}")
+        if not self.systeme_fichiers.local:
+            raise TrieurError("Le tri virtuel (liens et clones) n'est possible que sur le disque local")
+        self._limiter(self.limiteur_operations, 1)
+        
+        if mode != "lien_symbolique":
+            try:
+                if mode == "reflink":
+                    self._cloner_fichier(source, destination)
+                else:
+                    os.link(source, destination)
+                return mode
+            except OSError as e:
+                if e.errno not in ERREURS_LIEN:
+                    raise
+                logger.debug(f"{mode} impossible pour {source} ({e}), repli sur un lien symbolique")
+        
+        os.symlink(os.path.abspath(source), destination)
+        return "lien_symbolique"
+
+    def _cloner_fichier(self, source: str, destination: str):
+        """
+        Clone un fichier avec l'ioctl FICLONE (Btrfs, XFS, bcachefs...) : les blocs sont
+        partagés jusqu'à la première modification
+        """
+        if fcntl is None:
+            raise OSError(errno.EOPNOTSUPP, "FICLONE indisponible sur ce système")
+        
+        fd_source = os.open(source, os.O_RDONLY)
+        try:
+            fd_destination = os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            try:
+                fcntl.ioctl(fd_destination, FICLONE, fd_source)
+            except OSError:
+                os.close(fd_destination)
+                os.remove(destination)
+                raise
+            os.close(fd_destination)
+        finally:
+            os.close(fd_source)
+        # Même date et mêmes droits : la vue se classe et se restaure comme l'original
+        shutil.copystat(source, destination)
+
+    def renommer_ou_transferer(self, source: str, destination: str):
+        """
+        Renomme un fichier, ou le transfère si la destination est sur un autre périphérique.
+        Une destination existante n'est jamais écrasée (un autre tri vers la même racine a pu la
+        prendre depuis la planification) : FileExistsError
+        :param source: Chemin source
+        :param destination: Chemin destination (ne doit pas exister)
+        """
+        self._limiter(self.limiteur_operations, 1)
+        systeme_fichiers = self.systeme_fichiers
+        try:
+            systeme_fichiers.rename_noreplace(source, destination)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            if systeme_fichiers.lexists(destination):
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), destination)
+            if not systeme_fichiers.local:
+                systeme_fichiers.copy(source, destination)
+                systeme_fichiers.remove(source)
+            elif os.path.islink(source):
+                shutil.move(source, destination)
+            else:
+                self.transferer_inter_peripherique(source, destination)
+
+    def _limiter(self, limiteur: SeauJetons, nombre: int):
+        """
+        Attend que le limiteur autorise l'opération et comptabilise l'attente imposée
+        :param limiteur: limiteur_operations ou limiteur_octets
+        :param nombre: Jetons à prélever
+        """
+        attente = limiteur.consommer(nombre)
+        if attente:
+            self.metriques.observer("attente_limitation", attente)
+
+    def ajuster_limites(self, operations_par_seconde: float = None, octets_par_seconde: float = None):
+        """
+        Modifie les limites de débit, y compris pendant une opération en cours
+        :param operations_par_seconde: Déplacements ou liens par seconde (0 = illimité, None = inchangé)
+        :param octets_par_seconde: Octets copiés par seconde entre périphériques (0 = illimité, None = inchangé)
+        """
+        if operations_par_seconde is not None:
+            self.config["limite_operations_par_seconde"] = operations_par_seconde
+            self.limiteur_operations.ajuster(operations_par_seconde)
+        if octets_par_seconde is not None:
+            self.config["limite_octets_par_seconde"] = octets_par_seconde
+            self.limiteur_octets.ajuster(octets_par_seconde)
+        logger.debug(f"Limites de débit: {self.limiteur_operations.debit or 'illimité'} opérations/s, "
+                     f"{self.limiteur_octets.debit or 'illimité'} octets/s")
+
+    @staticmethod
+    def _copier_bloc(fd_source: int, fd_destination: int, position: int, taille: int,
+                     methode: str) -> Tuple[int, str]:
+        """
+        Copie un bloc sans passer par l'espace utilisateur si le système le permet
+        :param methode: Méthode de copie du transfert en cours ("copy_file_range", "sendfile" ou "lecture")
+        :return: (nombre d'octets copiés (0 en fin de fichier source), méthode à utiliser pour la suite)
+        """
+        if methode == "copy_file_range":
+            try:
+                return os.copy_file_range(fd_source, fd_destination, taille, position, position), methode
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+                    raise
+                methode = "sendfile" if hasattr(os, "sendfile") else "lecture"
+        
+        if methode == "sendfile":
+            try:
+                os.lseek(fd_destination, position, os.SEEK_SET)
+                return os.sendfile(fd_destination, fd_source, position, taille), methode
+            except OSError as e:
+                if e.errno not in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+                methode = "lecture"
+        
+        os.lseek(fd_source, position, os.SEEK_SET)
+        os.lseek(fd_destination, position, os.SEEK_SET)
+        donnees = os.read(fd_source, min(taille, 8 * 1024 * 1024))
+        ecrits = 0
+        while ecrits < len(donnees):
+            ecrits += os.write(fd_destination, donnees[ecrits:])
+        return len(donnees), methode
+
+    def _copier_pipeline(self, fd_source: int, fd_destination: int, position: int, total: int, source: str,
+                         methode: str) -> Tuple[int, str]:
+        """
+        Copie en recouvrant lecture et écriture : avant chaque bloc, le noyau est invité
+        (posix_fadvise WILLNEED) à lire les PROFONDEUR_PIPELINE_COPIE blocs suivants sur le disque
+        source pendant que le bloc courant est écrit sur le disque cible, sans copie en espace utilisateur
+        :param fd_source: Descripteur du fichier source
+        :param fd_destination: Descripteur de la copie partielle
+        :param position: Octet de départ (reprise)
+        :param total: Taille du fichier source
+        :param source: Chemin source (progression)
+        :param methode: Méthode de copie des blocs (voir _copier_bloc)
+        :return: (position atteinte, méthode de copie pour la suite)
+        """
+        os.posix_fadvise(fd_source, position, 0, os.POSIX_FADV_SEQUENTIAL)
+        avance = position  # Fin de la zone déjà demandée au disque source
+        while position < total:
+            limite = min(total, position + TAILLE_BLOC_PIPELINE * (PROFONDEUR_PIPELINE_COPIE + 1))
+            if limite > avance:
+                os.posix_fadvise(fd_source, avance, limite - avance, os.POSIX_FADV_WILLNEED)
+                avance = limite
+            copies, methode = self._copier_bloc(
+                fd_source, fd_destination, position,
+                min(self.limiteur_octets.taille_bloc(TAILLE_BLOC_PIPELINE), total - position), methode)
+            if copies == 0:
+                break
+            position += copies
+            self._limiter(self.limiteur_octets, copies)
+            if self.callback_octets:
+                self.callback_octets(position, total, source)
+        return position, methode
+
+    def _position_reprise(self, source: str, partiel: str, infos_source: os.stat_result) -> int:
+        """
+        Détermine à partir de quel octet reprendre une copie interrompue
+        :return: Position de reprise (0 si le fichier partiel est inexploitable)
+        """
+        try:
+            infos_partiel = os.stat(partiel)
+        except FileNotFoundError:
+            return 0
+        
+        position = infos_partiel.st_size
+        # Le fichier partiel doit être plus court que la source et postérieur à sa dernière modification
+        if position > infos_source.st_size or infos_partiel.st_mtime < infos_source.st_mtime:
+            return 0
+        
+        # Contrôle de cohérence sur le dernier bloc déjà copié
+        controle = min(position, 64 * 1024)
+        with open(source, 'rb') as f_source, open(partiel, 'rb') as f_partiel:
+            f_source.seek(position - controle)
+            f_partiel.seek(position - controle)
+            if f_source.read(controle) != f_partiel.read(controle):
+                return 0
+        return position
+
+    def transferer_inter_peripherique(self, source: str, destination: str):
+        """
+        Copie un fichier vers un autre périphérique par blocs, vérifie la copie puis supprime la source
+        
+        La copie est écrite sous un nom temporaire (reprise possible après interruption),
+        synchronisée sur disque et contrôlée en taille avant la suppression de la source.
+        Dates et permissions sont conservées.
+        :param source: Chemin source
+        :param destination: Chemin destination
+        """
+        partiel = destination + SUFFIXE_PARTIEL
+        infos_source = os.stat(source)
+        total = infos_source.st_size
+        position = self._position_reprise(source, partiel, infos_source)
+        if position:
+            logger.info(f"Reprise de la copie de {source} à l'octet {position}")
+            self.metriques.incrementer("copies_reprises")
+        self.metriques.incrementer("transferts_inter_peripheriques")
+        
+        self.verifier_espace_disque(os.path.dirname(destination), total - position)
+        # Méthode propre à ce transfert : les ouvriers de la voie de flux copient en parallèle
+        methode = "copy_file_range" if hasattr(os, "copy_file_range") else (
+            "sendfile" if hasattr(os, "sendfile") else "lecture")
+        
+        drapeaux_binaire = getattr(os, "O_BINARY", 0)
+        fd_source = os.open(source, os.O_RDONLY | drapeaux_binaire)
+        try:
+            fd_destination = os.open(partiel, os.O_WRONLY | os.O_CREAT | drapeaux_binaire, 0o600)
+            try:
+                os.ftruncate(fd_destination, position)
+                if (self.config.get("copie_pipeline", False) and hasattr(os, "posix_fadvise")
+                        and total - position > TAILLE_BLOC_PIPELINE):
+                    self.metriques.incrementer("copies_pipeline")
+                    position, methode = self._copier_pipeline(fd_source, fd_destination, position, total, source,
+                                                              methode)
+                while position < total:
+                    taille_bloc = self.limiteur_octets.taille_bloc(TAILLE_BLOC_COPIE)
+                    copies, methode = self._copier_bloc(fd_source, fd_destination, position,
+                                                        min(taille_bloc, total - position), methode)
+                    if copies == 0:
+                        break
+                    position += copies
+                    self._limiter(self.limiteur_octets, copies)
+                    if self.callback_octets:
+                        self.callback_octets(position, total, source)
+                os.fsync(fd_destination)
+            finally:
+                os.close(fd_destination)
+        finally:
+            os.close(fd_source)
+        
+        taille_copie = os.path.getsize(partiel)
+        if taille_copie != total or os.path.getsize(source) != total:
+            raise TrieurError(f"Copie incomplète de {source}: {taille_copie}/{total} octets")
+        
+        shutil.copystat(source, partiel)
+        try:
+            self.systeme_fichiers.rename_noreplace(partiel, destination)
+        except FileExistsError:
+            os.remove(partiel)  # Destination prise pendant la copie : le déplacement sera replanifié
+            raise
+        self._synchroniser_dossier(os.path.dirname(destination))
+        os.unlink(source)
+        self.metriques.incrementer(f"copies_{methode}")
+        self.journal_fichiers.info("transfert", "Fichier transféré entre périphériques (%s octets, %s): %s -> %s",
+                                   total, methode, source, destination)
+
+    @staticmethod
+    def _synchroniser_dossier(chemin_dossier: str):
+        """
+        Force l'écriture sur disque de l'entrée de répertoire (sans effet sous Windows)
+        """
+        if os.name == "nt":
+            return
+        fd = os.open(chemin_dossier, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def effectuer_rollback(self) -> List[str]:
+        """
+        Effectue un rollback des opérations réalisées en cas d'erreur
+        :return: Liste des erreurs rencontrées pendant le rollback (attribut metriques inclus)
+        """
+        metriques = MetriquesExecution("rollback")
+        erreurs_rollback = []
+        self._dossiers_existants = set()  # Les dossiers créés vont être supprimés
+        logger.info(f"Début du rollback de {len(self.operations_realisees)} opérations")
+        
+        # Inverser l'ordre des opérations
+        operations_inverses = reversed(self.operations_realisees)
+        
+        for operation in operations_inverses:
+            try:
+                if operation[0] == "move_file":
+                    source, destination = operation[1], operation[2]
+                    if self.systeme_fichiers.exists(destination):
+                        with metriques.mesurer("rollback_deplacement"):
+                            self.renommer_ou_transferer(destination, source)
+                        metriques.incrementer("fichiers_restaures")
+                        self.journal_fichiers.info("rollback_fichier", "Rollback: fichier restauré %s -> %s",
+                                                   destination, source)
+                        
+                elif operation[0] == "link_file":
+                    destination = operation[2]
+                    if self.systeme_fichiers.lexists(destination):
+                        with metriques.mesurer("rollback_suppression_lien"):
+                            self.systeme_fichiers.remove(destination)
+                        metriques.incrementer("liens_supprimes")
+                        
+                elif operation[0] == "create_dir":
+                    dossier = operation[1]
+                    if self.systeme_fichiers.exists(dossier) and not self.systeme_fichiers.listdir(dossier):
+                        with metriques.mesurer("rollback_suppression_dossier"):
+                            self.systeme_fichiers.rmdir(dossier)
+                        metriques.incrementer("dossiers_supprimes")
+                        self.journal_fichiers.info("rollback_dossier", "Rollback: dossier supprimé %s", dossier)
+                        
+            except Exception as e:
+                metriques.erreur(e)
+                erreur_msg = f"Erreur lors du rollback de l'opération {operation}: {e}"
+                logger.error(erreur_msg)
+                erreurs_rollback.append(erreur_msg)
+        
+        self.operations_realisees.clear()
+        self.exporter_metriques(metriques)
+        return RapportRollback(erreurs_rollback, metriques)
+
+    def exporter_metriques(self, metriques: MetriquesExecution):
+        """
+        Écrit les métriques dans les fichiers configurés (rapport JSON, textfile Prometheus)
+        :param metriques: Mesures de l'exécution terminée
+        """
+        if self.limiteur_operations.debit or self.limiteur_octets.debit:
+            metriques.informations["limitation_debit"] = {
+                "operations_par_seconde": {"limite": self.limiteur_operations.debit,
+                                           "effectif": round(self.limiteur_operations.debit_effectif(), 3)},
+                "octets_par_seconde": {"limite": self.limiteur_octets.debit,
+                                       "effectif": round(self.limiteur_octets.debit_effectif(), 3)},
+            }
+        for cle, ecrire in (("fichier_rapport_json", metriques.ecrire_json),
+                            ("fichier_prometheus", metriques.ecrire_textfile_prometheus)):
+            chemin = self.config.get(cle)
+            if chemin:
+                try:
+                    ecrire(chemin)
+                except OSError as e:
+                    logger.warning(f"Impossible d'écrire les métriques dans {chemin}: {e}")
+
+    def ouvrir_index(self, creer: bool = True):
+        """
+        Ouvre l'index SQLite du dossier source
+        :param creer: Créer l'index s'il n'existe pas encore
+        :return: IndexFichiers, ou None si l'index est désactivé ou inaccessible
+        """
+        if not self.config.get("index_sqlite", True) or not self.dossier_source \
+                or not self.systeme_fichiers.local or not os.path.isdir(self.dossier_source):
+            return None
+        chemin = os.path.join(self.dossier_source, FICHIER_INDEX)
+        if not creer and not os.path.isfile(chemin):
+            return None
+        try:
+            return IndexFichiers(chemin)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Index indisponible ({chemin}): {e}")
+            return None
+
+    def fermer_index(self):
+        if self.index is not None:
+            self.index.fermer()
+            self.index = None
+
+    def _historique_tri(self) -> HistoriqueTri:
+        return HistoriqueTri(self.dossier_source, self.systeme_fichiers)
+
+    def enregistrer_historique(self, debut: float):
+        """
+        Ajoute le tri terminé à l'historique
+        :param debut: Horodatage de début du tri
+        :return: Identifiant de l'exécution, ou None si aucun fichier n'est resté trié
+        """
+        placements = [placement for placement in self._placements if placement[0] in self.sauvegarde]
+        if not placements:
+            return None
+        informations = {"debut": debut, "fin": time.time(), "type_tri": self.config.get("type_tri", "type"),
+                        "fichiers": len(placements), "destination": self.racine_destination()}
+        try:
+            return self._historique_tri().creer_execution(informations, placements, self._empreintes)
+        except OSError as e:
+            logger.warning(f"Impossible d'enregistrer le tri dans l'historique: {e}")
+            return None
+
+    def enregistrer_quarantaine(self, nouvelles: Dict[str, Dict]):
+        """
+        Met à jour la liste des fichiers en quarantaine du dossier source : les fichiers qui ne sont
+        plus à leur place d'origine en sortent, ceux du dernier tri y entrent
+        :param nouvelles: Fichiers mis en quarantaine par le tri, {source: {destination, tentatives, erreur}}
+        """
+        chemin = os.path.join(self.dossier_source, FICHIER_QUARANTAINE)
+        try:
+            with self.systeme_fichiers.open(chemin, encoding="utf-8") as f:
+                quarantaine = json.load(f)
+        except FileNotFoundError:
+            quarantaine = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Liste de quarantaine illisible ({chemin}): {e}")
+            quarantaine = {}
+        
+        quarantaine = {source: infos for source, infos in quarantaine.items() if self.systeme_fichiers.lexists(source)}
+        date = datetime.datetime.now().isoformat(timespec="seconds")
+        quarantaine.update({source: dict(infos, date=date) for source, infos in nouvelles.items()})
+        if nouvelles:
+            self.metriques.informations["quarantaine"] = nouvelles
+        try:
+            if quarantaine:
+                self.systeme_fichiers.ecrire_atomiquement(chemin, json.dumps(quarantaine, ensure_ascii=False, indent=2))
+            elif self.systeme_fichiers.exists(chemin):
+                self.systeme_fichiers.remove(chemin)
+        except OSError as e:
+            logger.warning(f"Impossible d'enregistrer la quarantaine dans {chemin}: {e}")
+
+    def appliquer_retention(self):
+        """
+        Compacte les exécutions au-delà de la rétention configurée
+        """
+        conserver = self.config.get("retention_executions", 20)
+        if conserver <= 0:
+            return
+        try:
+            compactees = self._historique_tri().compacter(conserver)
+            if compactees and self.index is not None:
+                self.index.compacter_executions(compactees)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Impossible de compacter l'historique: {e}")
+            return
+        if compactees:
+            logger.info(f"Historique: {len(compactees)} exécution(s) compactée(s)")
+
+    def derniere_execution(self):
+        """
+        :return: Identifiant du dernier tri de l'historique (celui du journal de restauration), ou None
+        """
+        executions = [execution for execution in self._historique_tri().identifiants() if execution > 0]
+        return executions[-1] if executions else None
+
+    def historique(self) -> List[Dict]:
+        """
+        :return: Exécutions de l'historique (en-tête et nombre de fichiers encore triés)
+        """
+        if not self.dossier_source:
+            return []
+        return self._historique_tri().executions()
+
+    def selectionner_restauration(self, execution: int = None, categorie: str = None, periode: Tuple = None,
+                                  motif: str = None) -> List[Tuple[str, str, int]]:
+        """
+        Sélectionne des fichiers triés d'après l'index (ou, sans index, d'après l'historique)
+        :param execution: Identifiant d'un tri
+        :param categorie: Dossier de tri relatif ("Documents", "Par Date/2024-01"...), sous-dossiers compris
+        :param periode: (début, fin) de la date de modification des fichiers : dates, datetimes ou "AAAA-MM-JJ"
+        :param motif: Motif glob sur le nom ou le chemin d'origine relatif ("*.pdf", "Projets/*")
+        :return: [(chemin actuel, chemin d'origine, exécution, type de lien ou None)]
+        """
+        bornes = None
+        if periode is not None:
+            debut, fin = (datetime.datetime.fromisoformat(borne) if isinstance(borne, str) else borne
+                          for borne in periode)
+            if not isinstance(debut, datetime.datetime):
+                debut = datetime.datetime.combine(debut, datetime.time.min)
+            if not isinstance(fin, datetime.datetime):
+                fin = datetime.datetime.combine(fin, datetime.time.max)
+            bornes = (int(debut.timestamp() * 10 ** 9), int(fin.timestamp() * 10 ** 9))
+        categorie = categorie.strip("/") if categorie else None
+        
+        if self.index is not None:
+            lignes = self.index.selectionner_placements(execution, categorie, bornes)
+        else:
+            lignes = []
+            for destination, placement in sorted(self._historique_tri().entrees_actives().items()):
+                if execution is not None and placement["execution"] != execution:
+                    continue
+                if categorie and placement["categorie"] != categorie \
+                        and not placement["categorie"].startswith(categorie + "/"):
+                    continue
+                if bornes is not None and not bornes[0] <= placement["mtime_ns"] <= bornes[1]:
+                    continue
+                lignes.append((destination, placement["source"], placement["execution"], placement.get("lien")))
+        
+        if motif:
+            lignes = [ligne for ligne in lignes
+                      if fnmatch.fnmatch(os.path.basename(ligne[1]), motif)
+                      or fnmatch.fnmatch(os.path.relpath(ligne[1], self.dossier_source).replace(os.sep, "/"), motif)]
+        return lignes
+
+    def mettre_a_jour_index(self, debut: float, execution: int = None):
+        """
+        Enregistre dans l'index les dossiers relus et les fichiers placés par le tri
+        :param debut: Horodatage de début du tri
+        :param execution: Identifiant du tri dans l'historique
+        """
+        if self.index is None:
+            return
+        
+        # Les dossiers d'où des fichiers sont partis ont changé depuis leur relevé, tout
+        # comme ceux modifiés juste avant : ils seront relus au prochain tri
+        modifies = {os.path.dirname(placement[1]) for placement in self._placements}
+        limite = time.time_ns() - MARGE_RELEVE_NS
+        releves = {dossier: releve for dossier, releve in self._releves.items()
+                   if dossier not in modifies and releve[0] < limite}
+        placements = [placement for placement in self._placements if placement[0] in self.sauvegarde]
+        try:
+            with self.metriques.mesurer("ecriture_index"):
+                self.index.enregistrer_releves(releves, modifies | (self._releves.keys() - releves.keys()))
+                if placements and execution is not None:
+                    self.index.enregistrer_execution(execution, "tri", debut, placements)
+        except sqlite3.Error as e:
+            logger.warning(f"Impossible de mettre à jour l'index: {e}")
+        self._releves = {}
+
+    def statistiques_index(self) -> Dict:
+        """
+        Lit l'index sans parcourir le dossier source
+        :return: {"categories": [(catégorie, fichiers, octets)], "dernier_tri": [(source, destination, taille)]},
+                 vide si aucun index n'existe
+        """
+        index = self.ouvrir_index(creer=False)
+        if index is None:
+            return {}
+        try:
+            return {"categories": index.statistiques_categories(), "dernier_tri": index.changements_dernier_tri()}
+        except sqlite3.Error as e:
+            logger.warning(f"Index illisible: {e}")
+            return {}
+        finally:
+            index.fermer()
+
+    def _executer_profile(self, fonction, *args):
+        """
+        Exécute une opération, sous profilage si la configuration le demande
+        :param fonction: Opération à exécuter (_trier_fichiers, _restaurer_fichiers)
+        :return: Résultat de l'opération
+        """
+        if not self.config.get("profilage", False):
+            return fonction(*args)
+        
+        profileur = ProfileurExecution(self.metriques.execution)
+        with profileur:
+            resultat = fonction(*args)
+        
+        dossier = self.config.get("dossier_profilage") or os.path.dirname(os.path.abspath(_fichier_journal))
+        try:
+            fichiers = profileur.ecrire(dossier)
+            self.metriques.informations["profil"] = fichiers
+            logger.info(f"Profil écrit: {fichiers['pstats']}")
+        except OSError as e:
+            logger.warning(f"Impossible d'écrire le profil dans {dossier}: {e}")
+        return resultat
+
+    def reinitialiser_caches(self):
+        """
+        Vide les caches de classification (à appeler quand la configuration change)
+        """
+        self._cache_types = {}  # extension -> nom du dossier de type
+        self._cache_chemins = {}  # tuple de clés -> chemin du dossier de destination
+        self._hierarchie = None  # (préfixe, fonctions de clé) du mode de tri courant
+        self._dossiers_autorises = set()  # dossiers d'origine dont on a le droit de retirer des fichiers
+        self._dossiers_existants = set()  # dossiers de destination déjà créés ou vérifiés
+        if hasattr(self, "journal_fichiers"):
+            self.journal_fichiers.seuil = self.config.get("seuil_journal_fichiers", 1000)
+            self.journal_fichiers.taux = max(1, self.config.get("taux_echantillonnage_journal", 100))
+        if hasattr(self, "limiteur_operations"):
+            self.ajuster_limites(self.config.get("limite_operations_par_seconde", 0),
+                                 self.config.get("limite_octets_par_seconde", 0))
+        
+        # Seuils de taille triés pour la recherche dichotomique
+        categories = sorted(self.config.get("categories_tailles", CONFIG_PAR_DEFAUT["categories_tailles"]),
+                            key=lambda categorie: categorie[1])
+        noms_affiches = self.config.get("tailles_fichiers", {})
+        self._seuils_tailles = [int(seuil) for _, seuil in categories]
+        self._noms_tailles = [noms_affiches.get(nom, nom) for nom, _ in categories]
+        
+        try:
+            self._classificateur_dates = ClassificateurDates(self.config.get("granularite_date", "mois"))
+        except TrieurError as e:
+            logger.error(f"{e} - granularité mensuelle utilisée")
+            self._classificateur_dates = ClassificateurDates("mois")
+
+    def obtenir_type_fichier(self, fichier: str) -> str:
+        """
+        Détermine le type d'un fichier en fonction de son extension
+        :param fichier: Chemin du fichier
+        :return: Type du fichier ou "Autres" si inconnu
+        """
+        _, extension = os.path.splitext(fichier.lower())
+        type_fichier = self._cache_types.get(extension)
+        if type_fichier is None:
+            type_fichier = "Autres"
+            for type_connu, extensions in TYPES_FICHIERS.items():
+                if extension in extensions:
+                    type_fichier = self.config.get("noms_dossiers", {}).get(type_connu, type_connu)
+                    break
+            self._cache_types[extension] = type_fichier
+        return type_fichier
+
+    def obtenir_categorie_taille(self, taille: int) -> str:
+        """
+        Détermine la catégorie de taille d'un fichier
+        :param taille: Taille du fichier en octets
+        :return: Catégorie de taille
+        """
+        indice = bisect_right(self._seuils_tailles, taille) - 1
+        if indice < 0:
+            return "Autres"
+        return self._noms_tailles[indice]
+
+    def obtenir_categorie_date(self, date_timestamp: float) -> str:
+        """
+        Détermine la catégorie de date d'un fichier
+        :param date_timestamp: Timestamp de la date de modification du fichier
+        :return: Catégorie de date (ex: "2023-01" pour la granularité mensuelle)
+        """
+        return self._classificateur_dates.categorie(date_timestamp)
+
+    def classer_lot(self, tailles, dates) -> Tuple[List[str], List[str]]:
+        """
+        Classe en une fois un lot de fichiers issus d'un parcours
+        :param tailles: Séquence des tailles en octets
+        :param dates: Séquence des timestamps de modification
+        :return: Tuple (catégories de taille, catégories de date)
+        """
+        if np is not None and len(tailles):
+            indices = np.searchsorted(self._seuils_tailles, np.asarray(tailles, dtype=np.int64), side="right") - 1
+            categories_tailles = [self._noms_tailles[i] if i >= 0 else "Autres" for i in indices.tolist()]
+        else:
+            categories_tailles = [self.obtenir_categorie_taille(taille) for taille in tailles]
+        return categories_tailles, self._classificateur_dates.categories_lot(dates)
+
+    def _cle_type(self, fichier: str, infos_stat: os.stat_result) -> str:
+        return self.obtenir_type_fichier(fichier)
+
+    def _cle_extension(self, fichier: str, infos_stat: os.stat_result) -> str:
+        _, extension = os.path.splitext(fichier.lower())
+        return extension[1:]  # Supprimer le point (vide si pas d'extension)
+
+    def _cle_date(self, fichier: str, infos_stat: os.stat_result) -> str:
+        return self.obtenir_categorie_date(infos_stat.st_mtime)
+
+    def _cle_taille(self, fichier: str, infos_stat: os.stat_result) -> str:
+        return self.obtenir_categorie_taille(infos_stat.st_size)
+
+    def obtenir_hierarchie(self) -> Tuple[Tuple[str, ...], List]:
+        """
+        Traduit le mode de tri en hiérarchie de clés
+        :return: Tuple (préfixe fixe du chemin, liste ordonnée des fonctions de clé)
+        """
+        if self._hierarchie is not None:
+            return self._hierarchie
+
+        fonctions_cles = {
+            "type": self._cle_type,
+            "extension": self._cle_extension,
+            "date": self._cle_date,
+            "taille": self._cle_taille,
+        }
+        type_tri = self.config.get("type_tri", "type")
+
+        if type_tri == "type":
+            prefixe, cles = (), ["type"]
+            if self.config.get("sous_dossiers_par_extension", True):
+                cles.append("extension")
+        elif type_tri == "date":
+            prefixe, cles = ("Par Date",), ["date"]
+        elif type_tri == "taille":
+            prefixe, cles = ("Par Taille",), ["taille"]
+        elif type_tri == "composite":
+            prefixe, cles = (), list(self.config.get("hierarchie_tri", CONFIG_PAR_DEFAUT["hierarchie_tri"]))
+            if not cles:
+                raise TrieurError("Hiérarchie de tri composite vide")
+        else:
+            raise TrieurError(f"Type de tri invalide: {type_tri}")
+
+        cles_inconnues = [cle for cle in cles if cle not in fonctions_cles]
+        if cles_inconnues:
+            raise TrieurError(f"Clés de tri inconnues: {', '.join(cles_inconnues)}")
+
+        self._hierarchie = (prefixe, [fonctions_cles[cle] for cle in cles])
+        return self._hierarchie
+
+    def racine_destination(self) -> str:
+        """
+        :return: Dossier sous lequel les dossiers triés sont créés (le dossier source par défaut)
+        """
+        return self.config.get("dossier_destination") or self.dossier_source
+
+    def creer_dossier_destination(self, fichier: str, infos_stat: os.stat_result = None,
+                                  categories: Dict = None) -> str:
+        """
+        Détermine le dossier de destination pour un fichier selon le mode de tri
+        :param fichier: Chemin du fichier
+        :param infos_stat: Résultat de os.stat déjà obtenu pour ce fichier (évite un nouvel appel)
+        :param categories: Valeurs de clés déjà calculées pour ce fichier : {fonction de clé: valeur}
+        :return: Chemin du dossier de destination
+        """
+        chemin_complet = os.path.join(self.dossier_source, fichier)
+        
+        try:
+            if infos_stat is None:
+                try:
+                    infos_stat = self.systeme_fichiers.stat(chemin_complet)
+                except OSError:
+                    infos_stat = None
+            if infos_stat is None or not stat.S_ISREG(infos_stat.st_mode):
+                logger.warning(f"Fichier inexistant: {chemin_complet}")
+                return None
+
+            try:
+                prefixe, fonctions_cles = self.obtenir_hierarchie()
+            except TrieurError as e:
+                logger.error(str(e))
+                return None
+
+            # Chaque niveau est calculé à partir du même enregistrement stat ;
+            # le chemin n'est construit qu'une fois par combinaison de clés.
+            if categories:
+                valeurs = tuple(categories[fonction] if fonction in categories else fonction(fichier, infos_stat)
+                                for fonction in fonctions_cles)
+            else:
+                valeurs = tuple(fonction(fichier, infos_stat) for fonction in fonctions_cles)
+            dossier_destination = self._cache_chemins.get(valeurs)
+            if dossier_destination is None:
+                segments = [valeur for valeur in valeurs if valeur]
+                dossier_destination = os.path.join(self.racine_destination(), *prefixe, *segments)
+                self._cache_chemins[valeurs] = dossier_destination
+                
+            return dossier_destination
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la détermination du dossier de destination pour {fichier}: {e}")
+            return None
+
+    def sauvegarder_emplacement_original(self, fichier: str, chemin_destination: str, chemin_source: str = None,
+                                         lien: str = None):
+        """
+        Enregistre l'emplacement original d'un fichier pour permettre la restauration
+        :param fichier: Nom du fichier
+        :param chemin_destination: Chemin de destination du fichier
+        :param chemin_source: Chemin d'origine (par défaut, le fichier à la racine du dossier source)
+        :param lien: Type de lien de la vue triée (tri virtuel) : le journal suffit alors à savoir
+                     que la restauration supprime la vue au lieu de déplacer le fichier
+        """
+        chemin_complet = chemin_source or os.path.join(self.dossier_source, fichier)
+        chemin_destination_complet = os.path.join(chemin_destination, fichier)
+        self.sauvegarde[chemin_destination_complet] = [chemin_complet, lien] if lien else chemin_complet
+
+    @staticmethod
+    def lire_entree_sauvegarde(valeur) -> Tuple[str, Optional[str]]:
+        """
+        :param valeur: Valeur du journal de restauration : chemin d'origine, ou [chemin d'origine, type de lien]
+        :return: (chemin d'origine, type de lien ou None)
+        """
+        return (valeur, None) if isinstance(valeur, str) else (valeur[0], valeur[1])
+
+    def _lien_vers(self, chemin_actuel: str, chemin_original: str) -> Optional[str]:
+        """
+        Reconnaît une entrée de vue triée dont le type de lien n'a pas été journalisé : la renommer
+        sur son original remplacerait le fichier par un lien vers lui-même
+        :return: Type de lien si chemin_actuel désigne le fichier d'origine, None sinon
+        """
+        if not self.systeme_fichiers.local:
+            return None
+        if os.path.islink(chemin_actuel):
+            if os.path.realpath(chemin_actuel) == os.path.realpath(chemin_original):
+                return "lien_symbolique"
+            return None
+        try:
+            if os.path.samestat(os.stat(chemin_actuel), os.stat(chemin_original)):
+                return "lien_physique"
+        except OSError:
+            pass
+        return None
+
+    def enregistrer_dossier_sortie(self, chemin_dossier: str):
+        """
+        Mémorise le dossier de premier niveau contenant un dossier créé par le tri
+        :param chemin_dossier: Dossier créé sous la racine de destination
+        """
+        racine = self.racine_destination()
+        relatif = os.path.relpath(chemin_dossier, racine)
+        premier_niveau = relatif.split(os.sep, 1)[0]
+        if premier_niveau not in (os.curdir, os.pardir):
+            self.dossiers_sortie.add(os.path.join(racine, premier_niveau))
+
+    def obtenir_dossiers_sortie(self) -> set:
+        """
+        Calcule les dossiers de premier niveau produits par le tri, à exclure du parcours récursif
+        :return: Ensemble de chemins complets (mis à jour au fil des créations de dossiers)
+        """
+        noms = set(TYPES_FICHIERS) | set(self.config.get("noms_dossiers", {}).values())
+        noms |= {"Autres", "Par Date", "Par Taille"}
+        racine = self.racine_destination()
+        self.dossiers_sortie = {os.path.join(racine, nom) for nom in noms}
+        if os.path.normpath(racine) != os.path.normpath(self.dossier_source):
+            # Une destination placée dans le dossier source n'est jamais parcourue
+            self.dossiers_sortie.add(os.path.normpath(racine))
+        
+        # Dossiers issus d'un tri précédent (hiérarchies composites notamment)
+        sauvegarde_path = os.path.join(self.dossier_source, ".trieur_sauvegarde.json")
+        if self.systeme_fichiers.isfile(sauvegarde_path):
+            try:
+                with self.systeme_fichiers.open(sauvegarde_path, 'r', encoding='utf-8') as f:
+                    for chemin_actuel in json.load(f):
+                        self.enregistrer_dossier_sortie(os.path.dirname(chemin_actuel))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Sauvegarde illisible, dossiers de tri précédents non exclus: {e}")
+        return self.dossiers_sortie
+
+    def charger_filtre_ignore(self) -> FiltreIgnore:
+        """
+        Compile les motifs par défaut, ceux de la configuration et ceux du fichier d'exclusion
+        :return: Filtre compilé
+        """
+        motifs = list(MOTIFS_IGNORES_PAR_DEFAUT) + list(self.config.get("motifs_ignores", []))
+        
+        chemin_fichier_ignore = os.path.join(self.dossier_source, self.config.get("fichier_ignore", ".trieurignore"))
+        if self.systeme_fichiers.isfile(chemin_fichier_ignore):
+            try:
+                with self.systeme_fichiers.open(chemin_fichier_ignore, 'r', encoding='utf-8') as f:
+                    motifs.extend(f.read().splitlines())
+            except OSError as e:
+                logger.warning(f"Fichier d'exclusion illisible {chemin_fichier_ignore}: {e}")
+        
+        return FiltreIgnore(motifs)
+
+    def parcourir_fichiers(self, recursif: bool = False, erreurs: List[str] = None) -> Iterator[EntreeFichier]:
+        """
+        Parcourt paresseusement le dossier source avec scandir
+        
+        Les dossiers de sortie du tri et les entrées exclues par le filtre (fichiers
+        cachés, téléchargements partiels, .trieurignore...) sont écartés pendant le
+        parcours, avant tout appel à stat. Seul un itérateur par niveau de profondeur
+        est ouvert : la mémoire dépend de la profondeur, pas du nombre de fichiers.
+        :param recursif: Descendre dans les sous-dossiers
+        :param erreurs: Liste recevant les erreurs d'accès aux sous-dossiers
+        :return: Générateur d'EntreeFichier
+        """
+        self.fichiers_decouverts = 0
+        dossiers_sortie = self.obtenir_dossiers_sortie()
+        self.filtre_ignore = self.charger_filtre_ignore()
+        self._releves = {}
+        # La racine est ouverte immédiatement : ses erreurs remontent à l'appelant
+        racine = self._ouvrir_dossier(self.dossier_source)
+        return self._parcourir(racine, recursif, dossiers_sortie, erreurs)
+
+    def _ouvrir_dossier(self, chemin: str) -> Tuple:
+        """
+        Ouvre un dossier pour le parcours. Avec l'index, un dossier dont le mtime n'a pas
+        changé depuis son dernier relevé est relu depuis l'index, sans listing ni stat
+        :param chemin: Dossier à ouvrir
+        :return: (itérateur d'entrées, chemin, mtime_ns, liste recevant le relevé ou None)
+        """
+        if self.index is None:
+            return self.systeme_fichiers.scandir(chemin), chemin, None, None
+        
+        mtime_ns = self.systeme_fichiers.stat(chemin).st_mtime_ns
+        try:
+            entrees = self.index.releve_dossier(chemin, mtime_ns)
+        except sqlite3.Error as e:
+            logger.warning(f"Index illisible pour {chemin}: {e}")
+            entrees = None
+        if entrees is not None:
+            self.metriques.incrementer("dossiers_depuis_index")
+            return iter(entrees), chemin, mtime_ns, None
+        return self.systeme_fichiers.scandir(chemin), chemin, mtime_ns, []
+
+    def _parcourir(self, racine: Tuple, recursif: bool, dossiers_sortie: set,
+                   erreurs: List[str]) -> Iterator[EntreeFichier]:
+        filtre = self.filtre_ignore
+        metriques = self.metriques
+        # Pile de (itérateur, chemin, mtime_ns, relevé, préfixe relatif "a/b/")
+        pile = [racine + ("",)]
+        debut = time.perf_counter()
+        
+        try:
+            while pile:
+                iterateur, _, _, releve, prefixe = pile[-1]
+                try:
+                    entree = next(iterateur)
+                except StopIteration:
+                    iterateur, chemin, mtime_ns, releve, _ = pile.pop()
+                    _fermer_iterateur(iterateur)
+                    if releve is not None:
+                        # Dossier lu en entier : son relevé peut alimenter l'index
+                        self._releves[chemin] = (mtime_ns, releve)
+                    continue
+                except OSError as e:
+                    _fermer_iterateur(pile.pop()[0])
+                    logger.error(f"Erreur pendant la lecture d'un dossier: {e}")
+                    if erreurs is not None:
+                        erreurs.append(f"Lecture du dossier interrompue: {e}")
+                    continue
+                
+                nom = entree.name
+                est_dossier = est_fichier = infos_stat = None
+                try:
+                    # is_dir s'appuie sur le type renvoyé par readdir : pas de stat ici
+                    est_dossier = entree.is_dir(follow_symlinks=False)
+                    if nom in FICHIERS_INTERNES or filtre.est_ignore(prefixe + nom, est_dossier):
+                        continue
+                    
+                    if est_dossier:
+                        est_fichier = False
+                        if recursif and entree.path not in dossiers_sortie:
+                            try:
+                                pile.append(self._ouvrir_dossier(entree.path) + (prefixe + nom + "/",))
+                            except OSError as e:
+                                logger.warning(f"Sous-dossier ignoré {entree.path}: {e}")
+                                if erreurs is not None:
+                                    erreurs.append(f"Sous-dossier inaccessible {entree.path}: {e}")
+                        continue
+                    
+                    est_fichier = entree.is_file()
+                    if est_fichier:
+                        infos_stat = entree.stat()
+                        self.fichiers_decouverts += 1
+                        # Temps de listing, filtrage et stat depuis le fichier précédent
+                        metriques.observer("parcours", time.perf_counter() - debut)
+                        yield EntreeFichier(entree.path, nom, infos_stat)
+                        debut = time.perf_counter()
+                except OSError as e:
+                    # Fichier disparu ou illisible entre le listing et le stat
+                    logger.warning(f"Entrée ignorée {entree.path}: {e}")
+                finally:
+                    if releve is not None:
+                        releve.append((nom, est_dossier, est_fichier, infos_stat))
+        finally:
+            for iterateur, *_ in pile:
+                _fermer_iterateur(iterateur)
+
+    def planifier_deplacement(self, entree: EntreeFichier, categories: Dict = None) -> Deplacement:
+        """
+        Classe un fichier et réserve son chemin de destination
+        :param entree: Fichier issu du parcours
+        :param categories: Catégories déjà calculées pour ce fichier (voir planifier_par_lots)
+        :return: Déplacement planifié, ou None si le fichier ne doit pas être déplacé
+        """
+        fichier = entree.nom
+        with self.metriques.mesurer("classification"):
+            dossier_destination = self.creer_dossier_destination(fichier, entree.infos_stat, categories)
+        if not dossier_destination:
+            return None
+        
+        chemin_destination = os.path.join(dossier_destination, fichier)
+        
+        # Tri virtuel relancé : le fichier figure déjà dans la vue
+        if self.config.get("mode_vue") and self._deja_dans_vue(entree.chemin, entree.infos_stat, chemin_destination):
+            return None
+        
+        # Gérer les doublons avec timestamp plus précis (y compris avec les destinations
+        # déjà réservées par des déplacements planifiés mais pas encore effectués)
+        chemin_destination = self.reserver_destination(dossier_destination, fichier)
+        
+        infos = entree.infos_stat
+        return Deplacement(entree.chemin, chemin_destination, infos.st_size, infos.st_mtime_ns,
+                           infos.st_ino, infos.st_dev)
+
+    def planifier_par_lots(self, entrees) -> Iterator[Deplacement]:
+        """
+        Planifie les fichiers du parcours par lots de TAILLE_LOT_CLASSIFICATION : les catégories de
+        taille et de date d'un lot sont calculées en une passe (classer_lot), les autres clés fichier
+        par fichier
+        :param entrees: Fichiers issus du parcours
+        :return: Déplacements planifiés, dans l'ordre du parcours
+        """
+        try:
+            _, fonctions_cles = self.obtenir_hierarchie()
+        except TrieurError:
+            fonctions_cles = []  # Mode de tri invalide : signalé fichier par fichier par creer_dossier_destination
+        par_lots = self._cle_taille in fonctions_cles or self._cle_date in fonctions_cles
+        entrees = iter(entrees)
+        while True:
+            lot = list(itertools.islice(entrees, TAILLE_LOT_CLASSIFICATION))
+            if not lot:
+                return
+            if par_lots:
+                with self.metriques.mesurer("classification"):
+                    tailles, dates = self.classer_lot([entree.infos_stat.st_size for entree in lot],
+                                                      [entree.infos_stat.st_mtime for entree in lot])
+                categories = ({self._cle_taille: taille, self._cle_date: date} for taille, date in zip(tailles, dates))
+            else:
+                categories = itertools.repeat(None)
+            for entree, categories_entree in zip(lot, categories):
+                deplacement = self.planifier_deplacement(entree, categories_entree)
+                if deplacement is not None:
+                    yield deplacement
+
+    def reserver_destination(self, dossier_destination: str, fichier: str) -> str:
+        """
+        Réserve un chemin libre pour un fichier : son nom, ou en cas de doublon son nom horodaté
+        :param dossier_destination: Dossier de destination
+        :param fichier: Nom du fichier
+        :return: Chemin réservé
+        """
+        reservees = self._destinations_reservees
+        chemin_destination = os.path.join(dossier_destination, fichier)
+        if chemin_destination in reservees or self.systeme_fichiers.lexists(chemin_destination):
+            base, extension = os.path.splitext(fichier)
+            timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')[:-3]
+            nouveau_nom = f"{base}_{timestamp}{extension}"
+            chemin_destination = os.path.join(dossier_destination, nouveau_nom)
+            compteur = 1
+            while chemin_destination in reservees or self.systeme_fichiers.lexists(chemin_destination):
+                nouveau_nom = f"{base}_{timestamp}_{compteur}{extension}"
+                chemin_destination = os.path.join(dossier_destination, nouveau_nom)
+                compteur += 1
+        reservees.add(chemin_destination)
+        return chemin_destination
+
+    def _deja_dans_vue(self, chemin_source: str, infos_source: os.stat_result, chemin_destination: str) -> bool:
+        """
+        :param chemin_source: Fichier d'origine
+        :param infos_source: stat du fichier d'origine, relevé au parcours
+        :param chemin_destination: Emplacement du fichier dans la vue
+        :return: True si la destination est un lien vers le fichier ou, en mode reflink, un clone de même contenu
+        """
+        try:
+            infos = self.systeme_fichiers.stat(chemin_destination)
+        except OSError:
+            return False
+        if os.path.samestat(infos, infos_source):
+            return True
+        # Un clone a son propre inode : seul son contenu le distingue d'un autre fichier de même taille.
+        # filecmp lit le disque directement : le tri virtuel n'existe que sur le disque local
+        return (self.config.get("mode_vue") == "reflink" and stat.S_ISREG(infos.st_mode)
+                and infos.st_size == infos_source.st_size
+                and filecmp.cmp(chemin_source, chemin_destination, shallow=False))
+
+    def executer_deplacement(self, deplacement: Deplacement):
+        """
+        Effectue un déplacement planifié et l'enregistre pour la restauration
+        :param deplacement: Déplacement issu de planifier_deplacement
+        """
+        while True:
+            try:
+                if self.config.get("mode_vue"):
+                    lien = self.lier_fichier_securise(deplacement.source, deplacement.destination)
+                else:
+                    self.deplacer_fichier_securise(deplacement.source, deplacement.destination, deplacement.taille)
+                    lien = None
+                break
+            except FileExistsError:
+                # Destination prise depuis la planification (autre tri vers la même racine) : nouveau nom
+                dossier_destination, nom = os.path.split(deplacement.destination)
+                deplacement = deplacement._replace(destination=self.reserver_destination(
+                    dossier_destination, os.path.basename(deplacement.source)))
+                self.metriques.incrementer("destinations_replanifiees")
+                logger.warning(f"{os.path.join(dossier_destination, nom)} existe déjà, "
+                               f"nouvelle destination: {deplacement.destination}")
+        
+        # Sauvegarder l'emplacement original pour restauration
+        dossier_destination, nom_final = os.path.split(deplacement.destination)
+        self.sauvegarder_emplacement_original(nom_final, dossier_destination, deplacement.source, lien)
+        categorie = os.path.relpath(dossier_destination, self.racine_destination()).replace(os.sep, "/")
+        if self.config.get("empreintes_contenu", False):
+            # Relue à la destination : la vérification après restauration la comparera à l'original
+            with self.metriques.mesurer("empreinte"):
+                self._empreintes[deplacement.destination] = empreinte_fichier(deplacement.destination,
+                                                                              self.systeme_fichiers)
+        self._placements.append((deplacement.destination, deplacement.source, deplacement.taille,
+                                 deplacement.mtime_ns, categorie, lien))
+
+    def annuler_tri(self):
+        """
+        Demande l'arrêt du tri en cours (les fichiers déjà déplacés sont conservés)
+        """
+        self._annulation.set()
+        if self.pipeline is not None:
+            self.pipeline.annulation.set()
+
+    def trier_fichiers(self, callback=None, callback_octets=None) -> RapportExecution:
+        """
+        Trie les fichiers selon le mode spécifié avec gestion d'erreurs améliorée
+        :param callback: Fonction de rappel pour mettre à jour la progression
+        :param callback_octets: Fonction de rappel (octets copiés, total, fichier) des copies entre périphériques
+        :return: Rapport se décomposant en (nombre de fichiers traités, liste des erreurs), avec ses métriques
+        """
+        return self._executer_tri("tri", callback, callback_octets)
+
+    def _executer_tri(self, nom_execution: str, callback, callback_octets,
+                      plan: Iterator[Deplacement] = None) -> RapportExecution:
+        self.metriques = MetriquesExecution(nom_execution)
+        debut = time.time()
+        self.index = self.ouvrir_index()
+        try:
+            with self.metriques.mesurer("total"):
+                fichiers_traites, erreurs = self._executer_profile(self._trier_fichiers, callback, callback_octets,
+                                                                   plan)
+            execution = self.enregistrer_historique(debut)
+            self.mettre_a_jour_index(debut, execution)
+            self.appliquer_retention()
+        finally:
+            self.fermer_index()
+        self.journal_fichiers.resumer()
+        if self.pipeline is not None:
+            self.metriques.informations["pipeline"] = self.pipeline.statistiques()
+        if self.voies is not None:
+            self.metriques.informations["voies"] = self.voies.statistiques()
+        self.exporter_metriques(self.metriques)
+        return RapportExecution(fichiers_traites, erreurs, self.metriques)
+
+    def _trier_fichiers(self, callback, callback_octets, plan: Iterator[Deplacement] = None) -> Tuple[int, List[str]]:
+        self.callback_octets = callback_octets
+        logger.info(f"Début du tri des fichiers dans {self.dossier_source}")
+        
+        # Vérifications préalables
+        if not self.dossier_source or not self.systeme_fichiers.isdir(self.dossier_source):
+            error_msg = "Dossier source invalide ou inexistant"
             logger.error(error_msg)
             return 0, [error_msg]
-        
-        if not fichiers:
-            msg = "Aucun fichier trouvé dans le dossier"
-            logger.warning(msg)
-            return 0, [msg]
             
         # Réinitialiser les variables
         self.sauvegarde = {}
         self.operations_realisees = []
+        self._placements = []
+        self._empreintes = {}
+        self.reinitialiser_caches()
+        self._destinations_reservees = set()
+        self._annulation.clear()
+        self.pipeline = None
+        self.voies = None
         erreurs = []
         fichiers_traites = 0
+        recursif = self.config.get("recursif", False)
+        
+        try:
+            entrees = self.parcourir_fichiers(recursif, erreurs) if plan is None else None
+        except PermissionError as e:
+            error_msg = f"Permission refusée pour lire le dossier source: {e}"
+            logger.error(error_msg)
+            return 0, [error_msg]
+        except OSError as e:
+            error_msg = f"Erreur d'accès au dossier source: {e}"
+            logger.error(error_msg)
+            return 0, [error_msg]
+        
+        if plan is not None:
+            # Plan calculé à l'avance : ni parcours ni classification, les déplacements validés
+            # passent directement aux étapes de déplacement
+            self.fichiers_decouverts = 0
+            deplacements, total = plan, None
+        elif self.config.get("pipeline", True):
+            # Parcours et classification tournent en amont : le premier déplacement
+            # n'attend pas la fin du listing, et les files bornées limitent l'avance prise
+            self.pipeline = PipelineTri(self, self.config.get("taille_files_pipeline", 1000))
+            deplacements = self.pipeline.demarrer(entrees)
+            total = None
+        else:
+            if not recursif:
+                entrees = list(entrees)
+            deplacements = self.planifier_par_lots(entrees)
+            total = None if recursif else self.fichiers_decouverts
         
         # Créer un fichier de sauvegarde avant de commencer
         sauvegarde_path = os.path.join(self.dossier_source, ".trieur_sauvegarde.json")
         
         try:
-            for i, fichier in enumerate(fichiers):
+            if self.config.get("ordonnancement", "parcours") == "inode":
+                # Tout le plan est connu avant le premier déplacement
+                with self.metriques.mesurer("ordonnancement"):
+                    deplacements = ordonner_par_inode(deplacements)
+                total = len(deplacements)
+            
+            verrou = threading.Lock()
+            verrou_progression = threading.Lock()  # Un seul thread à la fois rafraîchit la progression
+            position = 0
+            rollback_requis = False
+            tout_ou_rien = self.config.get("tout_ou_rien", False)
+            nouveaux_essais = FileNouvelEssai(self.config.get("tentatives_max", 3),
+                                              self.config.get("delai_nouvel_essai", 0.5))
+            self.nouveaux_essais = nouveaux_essais
+            
+            def traiter(deplacement: Deplacement, tentative: int = 1) -> bool:
+                """
+                :param tentative: Numéro de la tentative pour ce déplacement
+                :return: False si le tri doit s'arrêter (annulation, ou erreur critique en mode tout ou rien)
+                """
+                nonlocal fichiers_traites, position, rollback_requis
+                fichier = os.path.basename(deplacement.source)
                 try:
-                    # Ignorer les fichiers cachés et le fichier de sauvegarde
-                    if fichier.startswith('.') or fichier == ".trieur_sauvegarde.json":
-                        continue
-                        
-                    chemin_source = os.path.join(self.dossier_source, fichier)
-                    
-                    # Déterminer le dossier de destination
-                    dossier_destination = self.creer_dossier_destination(fichier)
-                    if not dossier_destination:
-                        continue
-                    
-                    chemin_destination = os.path.join(dossier_destination, fichier)
-                    
-                    # Gérer les doublons avec timestamp plus précis
-                    if os.path.exists(chemin_destination):
-                        base, extension = os.path.splitext(fichier)
-                        timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')[:-3]
-                        nouveau_nom = f"{base}_{timestamp}{extension}"
-                        chemin_destination = os.path.join(dossier_destination, nouveau_nom)
-                    
-                    # Sauvegarder l'emplacement original pour restauration
-                    nom_final = os.path.basename(chemin_destination)
-                    self.sauvegarder_emplacement_original(nom_final, dossier_destination)
+                    if self._annulation.is_set():
+                        raise TriAnnule("Tri annulé par l'utilisateur")
                     
                     # Déplacer le fichier avec la méthode sécurisée
-                    self.deplacer_fichier_securise(chemin_source, chemin_destination)
-                    fichiers_traites += 1
+                    self.executer_deplacement(deplacement)
+                    with verrou:
+                        fichiers_traites += 1
+                        position += 1
+                        actuel = position
                     
-                    # Mise à jour de la progression
-                    if callback:
-                        callback(i + 1, len(fichiers))
-                        
+                    # Mise à jour de la progression (en flux, le total est celui découvert jusqu'ici) ;
+                    # en voies parallèles, une mise à jour déjà en cours rend celle-ci inutile
+                    if callback and verrou_progression.acquire(blocking=False):
+                        try:
+                            callback(actuel, total or max(self.fichiers_decouverts, actuel))
+                        finally:
+                            verrou_progression.release()
+                    return True
+
+                except TriAnnule as e:
+                    self.metriques.erreur(e)
+                    logger.warning(str(e))
+                    with verrou:
+                        if str(e) not in erreurs:
+                            erreurs.append(str(e))
+                    return False
+
                 except (PermissionError_Custom, EspaceDisqueError, TrieurError) as e:
-                    error_msg = f"Erreur critique avec {fichier}: {str(e)}"
-                    logger.error(error_msg)
-                    erreurs.append(error_msg)
-                    
-                    # En cas d'erreur critique, effectuer un rollback
-                    rollback_errors = self.effectuer_rollback()
-                    if rollback_errors:
-                        erreurs.extend([f"Erreur de rollback: {err}" for err in rollback_errors])
-                    
-                    break  # Arrêter le traitement en cas d'erreur critique
+                    self.metriques.erreur(e)
+                    if tout_ou_rien:
+                        error_msg = f"Erreur critique avec {fichier}: {str(e)}"
+                        logger.error(error_msg)
+                        with verrou:
+                            erreurs.append(error_msg)
+                            # Mode tout ou rien : un rollback suit l'arrêt du traitement
+                            rollback_requis = True
+                        return False
                     
+                    # Le fichier (verrouillé, protégé...) sera retenté plus tard, le tri continue
+                    if nouveaux_essais.ajouter(deplacement, tentative, e):
+                        self.metriques.incrementer("nouveaux_essais")
+                        logger.warning(f"Échec de la tentative {tentative} pour {fichier}, nouvel essai prévu: {e}")
+                    else:
+                        self.metriques.incrementer("fichiers_quarantaine")
+                        error_msg = f"Fichier {fichier} mis en quarantaine après {tentative} tentatives: {str(e)}"
+                        logger.error(error_msg)
+                        with verrou:
+                            erreurs.append(error_msg)
+                            position += 1
+                    return True
+
                 except FileNotFoundError as e:
+                    self.metriques.erreur(e)
                     error_msg = f"Fichier {fichier} introuvable: {str(e)}"
                     logger.warning(error_msg)
-                    erreurs.append(error_msg)
-                    continue
-                    
+                    with verrou:
+                        erreurs.append(error_msg)
+                        position += 1
+                    return True
+
                 except Exception as e:
+                    self.metriques.erreur(e)
                     error_msg = f"Erreur inattendue avec {fichier}: {str(e)}"
                     logger.error(error_msg)
-                    erreurs.append(error_msg)
-                    continue
+                    with verrou:
+                        erreurs.append(error_msg)
+                        position += 1
+                    return True
+            
+            def reessayer(bloquant: bool) -> bool:
+                """
+                Retente les déplacements dont le délai est écoulé (tous, en attendant, si bloquant)
+                :return: False si le tri doit s'arrêter
+                """
+                while True:
+                    element = nouveaux_essais.extraire(bloquant, self._annulation)
+                    if element is None:
+                        return True
+                    if not traiter(*element):
+                        return False
+            
+            continuer = True
+            if self.config.get("voies_deplacement", False):
+                # Seuil de la plus grande catégorie de taille ("Grands" par défaut)
+                self.voies = VoiesDeplacement(self._seuils_tailles[-1] or TAILLES_FICHIERS["Grands"][0],
+                                              self.config.get("ouvriers_voie_rapide", 8),
+                                              self.config.get("ouvriers_voie_flux", 2),
+                                              self.config.get("taille_files_pipeline", 1000))
+                with self.metriques.mesurer("voies_deplacement"):
+                    self.voies.executer(deplacements, traiter)
+                continuer = not self.voies.arret.is_set()
+            else:
+                for deplacement in deplacements:
+                    # Les nouveaux essais arrivés à échéance passent entre deux déplacements
+                    if not traiter(deplacement) or not reessayer(bloquant=False):
+                        continuer = False
+                        break
             
+            if continuer and len(nouveaux_essais):
+                with self.metriques.mesurer("nouveaux_essais"):
+                    reessayer(bloquant=True)
+            if len(nouveaux_essais):
+                self.metriques.incrementer("nouveaux_essais_abandonnes", len(nouveaux_essais))
+            if self.voies is not None and callback and fichiers_traites:
+                callback(position, total or max(self.fichiers_decouverts, position))
+            self.enregistrer_quarantaine(nouveaux_essais.quarantaine)
+            
+            if rollback_requis:
+                rollback_errors = self.effectuer_rollback()
+                self.metriques.fusionner(rollback_errors.metriques)
+                if rollback_errors:
+                    erreurs.extend([f"Erreur de rollback: {err}" for err in rollback_errors])
+                self.sauvegarde = {}
+                fichiers_traites = 0
+            
+            if hasattr(deplacements, "close"):
+                deplacements.close()  # Arrête les étapes amont si la boucle a été interrompue
+            
+            # Annulation survenue pendant l'attente du pipeline (flux interrompu sans exception)
+            if self._annulation.is_set() and "Tri annulé par l'utilisateur" not in erreurs:
+                logger.warning("Tri annulé par l'utilisateur")
+                erreurs.append("Tri annulé par l'utilisateur")
+            
+            if self.fichiers_decouverts == 0:
+                msg = "Aucun fichier trouvé dans le dossier"
+                logger.warning(msg)
+                return 0, erreurs + [msg]
+
             # Enregistrer la sauvegarde seulement si des fichiers ont été traités
             if fichiers_traites > 0:
-                try:
-                    with open(sauvegarde_path, 'w', encoding='utf-8') as f:
-                        json.dump(self.sauvegarde, f, ensure_ascii=False, indent=2)
-                    logger.info(f"Sauvegarde créée: {sauvegarde_path}")
-                except Exception as e:
-                    error_msg = f"Impossible de créer la sauvegarde: {str(e)}"
-                    logger.error(error_msg)
-                    erreurs.append(error_msg)
+                self._ecrire_sauvegarde(sauvegarde_path, erreurs)
             
+            if self.pipeline is not None:
+                logger.info(f"Débit du pipeline: {self.pipeline.statistiques()}")
+            if self.voies is not None:
+                logger.info(f"Débit des voies de déplacement: {self.voies.statistiques()}")
+            self.metriques.incrementer("fichiers_decouverts", self.fichiers_decouverts)
             logger.info(f"Tri terminé: {fichiers_traites} fichiers traités, {len(erreurs)} erreurs")
             return fichiers_traites, erreurs
             
         except Exception as e:
+            self.metriques.erreur(e)
             error_msg = f"Erreur fatale pendant le tri: {str(e)}"
             logger.critical(error_msg)
+            if hasattr(deplacements, "close"):
+                deplacements.close()
+            
+            if not self.config.get("tout_ou_rien", False):
+                # Les déplacements terminés sont conservés et restent restaurables
+                if fichiers_traites > 0:
+                    self._ecrire_sauvegarde(sauvegarde_path, erreurs)
+                return fichiers_traites, [error_msg] + erreurs
             
-            # Effectuer un rollback complet
+            # Mode tout ou rien : rollback complet
             rollback_errors = self.effectuer_rollback()
+            self.metriques.fusionner(rollback_errors.metriques)
             if rollback_errors:
                 erreurs.extend([f"Erreur de rollback: {err}" for err in rollback_errors])
             
             return 0, [error_msg] + erreurs
 
-    def restaurer_fichiers(self, callback=None) -> Tuple[int, List[str]]:
+    def _ecrire_sauvegarde(self, sauvegarde_path: str, erreurs: List[str]):
+        """
+        Écrit le journal de restauration des fichiers déplacés par le tri
+        :param sauvegarde_path: Fichier .trieur_sauvegarde.json
+        :param erreurs: Liste des erreurs du tri, complétée en cas d'échec
+        """
+        try:
+            with self.metriques.mesurer("ecriture_journal"), \
+                    self.systeme_fichiers.open(sauvegarde_path, 'w', encoding='utf-8') as f:
+                json.dump(self.sauvegarde, f, ensure_ascii=False, indent=2)
+            logger.info(f"Sauvegarde créée: {sauvegarde_path}")
+        except Exception as e:
+            error_msg = f"Impossible de créer la sauvegarde: {str(e)}"
+            logger.error(error_msg)
+            erreurs.append(error_msg)
+
+    def _entete_plan(self) -> Dict:
+        return {"dossier_source": os.path.normpath(os.path.abspath(self.dossier_source)),
+                "dossier_destination": os.path.normpath(os.path.abspath(self.racine_destination())),
+                "mode_vue": self.config.get("mode_vue", "")}
+
+    def exporter_plan(self, chemin_plan: str, callback=None) -> RapportExecution:
+        """
+        Calcule le tri (parcours et classification) sans rien déplacer, et l'écrit dans un plan
+        à appliquer plus tard avec appliquer_plan
+        :param chemin_plan: Fichier du plan
+        :param callback: Fonction de rappel (déplacements planifiés, fichiers découverts)
+        :return: Rapport se décomposant en (nombre de déplacements planifiés, liste des erreurs), avec ses métriques
+        """
+        self.metriques = MetriquesExecution("plan")
+        self.index = self.ouvrir_index(creer=False)
+        try:
+            with self.metriques.mesurer("total"):
+                deplacements_planifies, erreurs = self._executer_profile(self._exporter_plan, chemin_plan, callback)
+        finally:
+            self.fermer_index()
+        if self.pipeline is not None:
+            self.metriques.informations["pipeline"] = self.pipeline.statistiques()
+        self.exporter_metriques(self.metriques)
+        return RapportExecution(deplacements_planifies, erreurs, self.metriques)
+
+    def _exporter_plan(self, chemin_plan: str, callback) -> Tuple[int, List[str]]:
+        if not self.dossier_source or not self.systeme_fichiers.isdir(self.dossier_source):
+            return 0, ["Dossier source invalide ou inexistant"]
+        self.reinitialiser_caches()
+        self._destinations_reservees = set()
+        self._annulation.clear()
+        self.pipeline = None
+        erreurs = []
+        
+        try:
+            entrees = self.parcourir_fichiers(self.config.get("recursif", False), erreurs)
+        except OSError as e:
+            return 0, [f"Erreur d'accès au dossier source: {e}"]
+        if self.config.get("pipeline", True):
+            self.pipeline = PipelineTri(self, self.config.get("taille_files_pipeline", 1000))
+            deplacements = self.pipeline.demarrer(entrees)
+        else:
+            deplacements = self.planifier_par_lots(entrees)
+        
+        def suivre(deplacements: Iterator[Deplacement]) -> Iterator[Deplacement]:
+            for i, deplacement in enumerate(deplacements, 1):
+                if self._annulation.is_set():
+                    raise TriAnnule("Plan annulé par l'utilisateur")
+                if callback:
+                    callback(i, max(self.fichiers_decouverts, i))
+                yield deplacement
+        
+        try:
+            if self.config.get("ordonnancement", "parcours") == "inode":
+                with self.metriques.mesurer("ordonnancement"):
+                    deplacements = ordonner_par_inode(deplacements)
+            entete = dict(self._entete_plan(), type_tri=self.config.get("type_tri", "type"), cree=time.time())
+            with self.metriques.mesurer("ecriture_plan"):
+                nombre = PlanDeplacements(chemin_plan, self.systeme_fichiers).ecrire(entete, suivre(deplacements))
+        except TriAnnule as e:
+            return 0, erreurs + [str(e)]
+        except OSError as e:
+            self.metriques.erreur(e)
+            return 0, erreurs + [f"Impossible d'écrire le plan: {e}"]
+        finally:
+            _fermer_iterateur(deplacements)
+        
+        self.metriques.incrementer("fichiers_decouverts", self.fichiers_decouverts)
+        self.metriques.incrementer("deplacements_planifies", nombre)
+        logger.info(f"Plan écrit: {chemin_plan} ({nombre} déplacements sur {self.fichiers_decouverts} fichiers)")
+        return nombre, erreurs
+
+    def valider_plan(self, deplacements: Iterator[Deplacement]) -> Iterator[Deplacement]:
+        """
+        Valide chaque déplacement d'un plan par un seul stat de sa source : un fichier modifié,
+        remplacé ou disparu depuis la planification est écarté. Une destination occupée entre-temps
+        l'est aussi, chaque dossier de destination n'étant listé qu'une fois
+        :param deplacements: Déplacements lus dans le plan
+        :return: Déplacements toujours valides
+        """
+        noms_dossiers = {}  # Dossier de destination -> noms présents avant l'application du plan
+        for deplacement in deplacements:
+            self.fichiers_decouverts += 1
+            with self.metriques.mesurer("validation_plan"):
+                try:
+                    infos = self.systeme_fichiers.stat(deplacement.source)
+                except OSError:
+                    infos = None
+                dossier, nom = os.path.split(deplacement.destination)
+                noms = noms_dossiers.get(dossier)
+                if noms is None:
+                    try:
+                        noms = noms_dossiers[dossier] = set(self.systeme_fichiers.listdir(dossier))
+                    except OSError:
+                        noms = noms_dossiers[dossier] = set()
+            if infos is None:
+                self.metriques.incrementer("plan_sources_disparues")
+                logger.warning(f"Plan: {deplacement.source} a disparu, déplacement ignoré")
+            elif (infos.st_size, infos.st_mtime_ns, infos.st_ino, infos.st_dev) != deplacement[2:]:
+                self.metriques.incrementer("plan_sources_modifiees")
+                logger.warning(f"Plan: {deplacement.source} a changé depuis la planification, déplacement ignoré")
+            elif nom in noms:
+                self.metriques.incrementer("plan_destinations_occupees")
+                logger.warning(f"Plan: {deplacement.destination} existe déjà, déplacement ignoré")
+            else:
+                yield deplacement
+
+    def appliquer_plan(self, chemin_plan: str, callback=None, callback_octets=None) -> RapportExecution:
+        """
+        Applique un plan écrit par exporter_plan, sans reclasser aucun fichier : les déplacements
+        validés (voir valider_plan) passent par les mêmes étapes qu'un tri (voies parallèles,
+        nouveaux essais, historique, restauration possible)
+        :param chemin_plan: Fichier du plan
+        :param callback: Fonction de rappel pour mettre à jour la progression
+        :param callback_octets: Fonction de rappel (octets copiés, total, fichier) des copies entre périphériques
+        :return: Rapport se décomposant en (nombre de fichiers déplacés, liste des erreurs), avec ses métriques
+        """
+        plan = PlanDeplacements(chemin_plan, self.systeme_fichiers)
+        try:
+            entete = plan.entete()
+        except (OSError, ValueError) as e:
+            return RapportExecution(0, [f"Plan illisible: {e}"], MetriquesExecution("application_plan"))
+        differences = [cle for cle, valeur in self._entete_plan().items() if entete.get(cle) != valeur]
+        if differences:
+            return RapportExecution(0, [f"Le plan a été calculé pour une autre configuration ({', '.join(differences)})"],
+                                    MetriquesExecution("application_plan"))
+        logger.info(f"Application du plan {chemin_plan} (calculé le "
+                    f"{datetime.datetime.fromtimestamp(entete.get('cree', 0)):%Y-%m-%d %H:%M})")
+        return self._executer_tri("application_plan", callback, callback_octets,
+                                  self.valider_plan(plan.deplacements()))
+
+    def retrier_fichiers(self, callback=None, callback_octets=None) -> RapportExecution:
         """
-        Restaure les fichiers à leur emplacement d'origine et supprime les dossiers créés
+        Applique la configuration actuelle aux fichiers déjà triés, sans restauration préalable :
+        seuls les fichiers dont le dossier de destination change sont déplacés, et un dossier
+        dont tout le contenu change de place (catégorie renommée) est renommé d'un bloc
         :param callback: Fonction de rappel pour mettre à jour la progression
-        :return: Tuple (nombre de fichiers restaurés, liste des erreurs)
+        :param callback_octets: Fonction de rappel (octets copiés, total, fichier) des copies entre périphériques
+        :return: Rapport se décomposant en (nombre de fichiers déplacés, liste des erreurs), avec ses métriques
         """
+        self.metriques = MetriquesExecution("retri")
+        self.index = self.ouvrir_index()
+        try:
+            with self.metriques.mesurer("total"):
+                fichiers_deplaces, erreurs = self._executer_profile(self._retrier_fichiers, callback, callback_octets)
+        finally:
+            self.fermer_index()
+        self.journal_fichiers.resumer()
+        self.exporter_metriques(self.metriques)
+        return RapportExecution(fichiers_deplaces, erreurs, self.metriques)
+
+    def _retrier_fichiers(self, callback, callback_octets) -> Tuple[int, List[str]]:
+        self.callback_octets = callback_octets
         sauvegarde_path = os.path.join(self.dossier_source, ".trieur_sauvegarde.json")
         
-        if not os.path.isfile(sauvegarde_path):
-            return 0, ["Aucune sauvegarde trouvée"]
+        sauvegarde = {}
+        if self.systeme_fichiers.isfile(sauvegarde_path):
+            with self.systeme_fichiers.open(sauvegarde_path, 'r', encoding='utf-8') as f:
+                sauvegarde = json.load(f)
+        # Tous les placements encore actifs de l'historique, pas seulement ceux du dernier tri
+        try:
+            suivis = {destination: placement["execution"]
+                      for destination, placement in self._historique_tri().entrees_actives().items()}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Historique illisible, re-tri limité au dernier tri: {e}")
+            suivis = {}
+        derniere = self.derniere_execution() if sauvegarde else None
+        for chemin_actuel in sauvegarde:
+            suivis.setdefault(chemin_actuel, derniere)
+        if not suivis:
+            return 0, ["Aucun fichier trié à re-trier"]
+        
+        self.reinitialiser_caches()
+        self._destinations_reservees = set()
+        self._annulation.clear()
+        try:
+            self.obtenir_hierarchie()
+        except TrieurError as e:
+            return 0, [str(e)]
+        logger.info(f"Début du re-tri de {len(suivis)} fichiers dans {self.dossier_source}")
+        
+        # Nouvelle destination de chaque fichier trié : seuls ceux qui changent de dossier sont retenus
+        a_deplacer = {}  # chemin actuel -> (nouveau dossier, infos stat)
+        for chemin_actuel in suivis:
+            try:
+                infos_stat = self.systeme_fichiers.stat(chemin_actuel)
+            except OSError:
+                self.metriques.incrementer("fichiers_absents")
+                continue
+            with self.metriques.mesurer("classification"):
+                dossier = self.creer_dossier_destination(os.path.basename(chemin_actuel), infos_stat)
+            if dossier and os.path.normpath(dossier) != os.path.normpath(os.path.dirname(chemin_actuel)):
+                a_deplacer[chemin_actuel] = (os.path.normpath(dossier), infos_stat)
+        self.metriques.incrementer("fichiers_inchanges", len(suivis) - len(a_deplacer))
+        
+        erreurs = []
+        fichiers_deplaces = 0
+        anciens_dossiers = {os.path.dirname(chemin) for chemin in a_deplacer}
+        deplacements_index = []
+        total = len(a_deplacer)
+        
+        try:
+            # Renommages de dossiers entiers (catégorie renommée...)
+            for ancien, nouveau in self.planifier_renommages_dossiers(suivis, a_deplacer):
+                try:
+                    self.systeme_fichiers.makedirs(os.path.dirname(nouveau), exist_ok=True)
+                    with self.metriques.mesurer("renommage_dossier"):
+                        self.systeme_fichiers.rename(ancien, nouveau)
+                except OSError as e:
+                    # Les fichiers du dossier seront déplacés un par un
+                    logger.warning(f"Renommage impossible {ancien} -> {nouveau}: {e}")
+                    continue
+                logger.info(f"Dossier renommé: {ancien} -> {nouveau}")
+                anciens_dossiers.add(os.path.dirname(ancien))
+                prefixe = ancien + os.sep
+                for chemin_actuel in [chemin for chemin in suivis if chemin.startswith(prefixe)]:
+                    nouveau_chemin = nouveau + chemin_actuel[len(ancien):]
+                    suivis[nouveau_chemin] = suivis.pop(chemin_actuel)
+                    if chemin_actuel in sauvegarde:
+                        sauvegarde[nouveau_chemin] = sauvegarde.pop(chemin_actuel)
+                    deplacements_index.append((chemin_actuel, nouveau_chemin, suivis[nouveau_chemin]))
+                    if a_deplacer.pop(chemin_actuel, None) is not None:
+                        fichiers_deplaces += 1
+                if callback:
+                    callback(fichiers_deplaces, total)
             
-        with open(sauvegarde_path, 'r') as f:
-            sauvegarde = json.load(f)
+            # Déplacements individuels
+            for chemin_actuel, (dossier, infos_stat) in list(a_deplacer.items()):
+                if self._annulation.is_set():
+                    erreurs.append("Re-tri annulé par l'utilisateur")
+                    break
+                try:
+                    deplacement = self.planifier_deplacement(
+                        EntreeFichier(chemin_actuel, os.path.basename(chemin_actuel), infos_stat))
+                    if deplacement is None:
+                        continue
+                    self.deplacer_fichier_securise(deplacement.source, deplacement.destination, deplacement.taille)
+                except Exception as e:
+                    self.metriques.erreur(e)
+                    error_msg = f"Erreur lors du re-tri de {os.path.basename(chemin_actuel)}: {str(e)}"
+                    logger.error(error_msg)
+                    erreurs.append(error_msg)
+                    continue
+                suivis[deplacement.destination] = suivis.pop(chemin_actuel)
+                if chemin_actuel in sauvegarde:
+                    sauvegarde[deplacement.destination] = sauvegarde.pop(chemin_actuel)
+                deplacements_index.append((chemin_actuel, deplacement.destination, suivis[deplacement.destination]))
+                fichiers_deplaces += 1
+                if callback:
+                    callback(fichiers_deplaces, total)
+        finally:
+            # Le journal suit l'état réel des fichiers, même après une erreur
+            if deplacements_index and sauvegarde:
+                with self.metriques.mesurer("ecriture_journal"), \
+                        self.systeme_fichiers.open(sauvegarde_path, 'w', encoding='utf-8') as f:
+                    json.dump(sauvegarde, f, ensure_ascii=False, indent=2)
+        
+        # Supprimer les anciens dossiers devenus vides, jusqu'à la racine de destination
+        racine = self.racine_destination()
+        for dossier in sorted(anciens_dossiers, key=lambda x: x.count(os.sep), reverse=True):
+            while (dossier.startswith(racine)
+                   and os.path.normpath(dossier) != os.path.normpath(racine)):
+                try:
+                    self.systeme_fichiers.rmdir(dossier)
+                except OSError:
+                    break  # Dossier non vide ou déjà supprimé
+                dossier = os.path.dirname(dossier)
+        
+        if deplacements_index:
+            deplacements_categories = [
+                (ancien, nouveau, os.path.relpath(os.path.dirname(nouveau), racine).replace(os.sep, "/"))
+                for ancien, nouveau, _ in deplacements_index]
+            # Chaque déplacement est consigné dans le journal de l'exécution qui a placé le fichier
+            par_execution = {}
+            for (ancien, nouveau, execution), (_, _, categorie) in zip(deplacements_index, deplacements_categories):
+                if execution is not None:
+                    par_execution.setdefault(execution, []).append({"ancien": ancien, "destination": nouveau, "categorie": categorie})
+            try:
+                for execution, evenements in par_execution.items():
+                    self._historique_tri().ajouter(execution, evenements)
+                if self.index is not None:
+                    self.index.deplacer_placements(deplacements_categories)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Impossible de mettre à jour l'historique: {e}")
+        
+        self.metriques.incrementer("fichiers_deplaces", fichiers_deplaces)
+        logger.info(f"Re-tri terminé: {fichiers_deplaces} fichiers déplacés, {len(erreurs)} erreurs")
+        return fichiers_deplaces, erreurs
+
+    def planifier_renommages_dossiers(self, suivis: Dict[str, object],
+                                      a_deplacer: Dict[str, Tuple]) -> List[Tuple[str, str]]:
+        """
+        Repère les dossiers de tri dont tout le contenu part vers un même nouveau dossier,
+        pour les renommer au lieu de déplacer leurs fichiers un à un. Un renommage est
+        remonté au dossier parent quand tous ses sous-dossiers suivent le même changement
+        (ex. Documents/pdf -> Docs/pdf et Documents/txt -> Docs/txt donnent Documents -> Docs)
+        :param suivis: Fichiers triés, indexés par leur chemin actuel
+        :param a_deplacer: {chemin actuel: (nouveau dossier, infos stat)} des fichiers qui changent de dossier
+        :return: Liste de (ancien dossier, nouveau dossier)
+        """
+        racine = os.path.normpath(self.racine_destination())
+        
+        def independants(ancien, nouveau):
+            # Ni imbriqués l'un dans l'autre, ni destination déjà existante
+            return (not self.systeme_fichiers.exists(nouveau)
+                    and not nouveau.startswith(ancien + os.sep) and not ancien.startswith(nouveau + os.sep))
+        
+        # Dossiers dont chaque fichier du journal a la même nouvelle destination
+        cibles = {}
+        for chemin_actuel in suivis:
+            dossier = os.path.dirname(chemin_actuel)
+            cible = a_deplacer[chemin_actuel][0] if chemin_actuel in a_deplacer else None
+            cibles.setdefault(dossier, set()).add(cible)
+        
+        renommages = {}
+        for dossier, cibles_dossier in cibles.items():
+            if len(cibles_dossier) != 1 or None in cibles_dossier:
+                continue
+            cible = cibles_dossier.pop()
+            try:
+                # Le dossier ne doit rien contenir d'autre que les fichiers triés
+                contenu = set(self.systeme_fichiers.listdir(dossier))
+            except OSError:
+                continue
+            noms = {os.path.basename(chemin) for chemin in suivis if os.path.dirname(chemin) == dossier}
+            if contenu == noms and independants(dossier, cible):
+                renommages[dossier] = cible
+        
+        # Remonter les renommages tant que des dossiers parents entiers suivent le même changement
+        modifie = True
+        while modifie:
+            modifie = False
+            parents = {}
+            for ancien, nouveau in renommages.items():
+                if os.path.basename(ancien) == os.path.basename(nouveau):
+                    parents.setdefault((os.path.dirname(ancien), os.path.dirname(nouveau)), []).append(ancien)
+            for (ancien, nouveau), enfants in parents.items():
+                if os.path.normpath(ancien) == racine or not ancien.startswith(racine + os.sep) \
+                        or not independants(ancien, nouveau):
+                    continue
+                try:
+                    contenu = self.systeme_fichiers.listdir(ancien)
+                except OSError:
+                    continue
+                if sorted(contenu) == sorted(os.path.basename(enfant) for enfant in enfants):
+                    for enfant in enfants:
+                        del renommages[enfant]
+                    renommages[ancien] = nouveau
+                    modifie = True
+        
+        # Deux dossiers vers la même cible : aucun renommage, les fichiers seront fusionnés
+        nombre_cibles = Counter(renommages.values())
+        return sorted((ancien, nouveau) for ancien, nouveau in renommages.items() if nombre_cibles[nouveau] == 1)
+
+    def restaurer_fichiers(self, callback=None, callback_octets=None, **selection) -> RapportExecution:
+        """
+        Restaure les fichiers à leur emplacement d'origine et supprime les dossiers créés.
+        Sans sélection, le dernier tri est annulé ; sinon, les fichiers de l'historique
+        correspondant à la sélection (voir selectionner_restauration) sont restaurés
+        :param callback: Fonction de rappel pour mettre à jour la progression
+        :param callback_octets: Fonction de rappel (octets copiés, total, fichier) des copies entre périphériques
+        :param selection: execution, categorie, periode et/ou motif
+        :return: Rapport se décomposant en (nombre de fichiers restaurés, liste des erreurs), avec ses métriques
+        """
+        self.metriques = MetriquesExecution("restauration")
+        self.index = self.ouvrir_index()
+        try:
+            with self.metriques.mesurer("total"):
+                fichiers_restaures, erreurs = self._executer_profile(self._restaurer_fichiers, callback,
+                                                                     callback_octets, selection)
+        finally:
+            self.fermer_index()
+        self.journal_fichiers.resumer()
+        self.exporter_metriques(self.metriques)
+        return RapportExecution(fichiers_restaures, erreurs, self.metriques)
+
+    def _restaurer_fichiers(self, callback, callback_octets, selection: Dict = None) -> Tuple[int, List[str]]:
+        self.callback_octets = callback_octets
+        sauvegarde_path = os.path.join(self.dossier_source, ".trieur_sauvegarde.json")
+        selection = {cle: valeur for cle, valeur in (selection or {}).items() if valeur not in (None, "")}
+        
+        if selection:
+            with self.metriques.mesurer("selection"):
+                items = self.selectionner_restauration(**selection)
+            if not items:
+                return 0, ["Aucun fichier de l'historique ne correspond à la sélection"]
+        else:
+            if not self.systeme_fichiers.isfile(sauvegarde_path):
+                return 0, ["Aucune sauvegarde trouvée"]
+                
+            with self.systeme_fichiers.open(sauvegarde_path, 'r') as f:
+                sauvegarde = json.load(f)
+                
+            if not sauvegarde:
+                return 0, ["Sauvegarde vide"]
             
-        if not sauvegarde:
-            return 0, ["Sauvegarde vide"]
+            # Le journal de restauration est celui du dernier tri de l'historique
+            derniere = self.derniere_execution()
+            liens = {}
+            if derniere is not None:
+                try:
+                    liens = {destination: placement.get("lien") for destination, placement
+                             in self._historique_tri().lire(derniere)[1].items()}
+                except OSError as e:
+                    logger.warning(f"Historique illisible: {e}")
+            items = []
+            for chemin_actuel, valeur in sauvegarde.items():
+                chemin_original, lien = self.lire_entree_sauvegarde(valeur)
+                items.append((chemin_actuel, chemin_original, derniere, liens.get(chemin_actuel) or lien))
             
         erreurs = []
         fichiers_restaures = 0
+        racine = self.racine_destination()
         dossiers_crees = set()
+        liberes = []  # Fichiers sortis des dossiers de tri (restaurés ou disparus)
+        liberes_par_execution = {}  # {exécution: [(emplacement trié, chemin d'origine)]}
+        archives = {}  # Archives de chaque dossier de période rencontré
+        extraits = {}  # Membres extraits de chaque archive : {chemin: (archive, [membres])}
+        verification = self.config.get("verification_restauration", False)
+        
+        # Première étape: restaurer les fichiers
+        for i, (chemin_actuel, chemin_original, execution, lien) in enumerate(items):
+            try:
+                if not lien:
+                    lien = self._lien_vers(chemin_actuel, chemin_original)
+                    if lien:
+                        logger.warning(f"{chemin_actuel} est un lien vers {chemin_original} : "
+                                       f"seul le lien est supprimé")
+                # Un lien de la vue triée peut pointer vers un original disparu : lexists
+                present = (self.systeme_fichiers.lexists(chemin_actuel) if lien
+                           else self.systeme_fichiers.isfile(chemin_actuel))
+                archive_membre = None if present or lien else self.rechercher_archive(chemin_actuel, archives)
+                if present:
+                    # Mémoriser le dossier parent et ses ancêtres (hiérarchies composites)
+                    # pour suppression ultérieure
+                    dossier_parent = os.path.dirname(chemin_actuel)
+                    while (dossier_parent not in dossiers_crees
+                           and dossier_parent.startswith(racine)
+                           and os.path.normpath(dossier_parent) != os.path.normpath(racine)):
+                        dossiers_crees.add(dossier_parent)
+                        dossier_parent = os.path.dirname(dossier_parent)
+                    
+                    if lien:
+                        # Tri virtuel : l'original n'a pas bougé, seule la vue est supprimée
+                        with self.metriques.mesurer("suppression_lien"):
+                            self.systeme_fichiers.remove(chemin_actuel)
+                    else:
+                        # Créer le dossier d'origine si nécessaire
+                        self.systeme_fichiers.makedirs(os.path.dirname(chemin_original), exist_ok=True)
+                        
+                        # Déplacer le fichier à son emplacement d'origine
+                        with self.metriques.mesurer("restauration"):
+                            self.renommer_ou_transferer(chemin_actuel, chemin_original)
+                    fichiers_restaures += 1
+                elif archive_membre is not None:
+                    # Fichier d'une période archivée : seul son flux de l'archive est décompressé
+                    archive, membre = archive_membre
+                    self.systeme_fichiers.makedirs(os.path.dirname(chemin_original), exist_ok=True)
+                    with self.metriques.mesurer("extraction_archive"):
+                        archive.extraire(membre, chemin_original)
+                    extraits.setdefault(archive.chemin, (archive, []))[1].append(membre)
+                    fichiers_restaures += 1
+                else:
+                    self.metriques.incrementer("fichiers_absents")
+                liberes.append(chemin_actuel)
+                liberes_par_execution.setdefault(execution, []).append((chemin_actuel, chemin_original))
+                
+                # Mise à jour de la progression
+                if callback:
+                    callback(i + 1, len(items))
+                    
+            except Exception as e:
+                self.metriques.erreur(e)
+                erreurs.append(f"Erreur lors de la restauration: {str(e)}")
+        
+        # Les membres extraits quittent l'index de leur archive, supprimée une fois vide
+        for archive, membres in extraits.values():
+            try:
+                if archive.retirer(membres):
+                    logger.info(f"Archive entièrement restaurée et supprimée: {archive.chemin}")
+            except OSError as e:
+                self.metriques.erreur(e)
+                erreurs.append(f"Impossible de mettre à jour l'archive {archive.chemin}: {str(e)}")
+        
+        # Deuxième étape: supprimer les dossiers créés (du plus profond au moins profond)
+        dossiers_a_supprimer = sorted(dossiers_crees, key=lambda x: x.count(os.sep), reverse=True)
+        
+        # Récupérer tous les dossiers de catégories possibles selon le type de tri
+        dossiers_categories = []
+        
+        # Dossiers de type
+        for categorie in self.config.get("noms_dossiers", {}).values():
+            dossiers_categories.append(os.path.join(racine, categorie))
+        
+        # Ajouter le dossier "Autres" qui est utilisé pour les fichiers sans type reconnu
+        dossiers_categories.append(os.path.join(racine, "Autres"))
+        
+        # Dossiers de date et taille
+        dossiers_categories.append(os.path.join(racine, "Par Date"))
+        dossiers_categories.append(os.path.join(racine, "Par Taille"))
+        
+        # Ajouter les dossiers de catégories à la liste à supprimer
+        for dossier in dossiers_categories:
+            if self.systeme_fichiers.isdir(dossier):
+                dossiers_a_supprimer.append(dossier)
+        
+        # Supprimer les dossiers vides
+        for dossier in dossiers_a_supprimer:
+            try:
+                # Vérifier que le dossier existe et est sous la racine de destination
+                if self.systeme_fichiers.isdir(dossier) and dossier.startswith(racine):
+                    # Vérifier si le dossier est vide
+                    if not self.systeme_fichiers.listdir(dossier):
+                        with self.metriques.mesurer("suppression_dossier"):
+                            self.systeme_fichiers.rmdir(dossier)
+                    else:
+                        # Tenter de supprimer récursivement les dossiers vides
+                        for root, dirs, files in self.systeme_fichiers.walk(dossier, topdown=False):
+                            if not files and not dirs:
+                                try:
+                                    self.systeme_fichiers.rmdir(root)
+                                except:
+                                    pass
+            except Exception as e:
+                self.metriques.erreur(e)
+                erreurs.append(f"Erreur lors de la suppression du dossier {dossier}: {str(e)}")
+        
+        self.metriques.incrementer("fichiers_restaures", fichiers_restaures)
+        
+        # Les restaurations sont ajoutées aux journaux des tris concernés
+        historique = self._historique_tri()
+        try:
+            for execution, restaures in liberes_par_execution.items():
+                if execution is not None:
+                    historique.ajouter(execution, [{"restaure": destination} for destination, _ in restaures])
+        except OSError as e:
+            erreurs.append(f"Impossible de mettre à jour l'historique: {str(e)}")
+        
+        encore_tries = True
+        if self.index is not None:
+            try:
+                self.index.supprimer_placements(liberes)
+                encore_tries = bool(self.index.statistiques_categories())
+            except sqlite3.Error as e:
+                logger.warning(f"Impossible de mettre à jour l'index: {e}")
+        else:
+            encore_tries = bool(historique.entrees_actives())
+        
+        if verification:
+            # Fichiers restés dans les dossiers de tri vidés par la restauration sans être suivis
+            if not encore_tries:
+                suivi = lambda chemin: False
+            elif self.index is not None:
+                suivi = self.index.contient_placement
+            else:
+                suivi = historique.entrees_actives().__contains__
+            
+            def attendus():
+                """
+                Fichiers restaurés et placement relevé au tri (taille, date, empreinte) : l'historique
+                est relu une exécution à la fois, restaurations comprises
+                """
+                for execution, restaures in liberes_par_execution.items():
+                    placements = {}
+                    if execution is not None:
+                        try:
+                            placements = historique.lire(execution, restaures=True)[1]
+                        except OSError as e:
+                            logger.warning(f"Historique du tri {execution} illisible: {e}")
+                    for chemin_actuel, chemin_original in restaures:
+                        yield chemin_original, placements.get(chemin_actuel)
+            
+            try:
+                with self.metriques.mesurer("verification"):
+                    resultat = self.verifier_restauration(
+                        attendus(), [dossier for dossier in dossiers_crees if self.systeme_fichiers.isdir(dossier)], suivi)
+            except OSError as e:
+                self.metriques.erreur(e)
+                resultat = None
+                erreurs.append(f"Vérification de la restauration impossible: {str(e)}")
+            self.metriques.informations["verification"] = resultat
+            if resultat and resultat["diff"]:
+                erreurs.append(f"Vérification: {resultat['manquants']} fichier(s) manquant(s), "
+                               f"{resultat['modifies']} modifié(s), {resultat['en_trop']} en trop "
+                               f"(détail dans {resultat['diff']})")
+        
+        if not encore_tries:
+            # Plus aucun fichier trié : le dossier retrouve son état d'origine, sans index ni historique
+            self.fermer_index()
+            for suffixe in ("", "-journal"):
+                chemin_index = os.path.join(self.dossier_source, FICHIER_INDEX + suffixe)
+                if self.systeme_fichiers.exists(chemin_index):
+                    self.systeme_fichiers.remove(chemin_index)
+            historique.supprimer()
+        
+        # Supprimer le fichier de sauvegarde après restauration (ou en retirer les fichiers restaurés)
+        try:
+            if selection and self.systeme_fichiers.isfile(sauvegarde_path):
+                with self.systeme_fichiers.open(sauvegarde_path, 'r', encoding='utf-8') as f:
+                    sauvegarde = json.load(f)
+                for destination in liberes:
+                    sauvegarde.pop(destination, None)
+                if sauvegarde:
+                    with self.systeme_fichiers.open(sauvegarde_path, 'w', encoding='utf-8') as f:
+                        json.dump(sauvegarde, f, ensure_ascii=False, indent=2)
+                else:
+                    self.systeme_fichiers.remove(sauvegarde_path)
+            else:
+                self.systeme_fichiers.remove(sauvegarde_path)
+        except:
+            pass
+            
+        return fichiers_restaures, erreurs
+
+    def verifier_restauration(self, restaures: Iterator[Tuple[str, Optional[Dict]]], dossiers_tries: List[str],
+                              suivi) -> Dict:
+        """
+        Vérifie sur un groupe de threads que les fichiers restaurés sont de retour à leur emplacement
+        d'origine, avec la taille et la date relevées au tri (et l'empreinte de leur contenu si elle
+        a été relevée), puis cherche les fichiers restés dans les dossiers de tri. Les différences
+        sont écrites au fil de l'eau dans FICHIER_VERIFICATION, sans garder l'arborescence en mémoire :
+        "- chemin" manquant, "M chemin (écart)" modifié, "+ chemin" en trop
+        :param restaures: (chemin d'origine, placement relevé au tri ou None), lus au fil de la vérification
+        :param dossiers_tries: Dossiers de tri qui contenaient les fichiers restaurés
+        :param suivi: Fonction indiquant si un fichier est un fichier trié encore suivi
+        :return: Nombre de fichiers vérifiés, manquants, modifiés et en trop, et chemin du diff (None sans écart)
+        """
+        systeme_fichiers = self.systeme_fichiers
+        
+        def controler(element: Tuple[str, Optional[Dict]]) -> Optional[Tuple[str, str, str]]:
+            chemin, attendu = element
+            try:
+                infos = systeme_fichiers.stat(chemin)
+            except OSError:
+                return "-", chemin, ""
+            if attendu is None:
+                return None  # Restauration sans historique : seule la présence est vérifiable
+            ecarts = []
+            if infos.st_size != attendu["taille"]:
+                ecarts.append(f"taille {infos.st_size} au lieu de {attendu['taille']}")
+            if infos.st_mtime_ns != attendu["mtime_ns"]:
+                ecarts.append("date de modification")
+            if not ecarts and attendu.get("empreinte") and empreinte_fichier(chemin, systeme_fichiers) != attendu["empreinte"]:
+                ecarts.append("contenu")
+            return ("M", chemin, f" ({', '.join(ecarts)})") if ecarts else None
+        
+        resultat = {"fichiers_verifies": 0, "manquants": 0, "modifies": 0, "en_trop": 0, "diff": None}
+        chemin_diff = os.path.join(self.dossier_source, FICHIER_VERIFICATION)
+        temporaire = f"{chemin_diff}.{os.getpid()}.tmp"
+        racine = self.racine_destination()
+        try:
+            with systeme_fichiers.open(temporaire, 'w', encoding='utf-8') as diff, \
+                    concurrent.futures.ThreadPoolExecutor(self.config.get("ouvriers_verification", 8)) as ouvriers:
+                diff.write(f"# Restauration du {datetime.datetime.now():%Y-%m-%d %H:%M:%S} : - manquant, "
+                           f"M modifié (chemins relatifs à {self.dossier_source}), + en trop (relatifs à {racine})\n")
+                # Par tranches : seuls les résultats d'une tranche sont en attente à la fois
+                restaures = iter(restaures)
+                while True:
+                    tranche = list(itertools.islice(restaures, 1024))
+                    if not tranche:
+                        break
+                    resultat["fichiers_verifies"] += len(tranche)
+                    for ecart in ouvriers.map(controler, tranche):
+                        if ecart is not None:
+                            marque, chemin, detail = ecart
+                            resultat["manquants" if marque == "-" else "modifies"] += 1
+                            diff.write(f"{marque} {os.path.relpath(chemin, self.dossier_source)}{detail}\n")
+                
+                # Dossiers de tri restants, chacun parcouru une seule fois depuis son ancêtre le plus haut
+                hauts = []
+                for dossier in sorted(dossiers_tries):
+                    if not hauts or not dossier.startswith(hauts[-1] + os.sep):
+                        hauts.append(dossier)
+                for haut in hauts:
+                    for dossier, _, fichiers in systeme_fichiers.walk(haut):
+                        for nom in fichiers:
+                            if nom.endswith(SUFFIXE_INDEX_ARCHIVE) or nom + SUFFIXE_INDEX_ARCHIVE in fichiers:
+                                continue  # Archive de période et son index
+                            chemin = os.path.join(dossier, nom)
+                            if not suivi(chemin):
+                                resultat["en_trop"] += 1
+                                diff.write(f"+ {os.path.relpath(chemin, racine)}\n")
+        except BaseException:
+            if systeme_fichiers.exists(temporaire):
+                systeme_fichiers.remove(temporaire)
+            raise
+        
+        if resultat["manquants"] + resultat["modifies"] + resultat["en_trop"]:
+            systeme_fichiers.replace(temporaire, chemin_diff)
+            resultat["diff"] = chemin_diff
+            logger.warning(f"Vérification de la restauration: {resultat}")
+        else:
+            systeme_fichiers.remove(temporaire)
+            if systeme_fichiers.exists(chemin_diff):
+                systeme_fichiers.remove(chemin_diff)  # Écarts d'une restauration précédente
+        return resultat
+
+    def rechercher_archive(self, chemin: str, archives: Dict[str, List[ArchivePeriode]]
+                           ) -> Optional[Tuple[ArchivePeriode, str]]:
+        """
+        Cherche un fichier trié absent dans les archives de ses dossiers parents
+        :param chemin: Emplacement du fichier trié
+        :param archives: Cache des archives de chaque dossier, complété au fil des recherches
+        :return: (archive, nom du membre), None si le fichier n'est dans aucune archive
+        """
+        if not self.systeme_fichiers.local:
+            return None  # Les archives ne sont créées que sur le disque local
+        racine = self.racine_destination()
+        dossier = os.path.dirname(chemin)
+        while dossier.startswith(racine) and os.path.normpath(dossier) != os.path.normpath(racine):
+            if dossier not in archives:
+                archives[dossier] = ArchivePeriode.du_dossier(dossier)
+            membre = os.path.relpath(chemin, dossier).replace(os.sep, "/")
+            for archive in archives[dossier]:
+                if membre in archive.index["membres"]:
+                    return archive, membre
+            dossier = os.path.dirname(dossier)
+        return None
+
+    def periodes_a_archiver(self) -> List[str]:
+        """
+        :return: Dossiers "Par Date" dont la période s'est terminée il y a plus de `archivage_age_mois` mois
+        """
+        aujourd_hui = datetime.date.today()
+        mois = aujourd_hui.year * 12 + aujourd_hui.month - 1 - self.config.get("archivage_age_mois", 12)
+        limite = datetime.datetime(mois // 12, mois % 12 + 1, 1)
+        dossier_dates = os.path.join(self.racine_destination(), "Par Date")
+        try:
+            with self.systeme_fichiers.scandir(dossier_dates) as entrees:
+                entrees = sorted(entrees, key=lambda entree: entree.name)
+        except OSError:
+            return []
+        dossiers = []
+        for entree in entrees:
+            if entree.is_dir(follow_symlinks=False):
+                periode = ClassificateurDates.periode(entree.name)
+                if periode is not None and periode[1] <= limite:
+                    dossiers.append(entree.path)
+        return dossiers
+
+    def archiver_periodes(self, callback=None) -> RapportExecution:
+        """
+        Archive les dossiers "Par Date" des périodes anciennes : chaque dossier devient une archive
+        .tar.xz ou .tar.gz accompagnée de l'index de ses membres, plusieurs dossiers étant compressés
+        en parallèle dans un pool de processus. Les fichiers archivés restent restaurables
+        :param callback: Fonction de rappel (dossiers archivés, total)
+        :return: Rapport se décomposant en (nombre de fichiers archivés, liste des erreurs), avec ses métriques
+        """
+        self.metriques = MetriquesExecution("archivage")
+        with self.metriques.mesurer("total"):
+            fichiers_archives, erreurs = self._executer_profile(self._archiver_periodes, callback)
+        self.exporter_metriques(self.metriques)
+        return RapportExecution(fichiers_archives, erreurs, self.metriques)
+
+    def _archiver_periodes(self, callback) -> Tuple[int, List[str]]:
+        if self.config.get("mode_vue"):
+            return 0, ["L'archivage ne s'applique pas au tri virtuel"]
+        if not self.systeme_fichiers.local:
+            return 0, ["L'archivage n'est possible que sur le disque local"]
+        format_archive = self.config.get("format_archive", "xz")
+        if format_archive not in FORMATS_ARCHIVE:
+            return 0, [f"Format d'archive invalide: {format_archive}"]
+        with self.metriques.mesurer("selection"):
+            taches = {ArchivePeriode.nouveau_chemin(dossier, format_archive): dossier
+                      for dossier in self.periodes_a_archiver()}
+        if not taches:
+            return 0, []
+        logger.info(f"Archivage de {len(taches)} périodes dans {self.racine_destination()}")
+        
+        erreurs = []
+        archives = []
+        fichiers_archives = 0
+        processus = self.config.get("processus_archivage", 0) or os.cpu_count() or 1
+        processus = min(processus, len(taches))
+        
+        def terminer(dossier: str, chemin_archive: str, resultat: Tuple[Dict, float]):
+            nonlocal fichiers_archives
+            index, duree = resultat
+            self.metriques.observer("compression", duree)
+            # L'archive et son index sont en place : les originaux peuvent disparaître, sauf ceux
+            # modifiés depuis leur lecture (leur nouveau contenu n'est pas dans l'archive)
+            modifies = []
+            with self.metriques.mesurer("suppression_originaux"):
+                for membre, entree in index["membres"].items():
+                    chemin = os.path.join(dossier, *membre.split("/"))
+                    try:
+                        infos = os.lstat(chemin)
+                    except FileNotFoundError:
+                        modifies.append(membre)
+                        continue
+                    if (not stat.S_ISREG(infos.st_mode) or infos.st_size != entree["taille"]
+                            or infos.st_mtime_ns != entree["mtime_ns"]):
+                        modifies.append(membre)
+                        continue
+                    os.remove(chemin)
+                for racine, _, _ in os.walk(dossier, topdown=False):
+                    try:
+                        os.rmdir(racine)
+                    except OSError:
+                        pass  # Fichier non archivable (lien...) ou modifié laissé en place
+            if modifies:
+                # Membres périmés retirés de l'index : l'archive, vide, est supprimée
+                logger.warning(f"{len(modifies)} fichier(s) de {dossier} modifié(s) pendant l'archivage, "
+                               f"laissé(s) en place")
+                self.metriques.incrementer("fichiers_modifies_archivage", len(modifies))
+                if ArchivePeriode(chemin_archive).retirer(modifies):
+                    return
+            nombre = len(index["membres"]) - len(modifies)
+            fichiers_archives += nombre
+            archives.append({"dossier": dossier, "archive": chemin_archive, "fichiers": nombre,
+                             "octets": os.path.getsize(chemin_archive)})
+            logger.info(f"Période archivée: {dossier} -> {chemin_archive} ({nombre} fichiers)")
         
-        items = list(sauvegarde.items())
+        def echec(dossier: str, e: Exception):
+            self.metriques.erreur(e)
+            error_msg = f"Erreur lors de l'archivage de {os.path.basename(dossier)}: {str(e)}"
+            logger.error(error_msg)
+            erreurs.append(error_msg)
         
-        # Première étape: restaurer les fichiers
-        for i, (chemin_actuel, chemin_original) in enumerate(items):
-            try:
-                if os.path.isfile(chemin_actuel):
-                    # Créer le dossier d'origine si nécessaire
-                    os.makedirs(os.path.dirname(chemin_original), exist_ok=True)
-                    
-                    # Mémoriser le dossier parent pour suppression ultérieure
-                    dossier_parent = os.path.dirname(chemin_actuel)
-                    dossiers_crees.add(dossier_parent)
-                    
-                    # Déplacer le fichier à son emplacement d'origine
-                    shutil.move(chemin_actuel, chemin_original)
-                    fichiers_restaures += 1
-                
-                # Mise à jour de la progression
+        if processus == 1:
+            # Une seule période ou un seul processus : pas de pool à démarrer
+            for i, (chemin_archive, dossier) in enumerate(taches.items()):
+                try:
+                    terminer(dossier, chemin_archive, archiver_dossier_periode(dossier, chemin_archive, format_archive))
+                except Exception as e:
+                    echec(dossier, e)
                 if callback:
-                    callback(i + 1, len(items))
-                    
-            except Exception as e:
-                erreurs.append(f"Erreur lors de la restauration: {str(e)}")
-        
-        # Deuxième étape: supprimer les dossiers créés (du plus profond au moins profond)
-        dossiers_a_supprimer = sorted(dossiers_crees, key=lambda x: x.count(os.sep), reverse=True)
-        
-        # Récupérer tous les dossiers de catégories possibles selon le type de tri
-        dossiers_categories = []
+                    callback(i + 1, len(taches))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=processus) as pool:
+                futures = {pool.submit(archiver_dossier_periode, dossier, chemin_archive, format_archive):
+                           (dossier, chemin_archive) for chemin_archive, dossier in taches.items()}
+                for i, future in enumerate(concurrent.futures.as_completed(futures)):
+                    dossier, chemin_archive = futures[future]
+                    try:
+                        terminer(dossier, chemin_archive, future.result())
+                    except Exception as e:
+                        echec(dossier, e)
+                    if callback:
+                        callback(i + 1, len(taches))
         
-        # Dossiers de type
-        for categorie in self.config.get("noms_dossiers", {}).values():
-            dossiers_categories.append(os.path.join(self.dossier_source, categorie))
+        self.metriques.incrementer("periodes_archivees", len(archives))
+        self.metriques.incrementer("fichiers_archives", fichiers_archives)
+        self.metriques.informations["archives"] = archives
+        self.metriques.informations["processus_archivage"] = processus
+        return fichiers_archives, erreurs
+
+
+class TriParLots:
+    """
+    Traite plusieurs dossiers sources, chacun avec sa propre configuration. Les dossiers sont
+    regroupés par périphérique et chaque périphérique a son groupe de threads : des disques
+    différents travaillent en parallèle, sans qu'un même disque reçoive plus de
+    `ouvriers_par_peripherique` tris simultanés. Les dossiers triés vers une même racine de
+    destination passent l'un après l'autre.
+    """
+    
+    OPERATIONS = {"trier": "trier_fichiers", "restaurer": "restaurer_fichiers", "retrier": "retrier_fichiers",
+                  "archiver": "archiver_periodes"}
+    
+    def __init__(self, sources: List, config: Dict = None, systeme_fichiers: SystemeFichiers = None):
+        """
+        :param sources: Dossiers sources : chemins, ou dictionnaires {"dossier_source": ..., options propres}
+        :param config: Configuration commune, complétée par les options propres de chaque dossier
+        :param systeme_fichiers: Système de fichiers des dossiers (disque local par défaut)
+        """
+        self.config = dict(CONFIG_PAR_DEFAUT, **(config or {}))
+        self.systeme_fichiers = systeme_fichiers or SystemeFichiersLocal()
+        self.sources = [{"dossier_source": source} if isinstance(source, str) else dict(source)
+                        for source in sources]
+        self._verrou = threading.Lock()
+        self._trieurs_en_cours = set()
+    
+    def config_dossier(self, source: Dict) -> Dict:
+        """
+        :param source: Dossier source et ses options propres
+        :return: Configuration complète du dossier
+        """
+        config = dict(self.config, **source)
+        # Les fichiers de métriques communs reçoivent le rapport agrégé, pas celui de chaque dossier
+        for cle in ("fichier_rapport_json", "fichier_prometheus"):
+            if cle not in source:
+                config[cle] = ""
+        if config.get("profilage"):
+            logger.warning(f"Profilage ignoré pour {config['dossier_source']} : un seul profileur peut être actif")
+            config["profilage"] = False
+        return config
+    
+    def grouper_par_peripherique(self) -> Tuple[Dict[int, List[Dict]], List[Dict]]:
+        """
+        :return: Dossiers regroupés par périphérique (st_dev), et résultats des dossiers inaccessibles
+        """
+        groupes = {}
+        invalides = []
+        for source in self.sources:
+            chemin = source.get("dossier_source", "")
+            try:
+                infos = self.systeme_fichiers.stat(chemin)
+                if not stat.S_ISDIR(infos.st_mode):
+                    raise NotADirectoryError(f"{chemin} n'est pas un dossier")
+            except OSError as e:
+                invalides.append({"dossier_source": chemin, "peripherique": None, "fichiers": 0,
+                                  "erreurs": [f"Dossier source invalide ou inexistant: {e}"], "duree": 0.0})
+                continue
+            groupes.setdefault(infos.st_dev, []).append(source)
+        return groupes, invalides
+    
+    def racine_destination(self, source: Dict) -> str:
+        """
+        :param source: Dossier source et ses options propres
+        :return: Racine sous laquelle ce dossier est trié
+        """
+        config = dict(self.config, **source)
+        return os.path.normpath(os.path.abspath(config.get("dossier_destination") or config.get("dossier_source", "")))
+    
+    def _traiter_dossier(self, peripherique: int, source: Dict, operation: str) -> Tuple[Dict, MetriquesExecution]:
+        config = self.config_dossier(source)
+        debut = time.perf_counter()
+        try:
+            trieur = TrieurFichiers(config, self.systeme_fichiers)
+            with self._verrou:
+                self._trieurs_en_cours.add(trieur)
+            try:
+                rapport = getattr(trieur, self.OPERATIONS[operation])()
+            finally:
+                with self._verrou:
+                    self._trieurs_en_cours.discard(trieur)
+            fichiers, erreurs, metriques = rapport.nombre_fichiers, list(rapport.erreurs), rapport.metriques
+        except Exception as e:
+            logger.error(f"Échec du lot pour {config['dossier_source']}: {e}")
+            fichiers, erreurs, metriques = 0, [str(e)], MetriquesExecution(operation)
+            metriques.erreur(e)
+        resultat = {"dossier_source": config["dossier_source"], "peripherique": peripherique, "fichiers": fichiers,
+                    "erreurs": erreurs, "duree": round(time.perf_counter() - debut, 6)}
+        return resultat, metriques
+    
+    def trieurs_en_cours(self) -> List[TrieurFichiers]:
+        """
+        :return: Trieurs des dossiers en cours de traitement (ajustement des limites de débit)
+        """
+        with self._verrou:
+            return list(self._trieurs_en_cours)
+    
+    def _ouvrier(self, peripherique: int, file: queue.Queue, operation: str, resultats: List, mesures: List,
+                 callback):
+        while True:
+            try:
+                verrou_destination, chaine = file.get_nowait()
+            except queue.Empty:
+                return
+            with verrou_destination:
+                for source in chaine:
+                    resultat, metriques = self._traiter_dossier(peripherique, source, operation)
+                    with self._verrou:
+                        resultats.append(resultat)
+                        mesures.append(metriques)
+                        termines = len(resultats)
+                    if callback:
+                        callback(termines, len(self.sources), resultat)
+    
+    def executer(self, operation: str = "trier", callback=None) -> RapportLot:
+        """
+        Traite tous les dossiers et agrège les résultats
+        :param operation: "trier", "restaurer" ou "retrier"
+        :param callback: Fonction de rappel (dossiers terminés, total, résultat du dossier)
+        :return: Rapport agrégé
+        """
+        if operation not in self.OPERATIONS:
+            raise TrieurError(f"Opération de lot inconnue: {operation}")
+        metriques = MetriquesExecution(f"lot_{operation}")
+        groupes, resultats = self.grouper_par_peripherique()
+        mesures = []
+        ouvriers = max(1, int(self.config.get("ouvriers_par_peripherique", 1)))
+        logger.info(f"Lot de {len(self.sources)} dossiers sur {len(groupes)} périphériques "
+                    f"({ouvriers} threads par périphérique)")
+        if callback:
+            for termines, resultat in enumerate(resultats, 1):
+                callback(termines, len(self.sources), resultat)
         
-        # Ajouter le dossier "Autres" qui est utilisé pour les fichiers sans type reconnu
-        dossiers_categories.append(os.path.join(self.dossier_source, "Autres"))
+        # Deux tris simultanés vers une même racine y choisiraient les mêmes noms : sur un périphérique,
+        # les dossiers qui la partagent forment une chaîne traitée par un seul thread, et le verrou de la
+        # racine sépare les chaînes de périphériques différents
+        verrous_destinations = {racine: threading.Lock() for racine in map(self.racine_destination, self.sources)}
+        threads = []
+        with metriques.mesurer("total"):
+            for peripherique, sources in groupes.items():
+                chaines = {}
+                for source in sources:
+                    chaines.setdefault(self.racine_destination(source), []).append(source)
+                file = queue.Queue()
+                for racine, chaine in chaines.items():
+                    file.put((verrous_destinations[racine], chaine))
+                for numero in range(min(ouvriers, len(chaines))):
+                    threads.append(threading.Thread(
+                        target=self._ouvrier, args=(peripherique, file, operation, resultats, mesures, callback),
+                        daemon=True, name=f"trieur-lot-{peripherique}-{numero}"))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
         
-        # Dossiers de date et taille
-        dossiers_categories.append(os.path.join(self.dossier_source, "Par Date"))
-        dossiers_categories.append(os.path.join(self.dossier_source, "Par Taille"))
+        for mesure in mesures:
+            metriques.fusionner(mesure)
         
-        # Ajouter les dossiers de catégories à la liste à supprimer
-        for dossier in dossiers_categories:
-            if os.path.isdir(dossier):
-                dossiers_a_supprimer.append(dossier)
+        # Statistiques par périphérique (le lot dure autant que le disque le plus chargé)
+        peripheriques = {}
+        for resultat in resultats:
+            if resultat["peripherique"] is None:
+                continue
+            infos = peripheriques.setdefault(str(resultat["peripherique"]),
+                                             {"dossiers": 0, "fichiers": 0, "erreurs": 0, "duree_cumulee": 0.0})
+            infos["dossiers"] += 1
+            infos["fichiers"] += resultat["fichiers"]
+            infos["erreurs"] += len(resultat["erreurs"])
+            infos["duree_cumulee"] = round(infos["duree_cumulee"] + resultat["duree"], 6)
         
-        # Supprimer les dossiers vides
-        for dossier in dossiers_a_supprimer:
-            try:
-                # Vérifier que le dossier existe et est sous le dossier source
-                if os.path.isdir(dossier) and dossier.startswith(self.dossier_source):
-                    # Vérifier si le dossier est vide
-                    if not os.listdir(dossier):
-                        os.rmdir(dossier)
-                    else:
-                        # Tenter de supprimer récursivement les dossiers vides
-                        for root, dirs, files in os.walk(dossier, topdown=False):
-                            if not files and not dirs:
-                                try:
-                                    os.rmdir(root)
-                                except:
-                                    pass
-            except Exception as e:
-                erreurs.append(f"Erreur lors de la suppression du dossier {dossier}: {str(e)}")
+        ordre = {source.get("dossier_source", ""): i for i, source in enumerate(self.sources)}
+        resultats.sort(key=lambda resultat: ordre.get(resultat["dossier_source"], len(ordre)))
+        rapport = RapportLot(resultats, peripheriques, metriques)
+        logger.info(f"Lot terminé: {rapport.nombre_fichiers} fichiers, {len(rapport.erreurs)} erreurs")
         
-        # Supprimer le fichier de sauvegarde après restauration
-        try:
-            os.remove(sauvegarde_path)
-        except:
-            pass
-            
-        return fichiers_restaures, erreurs
+        for cle, ecrire in (("fichier_rapport_json", lambda chemin: metriques._ecrire_atomiquement(
+                                chemin, json.dumps(rapport.vers_dict(), ensure_ascii=False, indent=2))),
+                            ("fichier_prometheus", metriques.ecrire_textfile_prometheus)):
+            chemin = self.config.get(cle)
+            if chemin:
+                try:
+                    ecrire(chemin)
+                except OSError as e:
+                    logger.warning(f"Impossible d'écrire le rapport du lot dans {chemin}: {e}")
+        return rapport
 
 
 class ApplicationTrieurFichiers(ctk.CTk):
     """Classe principale pour l'interface graphique de l'application"""
     
-    def __init__(self):
+    def __init__(self, options_session: Dict = None):
+        """
+        :param options_session: Options de la ligne de commande, appliquées à la configuration sans être sauvegardées
+        """
         super().__init__()
         
         # Configuration de la fenêtre
@@ -564,6 +5158,11 @@ class ApplicationTrieurFichiers(ctk.CTk):
         
         # Chargement de la configuration
         self.config = self.charger_config()
+        options_session = options_session or {}
+        self.config_persistee = {cle: self.config.get(cle, CONFIG_PAR_DEFAUT.get(cle)) for cle in options_session}
+        self.config.update(options_session)
+        configurer_journalisation(self.config.get("niveau_journal", "INFO"), self.config.get("journal_json", False),
+                                  chemin_journal(self.config.get("dossier_journal")))
         
         # Appliquer le thème
         self.appliquer_theme(self.config.get("theme", "dark"))
@@ -581,7 +5180,8 @@ class ApplicationTrieurFichiers(ctk.CTk):
         # Mise à jour initiale
         self.mise_a_jour_interface()
 
-    def charger_config(self) -> Dict:
+    @staticmethod
+    def charger_config() -> Dict:
         """
         Charge la configuration depuis un fichier
         :return: Dictionnaire de configuration
@@ -611,7 +5211,7 @@ class ApplicationTrieurFichiers(ctk.CTk):
         
         try:
             with open(chemin_config, 'w') as f:
-                json.dump(self.config, f)
+                json.dump(dict(self.config, **self.config_persistee), f)
         except Exception as e:
             print(f"Erreur lors de la sauvegarde de la configuration: {str(e)}")
 
@@ -690,6 +5290,14 @@ class ApplicationTrieurFichiers(ctk.CTk):
         )
         self.radio_taille.grid(row=0, column=2, padx=20, pady=5)
         
+        self.radio_composite = ctk.CTkRadioButton(
+            frame_type_tri, 
+            text="Composite", 
+            variable=self.type_tri_var, 
+            value="composite"
+        )
+        self.radio_composite.grid(row=0, column=3, padx=20, pady=5)
+        
         # Thème
         ctk.CTkLabel(frame_options, text="Thème:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
         
@@ -742,7 +5350,16 @@ class ApplicationTrieurFichiers(ctk.CTk):
             text="Créer des sous-dossiers par extension",
             variable=self.var_sous_dossiers
         )
-        self.check_sous_dossiers.grid(row=0, column=0, padx=5, pady=5, sticky="w", columnspan=2)
+        self.check_sous_dossiers.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        
+        # Option tri récursif
+        self.var_recursif = tk.BooleanVar(value=self.config.get("recursif", False))
+        self.check_recursif = ctk.CTkCheckBox(
+            self.frame_options_avancees,
+            text="Inclure les sous-dossiers",
+            variable=self.var_recursif
+        )
+        self.check_recursif.grid(row=0, column=1, padx=5, pady=5, sticky="e")
         
         # Personnalisation des noms
         ctk.CTkLabel(self.frame_options_avancees, text="Personnalisation des noms:").grid(
@@ -759,6 +5376,132 @@ class ApplicationTrieurFichiers(ctk.CTk):
         )
         self.btn_personnaliser.grid(row=1, column=1, padx=5, pady=5, sticky="e")
         
+        # Hiérarchie du tri composite (ex: type/date/taille)
+        ctk.CTkLabel(self.frame_options_avancees, text="Hiérarchie composite:").grid(
+            row=2, column=0, padx=5, pady=5, sticky="w"
+        )
+        
+        self.hierarchie_var = tk.StringVar(
+            value="/".join(self.config.get("hierarchie_tri", CONFIG_PAR_DEFAUT["hierarchie_tri"]))
+        )
+        self.entry_hierarchie = ctk.CTkEntry(self.frame_options_avancees, textvariable=self.hierarchie_var)
+        self.entry_hierarchie.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+        
+        # Granularité du tri par date
+        ctk.CTkLabel(self.frame_options_avancees, text="Granularité des dates:").grid(
+            row=3, column=0, padx=5, pady=5, sticky="w"
+        )
+        
+        self.granularite_var = tk.StringVar(value=self.config.get("granularite_date", "mois"))
+        self.option_granularite = ctk.CTkOptionMenu(
+            self.frame_options_avancees,
+            values=list(ClassificateurDates.GRANULARITES),
+            variable=self.granularite_var,
+            fg_color=self.couleur_bouton
+        )
+        self.option_granularite.grid(row=3, column=1, padx=5, pady=5, sticky="e")
+        
+        # Restauration d'un tri, d'une catégorie, d'une période ou d'un motif
+        ctk.CTkLabel(self.frame_options_avancees, text="Historique des tris:").grid(
+            row=4, column=0, padx=5, pady=5, sticky="w"
+        )
+        
+        self.btn_restauration_selective = ctk.CTkButton(
+            self.frame_options_avancees,
+            text="Restauration sélective",
+            command=self.ouvrir_restauration_selective,
+            fg_color=self.couleur_bouton,
+            text_color="white",
+            font=("Arial", 15, "bold")
+        )
+        self.btn_restauration_selective.grid(row=4, column=1, padx=5, pady=5, sticky="e")
+        
+        # Tri virtuel : vue triée par liens, les originaux restent en place
+        ctk.CTkLabel(self.frame_options_avancees, text="Tri virtuel (sans déplacement):").grid(
+            row=5, column=0, padx=5, pady=5, sticky="w"
+        )
+        
+        self.mode_vue_var = tk.StringVar(value=self.config.get("mode_vue") or "désactivé")
+        self.option_mode_vue = ctk.CTkOptionMenu(
+            self.frame_options_avancees,
+            values=["désactivé", *MODES_VUE],
+            variable=self.mode_vue_var,
+            fg_color=self.couleur_bouton
+        )
+        self.option_mode_vue.grid(row=5, column=1, padx=5, pady=5, sticky="e")
+        
+        # Limitation du nombre de déplacements par seconde, modifiable pendant un tri
+        self.label_limite_operations = ctk.CTkLabel(self.frame_options_avancees, text="")
+        self.label_limite_operations.grid(row=6, column=0, padx=5, pady=5, sticky="w")
+        
+        self.slider_limite_operations = ctk.CTkSlider(
+            self.frame_options_avancees,
+            from_=0,
+            to=1000,
+            number_of_steps=100,
+            command=self.ajuster_limite_operations,
+            button_color=self.couleur_bouton
+        )
+        self.slider_limite_operations.set(min(1000, self.config.get("limite_operations_par_seconde", 0)))
+        self.slider_limite_operations.grid(row=6, column=1, padx=5, pady=5, sticky="e")
+        self.ajuster_limite_operations(self.slider_limite_operations.get())
+        
+        # Politique d'erreur : nouvel essai puis quarantaine, ou annulation complète du tri
+        self.var_tout_ou_rien = tk.BooleanVar(value=self.config.get("tout_ou_rien", False))
+        self.check_tout_ou_rien = ctk.CTkCheckBox(
+            self.frame_options_avancees,
+            text="Tout ou rien (annuler tout le tri à la première erreur critique)",
+            variable=self.var_tout_ou_rien
+        )
+        self.check_tout_ou_rien.grid(row=7, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+        
+        # Racine des dossiers triés, éventuellement sur un autre disque
+        ctk.CTkLabel(self.frame_options_avancees, text="Dossier de destination (vide = source):").grid(
+            row=8, column=0, padx=5, pady=5, sticky="w"
+        )
+        
+        frame_destination = ctk.CTkFrame(self.frame_options_avancees)
+        frame_destination.grid(row=8, column=1, padx=5, pady=5, sticky="ew")
+        frame_destination.grid_columnconfigure(0, weight=1)
+        
+        self.dossier_destination_var = tk.StringVar(value=self.config.get("dossier_destination", ""))
+        ctk.CTkEntry(frame_destination, textvariable=self.dossier_destination_var).grid(
+            row=0, column=0, padx=5, pady=5, sticky="ew"
+        )
+        ctk.CTkButton(
+            frame_destination,
+            text="Parcourir",
+            command=self.selectionner_destination,
+            fg_color=self.couleur_bouton,
+            text_color="white",
+            font=("Arial", 15, "bold")
+        ).grid(row=0, column=1, padx=5, pady=5)
+        
+        # Archivage des dossiers "Par Date" anciens en .tar.xz / .tar.gz
+        ctk.CTkLabel(self.frame_options_avancees,
+                     text=f"Périodes de plus de {self.config.get('archivage_age_mois', 12)} mois:").grid(
+            row=9, column=0, padx=5, pady=5, sticky="w"
+        )
+        
+        self.btn_archiver = ctk.CTkButton(
+            self.frame_options_avancees,
+            text="Archiver",
+            command=self.archiver_periodes,
+            fg_color=self.couleur_bouton,
+            text_color="white",
+            font=("Arial", 15, "bold")
+        )
+        self.btn_archiver.grid(row=9, column=1, padx=5, pady=5, sticky="e")
+        
+        # Contrôle des fichiers restaurés par rapport aux relevés du tri
+        self.var_verification = tk.BooleanVar(value=self.config.get("verification_restauration", False))
+        self.check_verification = ctk.CTkCheckBox(
+            self.frame_options_avancees,
+            text="Vérifier les fichiers après restauration (taille, date, empreinte si relevée)",
+            variable=self.var_verification
+        )
+        self.check_verification.grid(row=10, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+        
         # Masquer les options avancées initialement
         self.frame_options_avancees.grid_remove()
         self.config_avancee_visible = False
@@ -823,6 +5566,28 @@ class ApplicationTrieurFichiers(ctk.CTk):
             font=("Arial", 15, "bold")
         )
         self.btn_reinitialiser.grid(row=0, column=2, padx=10, pady=10)
+        
+        self.btn_annuler = ctk.CTkButton(
+            self.frame_actions,
+            text="Annuler",
+            command=self.trieur.annuler_tri,
+            fg_color=self.couleur_bouton,
+            text_color="white",
+            state="disabled",
+            font=("Arial", 15, "bold")
+        )
+        self.btn_annuler.grid(row=0, column=3, padx=10, pady=10)
+        
+        self.btn_retrier = ctk.CTkButton(
+            self.frame_actions,
+            text="Re-trier",
+            command=self.retrier_fichiers,
+            fg_color=self.couleur_bouton,
+            text_color="white",
+            state="disabled",
+            font=("Arial", 15, "bold")
+        )
+        self.btn_retrier.grid(row=0, column=4, padx=10, pady=10)
 
     def toggle_config_avancee(self):
         """
@@ -893,7 +5658,8 @@ class ApplicationTrieurFichiers(ctk.CTk):
         )
         row += 1
         
-        for categorie in TAILLES_FICHIERS.keys():
+        categories_tailles = self.config.get("categories_tailles", CONFIG_PAR_DEFAUT["categories_tailles"])
+        for categorie, _ in categories_tailles:
             ctk.CTkLabel(frame_scroll, text=f"{categorie}:").grid(
                 row=row, column=0, padx=5, pady=5, sticky="w"
             )
@@ -936,6 +5702,9 @@ class ApplicationTrieurFichiers(ctk.CTk):
             # Sauvegarder la configuration
             self.sauvegarder_config()
             
+            if self.btn_retrier.cget("state") == "normal":
+                self.ajouter_log("💡 Cliquez sur « Re-trier » pour appliquer les nouveaux noms aux fichiers déjà triés.")
+            
             # Fermer la fenêtre
             fenetre_perso.destroy()
         
@@ -971,6 +5740,27 @@ class ApplicationTrieurFichiers(ctk.CTk):
             self.trieur.dossier_source = dossier
             self.mise_a_jour_interface()
             self.sauvegarder_config()
+            self.afficher_statistiques_index()
+
+    def selectionner_destination(self):
+        """
+        Ouvre une boîte de dialogue pour choisir la racine des dossiers triés
+        """
+        dossier = filedialog.askdirectory(title="Sélectionner le dossier de destination")
+        if dossier:
+            self.dossier_destination_var.set(dossier)
+
+    def afficher_statistiques_index(self):
+        """
+        Affiche dans le journal le contenu des dossiers de tri d'après l'index, sans relire le disque
+        """
+        statistiques = self.trieur.statistiques_index()
+        if not statistiques.get("categories"):
+            return
+        self.ajouter_log("📇 Fichiers triés (index):")
+        for categorie, nombre, octets in statistiques["categories"]:
+            self.ajouter_log(f"   {categorie}: {nombre} fichier(s), {octets / (1024 * 1024):.1f} Mo")
+        self.ajouter_log(f"   Dernier tri: {len(statistiques['dernier_tri'])} fichier(s) déplacé(s)")
 
     def mise_a_jour_interface(self):
         """
@@ -985,11 +5775,14 @@ class ApplicationTrieurFichiers(ctk.CTk):
             sauvegarde_path = os.path.join(dossier, ".trieur_sauvegarde.json")
             if os.path.isfile(sauvegarde_path):
                 self.btn_restaurer.configure(state="normal")
+                self.btn_retrier.configure(state="normal")
             else:
                 self.btn_restaurer.configure(state="disabled")
+                self.btn_retrier.configure(state="disabled")
         else:
             self.btn_trier.configure(state="disabled")
             self.btn_restaurer.configure(state="disabled")
+            self.btn_retrier.configure(state="disabled")
 
     def ajouter_log(self, message: str):
         """
@@ -1002,6 +5795,16 @@ class ApplicationTrieurFichiers(ctk.CTk):
         self.text_log.configure(state="disabled")
         self.update()
 
+    def ajuster_limite_operations(self, valeur: float):
+        """
+        Applique la limite choisie avec le curseur, immédiatement prise en compte par le tri en cours
+        :param valeur: Déplacements par seconde (0 = illimité)
+        """
+        limite = int(valeur)
+        self.trieur.ajuster_limites(operations_par_seconde=limite)
+        self.label_limite_operations.configure(
+            text=f"Limite: {limite} fichiers/s" if limite else "Limite: illimitée (fichiers/s)")
+
     def maj_progression(self, actuel: int, total: int):
         """
         Met à jour la barre de progression
@@ -1010,12 +5813,60 @@ class ApplicationTrieurFichiers(ctk.CTk):
         """
         if total > 0:
             self.progressbar.set(actuel / total)
-            self.label_statut.configure(text=f"Progression: {actuel}/{total} fichiers")
+            debit = self.trieur.limiteur_operations.debit_effectif()
+            texte = f"Progression: {actuel}/{total} fichiers ({debit:.0f} fichiers/s)"
+            if self.trieur.voies is not None:
+                voies = self.trieur.voies.statistiques()
+                texte += (f" - petits: {voies['rapide']['elements']}, "
+                          f"gros: {voies['flux']['elements']} ({voies['flux']['debit_octets'] / (1024 * 1024):.1f} Mo/s)")
+            self.label_statut.configure(text=texte)
         else:
             self.progressbar.set(0)
             self.label_statut.configure(text="Aucun fichier à traiter")
         self.update()
 
+    def maj_progression_octets(self, copies: int, total: int, fichier: str):
+        """
+        Affiche la progression d'une copie entre périphériques
+        :param copies: Octets déjà copiés
+        :param total: Taille du fichier
+        :param fichier: Fichier en cours de copie
+        """
+        if total > 0:
+            self.label_statut.configure(
+                text=f"Copie de {os.path.basename(fichier)}: {copies * 100 // total}% "
+                     f"({copies // (1024 * 1024)}/{total // (1024 * 1024)} Mo, "
+                     f"{self.trieur.limiteur_octets.debit_effectif() / (1024 * 1024):.1f} Mo/s)"
+            )
+            self.update()
+
+    def resumer_metriques(self, metriques: MetriquesExecution) -> str:
+        """
+        Résume en une ligne la durée totale et les phases les plus coûteuses
+        :param metriques: Métriques d'une exécution
+        :return: Message à afficher dans le journal
+        """
+        phases = metriques.vers_dict()["phases"]
+        total = phases.pop("total", {}).get("duree_totale", 0.0)
+        principales = sorted(phases.items(), key=lambda phase: phase[1]["duree_totale"], reverse=True)[:3]
+        details = ", ".join(f"{nom}: {infos['duree_totale']:.2f} s" for nom, infos in principales)
+        return f"⏱️  Durée: {total:.2f} s ({details})"
+
+    def appliquer_options_tri(self):
+        """
+        Reporte les options de tri de l'interface dans la configuration du trieur
+        """
+        self.config["type_tri"] = self.type_tri_var.get()
+        self.config["sous_dossiers_par_extension"] = self.var_sous_dossiers.get()
+        self.config["hierarchie_tri"] = [cle.strip() for cle in self.hierarchie_var.get().split("/") if cle.strip()]
+        self.config["granularite_date"] = self.granularite_var.get()
+        self.config["recursif"] = self.var_recursif.get()
+        self.config["mode_vue"] = "" if self.mode_vue_var.get() == "désactivé" else self.mode_vue_var.get()
+        self.config["tout_ou_rien"] = self.var_tout_ou_rien.get()
+        self.config["verification_restauration"] = self.var_verification.get()
+        self.config["dossier_destination"] = self.dossier_destination_var.get().strip()
+        self.trieur.config = self.config
+
     def lancer_tri(self):
         """
         Lance le processus de tri des fichiers
@@ -1027,14 +5878,14 @@ class ApplicationTrieurFichiers(ctk.CTk):
             return
             
         # Mettre à jour la configuration
-        self.config["type_tri"] = self.type_tri_var.get()
-        self.config["sous_dossiers_par_extension"] = self.var_sous_dossiers.get()
-        self.trieur.config = self.config
+        self.appliquer_options_tri()
         
         # Désactiver les boutons pendant le traitement
         self.btn_trier.configure(state="disabled")
         self.btn_restaurer.configure(state="disabled")
+        self.btn_retrier.configure(state="disabled")
         self.btn_reinitialiser.configure(state="disabled")
+        self.btn_annuler.configure(state="normal")
         
         # Réinitialiser la barre de progression
         self.progressbar.set(0)
@@ -1052,14 +5903,17 @@ class ApplicationTrieurFichiers(ctk.CTk):
         # Lancer le tri dans un thread pour ne pas bloquer l'interface
         def executer_tri():
             try:
-                fichiers_traites, erreurs = self.trieur.trier_fichiers(
-                    callback=self.maj_progression
+                rapport = self.trieur.trier_fichiers(
+                    callback=self.maj_progression,
+                    callback_octets=self.maj_progression_octets
                 )
+                fichiers_traites, erreurs = rapport
                 
                 # Afficher les résultats avec plus de détails
                 if fichiers_traites > 0:
                     self.ajouter_log(f"\n✅ Tri terminé avec succès!")
                     self.ajouter_log(f"📁 {fichiers_traites} fichiers traités et organisés.")
+                    self.ajouter_log(self.resumer_metriques(rapport.metriques))
                     
                     if erreurs:
                         self.ajouter_log(f"\n⚠️  {len(erreurs)} avertissements/erreurs mineures:")
@@ -1098,6 +5952,7 @@ class ApplicationTrieurFichiers(ctk.CTk):
                 # Réactiver les boutons
                 self.btn_trier.configure(state="normal")
                 self.btn_reinitialiser.configure(state="normal")
+                self.btn_annuler.configure(state="disabled")
                 
                 # Sauvegarder la configuration
                 self.sauvegarder_config()
@@ -1107,19 +5962,78 @@ class ApplicationTrieurFichiers(ctk.CTk):
         thread.daemon = True
         thread.start()
 
-    def restaurer_fichiers(self):
+    def ouvrir_restauration_selective(self):
+        """
+        Ouvre la fenêtre de restauration sélective (tri, catégorie, période, motif)
+        """
+        executions = self.trieur.historique()
+        if not executions:
+            self.ajouter_log("Aucun tri dans l'historique de ce dossier.")
+            return
+        
+        fenetre = ctk.CTkToplevel(self)
+        fenetre.title("Restauration sélective")
+        fenetre.geometry("500x320")
+        fenetre.grab_set()  # Rendre la fenêtre modale
+        fenetre.grid_columnconfigure(1, weight=1)
+        
+        # Tri à restaurer (0 = tris anciens compactés)
+        toutes = "Tous les tris"
+        libelles = {toutes: None}
+        for execution in executions:
+            if execution["execution"] == 0:
+                libelle = f"Tris anciens compactés ({execution['fichiers_actifs']} fichiers)"
+            else:
+                date = datetime.datetime.fromtimestamp(execution["debut"]).strftime("%Y-%m-%d %H:%M")
+                libelle = f"#{execution['execution']} - {date} ({execution['fichiers_actifs']} fichiers)"
+            libelles[libelle] = execution["execution"]
+        
+        ctk.CTkLabel(fenetre, text="Tri:").grid(row=0, column=0, padx=10, pady=5, sticky="w")
+        execution_var = tk.StringVar(value=toutes)
+        ctk.CTkOptionMenu(fenetre, values=list(libelles), variable=execution_var,
+                          fg_color=self.couleur_bouton).grid(row=0, column=1, padx=10, pady=5, sticky="ew")
+        
+        champs = {}
+        for ligne, (cle, texte) in enumerate([("categorie", "Catégorie (ex: Documents):"),
+                                              ("du", "Modifiés du (AAAA-MM-JJ):"),
+                                              ("au", "au (AAAA-MM-JJ):"),
+                                              ("motif", "Motif (ex: *.pdf):")], start=1):
+            ctk.CTkLabel(fenetre, text=texte).grid(row=ligne, column=0, padx=10, pady=5, sticky="w")
+            champs[cle] = ctk.CTkEntry(fenetre)
+            champs[cle].grid(row=ligne, column=1, padx=10, pady=5, sticky="ew")
+        
+        def valider():
+            du, au = champs["du"].get().strip(), champs["au"].get().strip()
+            selection = {
+                "execution": libelles[execution_var.get()],
+                "categorie": champs["categorie"].get().strip(),
+                "motif": champs["motif"].get().strip(),
+                "periode": (du or "1970-01-02", au or "9999-12-31") if du or au else None,
+            }
+            if all(valeur in (None, "") for valeur in selection.values()):
+                selection = {"execution": None, "categorie": "", "motif": "*"}  # Tout l'historique
+            fenetre.destroy()
+            self.restaurer_fichiers(selection)
+        
+        ctk.CTkButton(fenetre, text="Restaurer", command=valider, fg_color=self.couleur_bouton,
+                      text_color="white").grid(row=5, column=1, padx=10, pady=10, sticky="e")
+
+    def restaurer_fichiers(self, selection: Dict = None):
         """
         Restaure les fichiers à leur emplacement d'origine
+        :param selection: Critères de restauration sélective (par défaut, le dernier tri)
         """
         dossier = self.dossier_source_var.get()
         
         if not dossier or not os.path.isdir(dossier):
             self.ajouter_log("Erreur: Aucun dossier de sauvegarde trouvé.")
             return
+        self.config["verification_restauration"] = self.var_verification.get()
             
         # Désactiver les boutons pendant le traitement
         self.btn_trier.configure(state="disabled")
         self.btn_restaurer.configure(state="disabled")
+        self.btn_retrier.configure(state="disabled")
         self.btn_reinitialiser.configure(state="disabled")
         
         # Réinitialiser la barre de progression
@@ -1138,7 +6052,9 @@ class ApplicationTrieurFichiers(ctk.CTk):
         def executer_restauration():
             try:
                 fichiers_restaures, erreurs = self.trieur.restaurer_fichiers(
-                    callback=self.maj_progression
+                    callback=self.maj_progression,
+                    callback_octets=self.maj_progression_octets,
+                    **(selection or {})
                 )
                 
                 # Afficher les résultats avec plus de détails
@@ -1182,6 +6098,99 @@ class ApplicationTrieurFichiers(ctk.CTk):
         thread.daemon = True
         thread.start()
 
+    def retrier_fichiers(self):
+        """
+        Range les fichiers déjà triés selon les options actuelles, en ne déplaçant que ceux qui changent de dossier
+        """
+        dossier = self.dossier_source_var.get()
+        
+        if not dossier or not os.path.isdir(dossier):
+            self.ajouter_log("Erreur: Aucun dossier de sauvegarde trouvé.")
+            return
+        
+        self.appliquer_options_tri()
+        
+        # Désactiver les boutons pendant le traitement
+        self.btn_trier.configure(state="disabled")
+        self.btn_restaurer.configure(state="disabled")
+        self.btn_retrier.configure(state="disabled")
+        self.btn_reinitialiser.configure(state="disabled")
+        self.btn_annuler.configure(state="normal")
+        
+        self.progressbar.set(0)
+        self.label_statut.configure(text="Préparation du re-tri...")
+        self.ajouter_log(f"\nRe-tri des fichiers de {dossier} (mode: {self.type_tri_var.get()})...")
+        
+        def executer_retri():
+            try:
+                rapport = self.trieur.retrier_fichiers(
+                    callback=self.maj_progression,
+                    callback_octets=self.maj_progression_octets
+                )
+                fichiers_deplaces, erreurs = rapport
+                inchanges = rapport.metriques.compteurs.get("fichiers_inchanges", 0)
+                self.ajouter_log(f"\n🔀 Re-tri terminé: {fichiers_deplaces} fichiers déplacés, "
+                                 f"{inchanges} déjà à leur place.")
+                renommages = rapport.metriques.vers_dict()["phases"].get("renommage_dossier")
+                if renommages:
+                    self.ajouter_log(f"📁 {renommages['nombre']} dossier(s) renommé(s) d'un bloc.")
+                if erreurs:
+                    self.ajouter_log(f"\n⚠️  {len(erreurs)} erreurs lors du re-tri:")
+                    for i, erreur in enumerate(erreurs, 1):
+                        self.ajouter_log(f"   {i}. {erreur}")
+            except Exception as e:
+                self.ajouter_log(f"\n💥 Erreur critique lors du re-tri:")
+                self.ajouter_log(f"   {str(e)}")
+            finally:
+                self.btn_trier.configure(state="normal")
+                self.btn_reinitialiser.configure(state="normal")
+                self.btn_annuler.configure(state="disabled")
+                self.after(100, self.mise_a_jour_interface)
+        
+        thread = threading.Thread(target=executer_retri)
+        thread.daemon = True
+        thread.start()
+
+    def archiver_periodes(self):
+        """
+        Archive les dossiers "Par Date" des périodes anciennes du dossier sélectionné
+        """
+        dossier = self.dossier_source_var.get()
+        
+        if not dossier or not os.path.isdir(dossier):
+            self.ajouter_log("Erreur: Veuillez sélectionner un dossier valide.")
+            return
+        
+        self.appliquer_options_tri()
+        
+        self.btn_trier.configure(state="disabled")
+        self.btn_archiver.configure(state="disabled")
+        self.progressbar.set(0)
+        self.label_statut.configure(text="Archivage des périodes anciennes...")
+        self.ajouter_log(f"\nArchivage des périodes de plus de {self.config.get('archivage_age_mois', 12)} mois "
+                         f"(format: tar.{self.config.get('format_archive', 'xz')})...")
+        
+        def executer_archivage():
+            try:
+                rapport = self.trieur.archiver_periodes(callback=self.maj_progression)
+                fichiers_archives, erreurs = rapport
+                periodes = rapport.metriques.compteurs.get("periodes_archivees", 0)
+                self.ajouter_log(f"\n🗜️  Archivage terminé: {periodes} période(s), {fichiers_archives} fichiers archivés.")
+                if erreurs:
+                    self.ajouter_log(f"\n⚠️  {len(erreurs)} erreurs lors de l'archivage:")
+                    for i, erreur in enumerate(erreurs, 1):
+                        self.ajouter_log(f"   {i}. {erreur}")
+            except Exception as e:
+                self.ajouter_log(f"\n💥 Erreur critique lors de l'archivage:")
+                self.ajouter_log(f"   {str(e)}")
+            finally:
+                self.btn_archiver.configure(state="normal")
+                self.after(100, self.mise_a_jour_interface)
+        
+        thread = threading.Thread(target=executer_archivage)
+        thread.daemon = True
+        thread.start()
+
     def reinitialiser(self):
         """
         Réinitialise l'application pour sélectionner un nouveau dossier
@@ -1201,16 +6210,136 @@ class ApplicationTrieurFichiers(ctk.CTk):
         
         self.btn_trier.configure(state="disabled")
         self.btn_restaurer.configure(state="disabled")
+        self.btn_retrier.configure(state="disabled")
         
         self.ajouter_log("Application réinitialisée...\n"
                          "\nVeuillez sélectionner un nouveau dossier à trier en cliquant sur le bouton Parcourir.")
 
 
+def installer_signaux_limitation(trieur, fenetre: tk.Misc = None):
+    """
+    Ajuste les limites de débit à chaud : SIGUSR1 les divise par deux (en partant du débit mesuré si
+    aucune limite n'est fixée), SIGUSR2 les double. Sans effet sur les systèmes sans ces signaux.
+    À installer avant toute opération, interface ou ligne de commande : l'action par défaut de ces
+    signaux termine le processus, au milieu d'un déplacement
+    :param trieur: Trieur dont les limiteurs sont ajustés, ou fonction renvoyant les trieurs en cours
+                   (TriParLots.trieurs_en_cours)
+    :param fenetre: Fenêtre Tk à réveiller périodiquement (les signaux ne sont traités qu'entre deux
+                    instructions Python, jamais pendant l'attente de la boucle Tk)
+    """
+    import signal
+    if not hasattr(signal, "SIGUSR1"):
+        return
+    
+    def ajuster(facteur):
+        def gestionnaire(numero, pile):
+            for cible in trieur() if callable(trieur) else [trieur]:
+                limites = []
+                for limiteur in (cible.limiteur_operations, cible.limiteur_octets):
+                    debit = limiteur.debit or (limiteur.debit_effectif() if facteur < 1 else 0)
+                    limites.append(debit * facteur if debit else None)
+                cible.ajuster_limites(*limites)
+                logger.info(f"Limites de débit de {cible.dossier_source} ajustées par signal: "
+                            f"{cible.limiteur_operations.debit or 'illimité'} opérations/s, "
+                            f"{cible.limiteur_octets.debit or 'illimité'} octets/s")
+        return gestionnaire
+    
+    signal.signal(signal.SIGUSR1, ajuster(0.5))
+    signal.signal(signal.SIGUSR2, ajuster(2.0))
+    
+    if fenetre is not None:
+        def reveiller():
+            fenetre.after(250, reveiller)
+        reveiller()
+
+
 def main():
     """
     Fonction principale pour lancer l'application
     """
-    app = ApplicationTrieurFichiers()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Trieur de fichiers automatique")
+    parser.add_argument("--profil", action="store_true",
+                        help="profile les tris et restaurations (.pstats, piles repliées, appels système)")
+    parser.add_argument("--limite-operations", type=float, metavar="N",
+                        help="déplacements ou liens par seconde au plus (0 = illimité)")
+    parser.add_argument("--limite-octets", type=float, metavar="N",
+                        help="octets par seconde au plus pour les copies entre périphériques (0 = illimité)")
+    parser.add_argument("--destination", metavar="DOSSIER",
+                        help="racine des dossiers triés, éventuellement sur un autre disque")
+    parser.add_argument("--lot", nargs="+", metavar="DOSSIER", default=[],
+                        help="traite ces dossiers sans interface, en parallèle sur des disques différents")
+    parser.add_argument("--fichier-lot", metavar="JSON",
+                        help="liste JSON des dossiers du lot : chemins, ou objets {\"dossier_source\": ..., options}")
+    parser.add_argument("--operation", choices=list(TriParLots.OPERATIONS), default="trier",
+                        help="opération appliquée aux dossiers du lot")
+    parser.add_argument("--rapport-lot", metavar="JSON", help="écrit le rapport agrégé du lot dans ce fichier")
+    parser.add_argument("--exporter-plan", metavar="PLAN",
+                        help="calcule le tri du dossier configuré sans rien déplacer et l'écrit dans ce fichier")
+    parser.add_argument("--appliquer-plan", metavar="PLAN",
+                        help="applique un plan exporté (sans interface), en ignorant les fichiers modifiés depuis")
+    arguments = parser.parse_args()
+    
+    options_session = {}
+    if arguments.profil:
+        options_session["profilage"] = True
+    if arguments.limite_operations is not None:
+        options_session["limite_operations_par_seconde"] = arguments.limite_operations
+    if arguments.limite_octets is not None:
+        options_session["limite_octets_par_seconde"] = arguments.limite_octets
+    if arguments.destination is not None:
+        options_session["dossier_destination"] = arguments.destination
+    # Configuration enregistrée depuis l'interface, les options de la ligne de commande en priorité
+    config = dict(CONFIG_PAR_DEFAUT, **ApplicationTrieurFichiers.charger_config(), **options_session)
+    
+    if arguments.lot or arguments.fichier_lot:
+        sources = list(arguments.lot)
+        if arguments.fichier_lot:
+            with open(arguments.fichier_lot, encoding="utf-8") as f:
+                sources.extend(json.load(f))
+        if arguments.rapport_lot:
+            config["fichier_rapport_json"] = arguments.rapport_lot
+        lot = TriParLots(sources, config)
+        installer_signaux_limitation(lot.trieurs_en_cours)
+        rapport = lot.executer(arguments.operation, callback=lambda termines, total, resultat: print(
+            f"[{termines}/{total}] {resultat['dossier_source']}: {resultat['fichiers']} fichiers, "
+            f"{len(resultat['erreurs'])} erreurs ({resultat['duree']:.2f} s)", flush=True))
+        for erreur in rapport.erreurs:
+            print(f"  ❌ {erreur}")
+        print(f"Total: {rapport.nombre_fichiers} fichiers, {len(rapport.erreurs)} erreurs, "
+              f"{len(rapport.peripheriques)} périphériques")
+        sys.exit(1 if rapport.erreurs else 0)
+    
+    if arguments.exporter_plan or arguments.appliquer_plan:
+        # Tri configuré dans l'interface, calculé en journée et appliqué plus tard (tâche planifiée)
+        if arguments.exporter_plan:
+            trieur = TrieurFichiers(config)
+            installer_signaux_limitation(trieur)
+            rapport = trieur.exporter_plan(arguments.exporter_plan)
+            print(f"Plan {arguments.exporter_plan}: {rapport.nombre_fichiers} déplacements planifiés")
+        else:
+            try:
+                entete = PlanDeplacements(arguments.appliquer_plan).entete()
+            except (OSError, ValueError) as e:
+                logger.error(f"Plan illisible {arguments.appliquer_plan}: {e}")
+                print(f"  ❌ Plan illisible: {e}")
+                sys.exit(1)
+            config.update(dossier_source=entete["dossier_source"], dossier_destination=entete["dossier_destination"],
+                          mode_vue=entete["mode_vue"])
+            trieur = TrieurFichiers(config)
+            installer_signaux_limitation(trieur)
+            rapport = trieur.appliquer_plan(arguments.appliquer_plan)
+            ignores = sum(rapport.metriques.compteurs.get(nom, 0) for nom in (
+                "plan_sources_disparues", "plan_sources_modifiees", "plan_destinations_occupees"))
+            print(f"Plan {arguments.appliquer_plan}: {rapport.nombre_fichiers} fichiers déplacés, "
+                  f"{ignores} ignorés car modifiés depuis la planification")
+        for erreur in rapport.erreurs:
+            print(f"  ❌ {erreur}")
+        sys.exit(1 if rapport.erreurs else 0)
+    
+    app = ApplicationTrieurFichiers(options_session)
+    installer_signaux_limitation(app.trieur, app)
     app.mainloop()
 
 